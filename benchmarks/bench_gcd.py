@@ -0,0 +1,52 @@
+"""Times the gcd of two random polynomials of degree n over Z_p with a
+common factor of degree n/3, by the classical remainder sequence and by
+half-gcd, with and without Bezout cofactors. Use the output to tune
+polynomial.HALF_GCD_THRESHOLD and polynomial.HALF_GCD_GCD_ONLY_THRESHOLD.
+
+    python benchmarks/bench_gcd.py [p]
+"""
+import os
+import sys
+import timeit
+from random import randint, seed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'finite_fields'))
+import polynomial
+from polynomial import PolynomialModuloP, gcdex
+
+def timed(a, b, half_gcd, cofactors):
+    saved = (polynomial.HALF_GCD_THRESHOLD, polynomial.HALF_GCD_GCD_ONLY_THRESHOLD)
+    if half_gcd:
+        polynomial.HALF_GCD_GCD_ONLY_THRESHOLD = polynomial.HALF_GCD_THRESHOLD
+    else:
+        polynomial.HALF_GCD_THRESHOLD = polynomial.HALF_GCD_GCD_ONLY_THRESHOLD = a.degree() + 1
+    try:
+        number = 1
+        while True:
+            t = min(timeit.repeat(lambda: gcdex(a, b, cofactors), repeat=3, number=number))
+            if t > 0.05 or number >= 1000:
+                return t / number
+            number *= 4
+    finally:
+        (polynomial.HALF_GCD_THRESHOLD, polynomial.HALF_GCD_GCD_ONLY_THRESHOLD) = saved
+
+def random_poly(n, p):
+    return PolynomialModuloP([randint(0, p - 1) for i in range(n)] + [1], p)
+
+def main():
+    p = int(sys.argv[1]) if len(sys.argv) > 1 else 1000003
+    seed(1)
+    sizes = [256, 512, 1024, 2048, 4096, 8192]
+    print "p = {0}".format(p)
+    print "{0:>6} {1:>12} {2:>12} {3:>12} {4:>12}".format(
+        "degree", "classical", "half-gcd", "classical+st", "half-gcd+st")
+    for n in sizes:
+        c = random_poly(n // 3, p)
+        a = random_poly(n - n // 3, p) * c
+        b = random_poly(n - n // 3 - 1, p) * c
+        row = [timed(a, b, False, False), timed(a, b, True, False),
+               timed(a, b, False, True), timed(a, b, True, True)]
+        print "{0:>6} ".format(n) + " ".join("{0:>12.6f}".format(t) for t in row)
+
+if __name__ == '__main__':
+    main()
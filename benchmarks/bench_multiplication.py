@@ -0,0 +1,88 @@
+"""Times schoolbook, Karatsuba, Kronecker substitution and NTT multiplication
+of random polynomials over Z_p and reports the degree at which each
+algorithm overtakes the previous one. Use the output to tune
+polynomial.KARATSUBA_THRESHOLD, polynomial.KRONECKER_THRESHOLD and
+polynomial.NTT_THRESHOLD.
+
+    python benchmarks/bench_multiplication.py [p]
+"""
+import os
+import sys
+import timeit
+from random import randint, seed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'finite_fields'))
+import polynomial
+
+def schoolbook(a, b, p):
+    return [c % p for c in polynomial._schoolbook(a, b)]
+
+def karatsuba(a, b, p):
+    # A single Karatsuba split over schoolbook halves: the first length at
+    # which this wins is the right value for KARATSUBA_THRESHOLD.
+    saved = polynomial.KARATSUBA_THRESHOLD
+    polynomial.KARATSUBA_THRESHOLD = max(len(b) // 2, 2)
+    try:
+        return [c % p for c in polynomial._karatsuba(a, b)]
+    finally:
+        polynomial.KARATSUBA_THRESHOLD = saved
+
+def recursive_karatsuba(a, b, p):
+    return [c % p for c in polynomial._karatsuba(a, b)]
+
+def kronecker(a, b, p):
+    return polynomial._kronecker_mul(a, b, p)
+
+def ntt(a, b, p):
+    return polynomial._ntt_mul(a, b, p, polynomial._ntt_primes_for(len(a), len(b), p))
+
+def best_time(fn, a, b, p):
+    number = 1
+    while True:
+        t = min(timeit.repeat(lambda: fn(a, b, p), repeat=3, number=number))
+        if t > 0.05 or number >= 1000:
+            return t / number
+        number *= 4
+
+def main():
+    p = int(sys.argv[1]) if len(sys.argv) > 1 else 1000003
+    seed(1)
+    sizes = [8, 12, 16, 24, 32, 48, 64, 128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096]
+    columns = ['schoolbook', 'karatsuba', 'recursive', 'kronecker', 'ntt']
+    print "p = {0}".format(p)
+    print "{0:>6} {1:>12} {2:>12} {3:>12} {4:>12} {5:>12}".format("length", *columns)
+    rows = []
+    for n in sizes:
+        a = [randint(0, p - 1) for i in range(n)]
+        b = [randint(0, p - 1) for i in range(n)]
+        times = [best_time(schoolbook, a, b, p) if n <= 1024 else None,
+                 best_time(karatsuba, a, b, p) if n <= 1024 else None,
+                 best_time(recursive_karatsuba, a, b, p),
+                 best_time(kronecker, a, b, p)]
+        if polynomial._ntt_primes_for(n, n, p) is not None:
+            times.append(best_time(ntt, a, b, p))
+        else:
+            times.append(None)
+        fmt = lambda t: "{0:12.6f}".format(t) if t is not None else "{0:>12}".format("-")
+        print "{0:>6} {1}".format(n, " ".join(map(fmt, times)))
+        rows.append((n, times))
+    print "karatsuba crossover (KARATSUBA_THRESHOLD): {0}".format(
+        crossover(rows, 1, 0))
+    print "kronecker crossover (KRONECKER_THRESHOLD): {0}".format(crossover(rows, 3, 0))
+    print "ntt crossover (NTT_THRESHOLD): {0}".format(crossover(rows, 4, 3))
+
+def crossover(rows, new, old):
+    # Smallest length from which `new` stays faster than `old`
+    result = None
+    for (n, times) in rows:
+        if times[new] is None or times[old] is None:
+            continue
+        if times[new] < times[old]:
+            if result is None:
+                result = n
+        else:
+            result = None
+    return result if result is not None else "not reached"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Times reduction of a product of two field elements (degree 2n - 2) modulo
+a random dense polynomial of degree n by long division and by Barrett
+reduction, and reports the degree from which Barrett stays ahead. Use the
+output to tune polynomial.BARRETT_THRESHOLD.
+
+    python benchmarks/bench_reduction.py [p]
+"""
+import os
+import sys
+import timeit
+from random import randint, seed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'finite_fields'))
+import polynomial
+from polynomial import PolynomialModuloP, ModulusReducer
+
+def reducer(f, barrett):
+    saved = polynomial.BARRETT_THRESHOLD
+    polynomial.BARRETT_THRESHOLD = 1 if barrett else f.degree() + 1
+    try:
+        return ModulusReducer(f)
+    finally:
+        polynomial.BARRETT_THRESHOLD = saved
+
+def best_time(r, a):
+    number = 1
+    while True:
+        t = min(timeit.repeat(lambda: r.reduce(a), repeat=3, number=number))
+        if t > 0.05 or number >= 1000:
+            return t / number
+        number *= 4
+
+def main():
+    p = int(sys.argv[1]) if len(sys.argv) > 1 else 1000003
+    seed(1)
+    sizes = [16, 32, 64, 128, 256, 512, 768, 1024, 1536, 2048, 4096]
+    print "p = {0}".format(p)
+    print "{0:>6} {1:>12} {2:>12}".format("degree", "division", "barrett")
+    first = None
+    for n in sizes:
+        f = PolynomialModuloP([randint(0, p - 1) for i in range(n)] + [1], p)
+        a = PolynomialModuloP([randint(0, p - 1) for i in range(2 * n - 1)], p)
+        t_div = best_time(reducer(f, False), a)
+        t_bar = best_time(reducer(f, True), a)
+        print "{0:>6} {1:12.6f} {2:12.6f}".format(n, t_div, t_bar)
+        if t_bar < t_div:
+            first = first or n
+        else:
+            first = None
+    print "barrett crossover (BARRETT_THRESHOLD): {0}".format(first or "not reached")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Times polynomial arithmetic, field construction, element arithmetic and
+the root, irreducibility and isomorphism routines, writes the results as
+JSON and compares them with a baseline from an earlier run. Exits with
+status 1 when a benchmark is slower than its baseline by more than the
+threshold (a fraction, 0.25 by default) and by more than ABSOLUTE_FLOOR
+seconds.
+
+    python benchmarks/run_benchmarks.py [-o results.json] [-b baseline.json]
+        [-t threshold] [-k substring] [--update-baseline]
+
+Baselines depend on the machine, so none is shipped; record one with
+--update-baseline before starting performance work. The bench_*.py scripts
+next to this one measure algorithm crossovers for the thresholds in
+polynomial.py.
+"""
+import argparse
+import json
+import operator
+import os
+import platform
+import sys
+import time
+import timeit
+from random import randint, seed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'finite_fields'))
+import irreducibles
+from finite_field import (FiniteField, NumberModuloP, find_irreducible_polynomial,
+                          is_polynomial_irreducible, root_of_polynomial)
+from polynomial import Polynomial, PolynomialModuloP
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+# Each benchmark is repeated until one run of it takes at least MIN_TIME
+# seconds; the median of REPEAT such runs is reported
+MIN_TIME = 0.05
+REPEAT = 9
+# Slowdowns of less than this many seconds per call are never regressions,
+# however large relative to the baseline
+ABSOLUTE_FLOOR = 1e-6
+
+POLYNOMIAL_DEGREES = [16, 64, 256, 1024]
+PRIME = 1000003
+# (p, n) with a bundled modulus, so that of_size does not search
+OF_SIZE_CASES = [(2, 8), (2, 64), (2, 163), (3, 5), (3, 20), (5, 4), (7, 3)]
+# (p, n) searched for with a fixed seed
+SEARCH_CASES = [(13, 6), (101, 3), (PRIME, 2)]
+# (p, n, log tables) for element arithmetic
+ELEMENT_CASES = [(2, 8, True), (2, 8, False), (2, 64, False), (3, 5, True), (3, 20, False),
+                 (2 ** 61 - 1, 2, False)]
+
+def median_time(fn):
+    number = 1
+    while timeit.timeit(fn, number=number) < MIN_TIME and number < 1 << 16:
+        number *= 4
+    times = sorted(timeit.repeat(fn, repeat=REPEAT, number=number))
+    return times[REPEAT // 2] / number
+
+_fields = {}
+
+def field_of(p, n, log_tables = None):
+    # Over the bundled or cached modulus if there is one; built once per run
+    key = (p, n, log_tables)
+    if key not in _fields:
+        f = irreducibles.lookup(p, n) or find_irreducible_polynomial(p, n, random_seed=1)
+        _fields[key] = FiniteField(f, p, log_tables)
+    return _fields[key]
+
+def random_element(field):
+    return field.element_from_index(randint(1, field.q - 1))
+
+# Each suite yields (name, setup) pairs; setup builds the fixtures of one
+# benchmark and returns the function to time, and is only called for the
+# benchmarks that are run
+
+def polynomial_cases():
+    def modp(n, op):
+        def setup():
+            a = PolynomialModuloP([randint(0, PRIME - 1) for i in range(2 * n)] + [1], PRIME)
+            b = PolynomialModuloP([randint(0, PRIME - 1) for i in range(n)] + [1], PRIME)
+            return lambda: op(a, b)
+        return setup
+    def generic(n, op):
+        def setup():
+            a = Polynomial([NumberModuloP(randint(0, PRIME - 1), PRIME) for i in range(2 * n)] + [NumberModuloP(1, PRIME)])
+            b = Polynomial([NumberModuloP(randint(0, PRIME - 1), PRIME) for i in range(n)] + [NumberModuloP(1, PRIME)])
+            return lambda: op(a, b)
+        return setup
+    for n in POLYNOMIAL_DEGREES:
+        yield ('polynomial_modp.mul.{0}'.format(n), modp(n, operator.mul))
+        yield ('polynomial_modp.div.{0}'.format(n), modp(n, operator.floordiv))
+        yield ('polynomial_modp.mod.{0}'.format(n), modp(n, operator.mod))
+        if n > 256:
+            continue
+        yield ('polynomial.mul.{0}'.format(n), generic(n, operator.mul))
+        yield ('polynomial.div.{0}'.format(n), generic(n, operator.div))
+        yield ('polynomial.mod.{0}'.format(n), generic(n, operator.mod))
+
+def field_cases():
+    def construct(p, n):
+        f = find_irreducible_polynomial(p, n, random_seed=1)
+        return lambda: FiniteField(f, p)
+    def log_tables(p, n):
+        f = field_of(p, n).f
+        return lambda: FiniteField(f, p, True)._log_tables()
+    for (p, n) in OF_SIZE_CASES:
+        yield ('field.of_size.{0}^{1}'.format(p, n), lambda q=p ** n, p=p: lambda: FiniteField.of_size(q, p))
+    for (p, n) in SEARCH_CASES:
+        yield ('field.search.{0}^{1}'.format(p, n),
+               lambda p=p, n=n: lambda: find_irreducible_polynomial(p, n, random_seed=1))
+        yield ('field.construct.{0}^{1}'.format(p, n), lambda p=p, n=n: construct(p, n))
+    for (p, n) in [(2, 8), (3, 5), (2, 16)]:
+        yield ('field.log_tables.{0}^{1}'.format(p, n), lambda p=p, n=n: log_tables(p, n))
+
+def element_cases():
+    def mul(field):
+        (a, b) = (random_element(field), random_element(field))
+        return lambda: a * b
+    def inverse(field):
+        a = random_element(field)
+        return lambda: a.inverse()
+    def power(field):
+        (a, e) = (random_element(field), randint(field.q // 2, field.q - 1))
+        return lambda: a ** e
+    for (p, n, tables) in ELEMENT_CASES:
+        name = '{0}^{1}{2}'.format(p, n, '.tables' if tables else '')
+        for (op, case) in [('mul', mul), ('inverse', inverse), ('pow', power)]:
+            yield ('element.{0}.{1}'.format(op, name),
+                   lambda case=case, p=p, n=n, tables=tables: case(field_of(p, n, tables)))
+
+def algorithm_cases():
+    def irreducible(p, n):
+        f = find_irreducible_polynomial(p, n, random_seed=2)
+        return lambda: is_polynomial_irreducible(f)
+    def random_irreducible(p, n):
+        g = PolynomialModuloP([randint(0, p - 1) for i in range(n)] + [1], p)
+        return lambda: is_polynomial_irreducible(g)
+    def root(p, n, d):
+        field = field_of(p, n)
+        roots = [random_element(field) for i in range(d // 2)]
+        poly = Polynomial([field.one()])
+        for r in roots:
+            poly = poly * Polynomial([-r, field.one()])
+        poly = poly * Polynomial([random_element(field) for i in range(d - d // 2)] + [field.one()])
+        return lambda: root_of_polynomial(poly)
+    def isomorphism(p, n):
+        source = field_of(p, n)
+        target = FiniteField(find_irreducible_polynomial(p, n, random_seed=3), p)
+        return lambda: source.isomorphism_to(target)
+    for (p, n) in [(2, 64), (3, 20), (PRIME, 8)]:
+        yield ('irreducible.{0}^{1}'.format(p, n), lambda p=p, n=n: irreducible(p, n))
+        yield ('irreducible.random.{0}^{1}'.format(p, n), lambda p=p, n=n: random_irreducible(p, n))
+    for (p, n, d) in [(2, 8, 6), (3, 5, 8), (2 ** 61 - 1, 2, 8)]:
+        yield ('root.{0}^{1}.{2}'.format(p, n, d), lambda p=p, n=n, d=d: root(p, n, d))
+    for (p, n) in [(2, 8), (3, 5), (2, 32)]:
+        yield ('isomorphism.{0}^{1}'.format(p, n), lambda p=p, n=n: isomorphism(p, n))
+
+SUITES = [polynomial_cases, field_cases, element_cases, algorithm_cases]
+
+def run(pattern = None):
+    # {name: seconds per call}
+    results = {}
+    for suite in SUITES:
+        for (name, setup) in suite():
+            if pattern is not None and pattern not in name:
+                continue
+            # Seeded by name, so fixtures do not depend on what else runs
+            seed(name)
+            results[name] = median_time(setup())
+            print "{0:<40} {1:14.9f}".format(name, results[name])
+            sys.stdout.flush()
+    return results
+
+def compare(results, baseline, threshold, floor = ABSOLUTE_FLOOR):
+    # [(name, baseline seconds, seconds)] of the benchmarks that regressed
+    regressions = []
+    for name in sorted(results):
+        old = baseline.get(name)
+        if old is None:
+            continue
+        if results[name] > old * (1 + threshold) and results[name] - old > floor:
+            regressions.append((name, old, results[name]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE,
+                        help="JSON file of an earlier run to compare with")
+    parser.add_argument('-t', '--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown against the baseline, as a fraction")
+    parser.add_argument('-k', '--filter', help="only run benchmarks whose name contains this")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store the results as the new baseline")
+    args = parser.parse_args()
+    results = run(args.filter)
+    report = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'python': platform.python_version(),
+              'machine': platform.machine(),
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+    if args.update_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                merged = json.load(f)
+            merged['results'].update(results)
+            results = merged['results']
+            report['results'] = results
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print "baseline written to {0}".format(args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print "no baseline at {0}; run with --update-baseline to record one".format(args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    for (name, old, new) in regressions:
+        print "REGRESSION {0}: {1:.9f} -> {2:.9f} ({3:+.0%})".format(name, old, new, new / old - 1)
+    if regressions:
+        return 1
+    print "no regressions beyond {0:.0%} against {1}".format(args.threshold, args.baseline)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# Arithmetic in GF(2)[x] and GF(2^n) with polynomials stored as Python ints:
+# bit i is the coefficient of x^i. Addition is XOR.
+
+from polynomial import _sliding_window_power
+
+# _SPREAD[b] has the bits of the byte b moved to the even positions, so that
+# squaring (which is linear over GF(2)) is a table lookup per byte.
+_SPREAD = [0] * 256
+for _b in range(256):
+    for _i in range(8):
+        if _b >> _i & 1:
+            _SPREAD[_b] |= 1 << (2 * _i)
+
+def clmul(a, b):
+    # Carry-less product. Operands longer than 32 bits are processed four
+    # bits of the smaller one at a time against a table of a * k, k < 16.
+    if a.bit_length() < b.bit_length():
+        a, b = b, a
+    if b.bit_length() <= 32:
+        r = 0
+        while b:
+            if b & 1:
+                r ^= a
+            a <<= 1
+            b >>= 1
+        return r
+    table = [0] * 16
+    for k in range(1, 16):
+        table[k] = table[k & (k - 1)] ^ (a << ((k & -k).bit_length() - 1))
+    r = 0
+    shift = (b.bit_length() + 3) // 4 * 4
+    while shift:
+        shift -= 4
+        r = (r << 4) ^ table[(b >> shift) & 15]
+    return r
+
+def square(a):
+    r = 0
+    shift = 0
+    while a:
+        r |= _SPREAD[a & 255] << shift
+        a >>= 8
+        shift += 16
+    return r
+
+def poly_mod(a, f):
+    df = f.bit_length()
+    while a.bit_length() >= df:
+        a ^= f << (a.bit_length() - df)
+    return a
+
+def poly_gcd(a, b):
+    while b:
+        a, b = b, poly_mod(a, b)
+    return a
+
+def is_irreducible(f):
+    # Ben-Or's test, as in finite_field.is_polynomial_irreducible, with
+    # x^(2^k) mod f carried forward by repeated squaring.
+    n = f.bit_length() - 1
+    if n <= 0:
+        return False
+    if n > 1 and not f & 1:
+        return False
+    arith = BinaryFieldArithmetic(f)
+    h = 2
+    for k in range(1, n // 2 + 1):
+        h = arith.square(h)
+        if poly_gcd(f, h ^ 2) != 1:
+            return False
+    return True
+
+
+class BinaryFieldArithmetic(object):
+    # GF(2^n) = GF(2)[x]/(f). Elements are ints below 2^n; products are
+    # reduced WINDOW bits at a time with a table of (k << n) mod f.
+    WINDOW = 8
+    
+    def __init__(self, f):
+        self.f = f
+        self.n = n = f.bit_length() - 1
+        w = self.WINDOW
+        self._reduction = [poly_mod(k << n, f) for k in range(1 << w)]
+    
+    def reduce(self, a):
+        n, w, table = self.n, self.WINDOW, self._reduction
+        excess = a.bit_length() - n
+        while excess > 0:
+            e = excess - w if excess > w else 0
+            k = a >> (n + e)
+            a ^= (k << (n + e)) ^ (table[k] << e)
+            excess = a.bit_length() - n
+        return a
+    
+    def add(self, a, b):
+        return a ^ b
+    
+    def neg(self, a):
+        return a
+    
+    def mul(self, a, b):
+        return self.reduce(clmul(a, b))
+    
+    def square(self, a):
+        return self.reduce(square(a))
+    
+    def inverse(self, a):
+        # Binary extended Euclid: keeps g1 * a = u and g2 * a = v mod f
+        if a == 0:
+            raise ZeroDivisionError("zero has no inverse")
+        u, v = a, self.f
+        g1, g2 = 1, 0
+        while u != 1:
+            j = u.bit_length() - v.bit_length()
+            if j < 0:
+                u, v = v, u
+                g1, g2 = g2, g1
+                j = -j
+            u ^= v << j
+            g1 ^= g2 << j
+        return g1
+    
+    def div(self, a, b):
+        return self.mul(a, self.inverse(b))
+    
+    def pow(self, a, e):
+        if e < 0:
+            a, e = self.inverse(a), -e
+        return _sliding_window_power(a, e, 1, self.mul, self.square)
@@ -0,0 +1,158 @@
+# Multiplicative orders and discrete logarithms in finite fields.
+#
+# log_b(a) is found by Pohlig-Hellman over the factorisation of the order of
+# b: one logarithm in the subgroup of order r for every prime power r^e
+# dividing it, combined by the CRT. Those are found by baby-step giant-step
+# when sqrt(r) baby steps fit in BABY_STEP_MEMORY_LIMIT, and by Pollard's rho
+# otherwise. Fields with log tables skip all of this.
+#
+# Baby-step tables depend only on the field and the subgroup generator, so
+# they are kept in an LRU cache bounded by BABY_STEP_MEMORY_LIMIT and reused
+# by every later logarithm in the same field.
+
+from collections import OrderedDict
+from fractions import gcd
+from random import Random
+from finite_field import FFElement, invert_mod_n
+from number_theory import _integer_root
+
+BABY_STEP_MEMORY_LIMIT = 64 * 1024 * 1024
+# Rough size of one baby step: a dict entry from element index to exponent
+BABY_STEP_ENTRY_BYTES = 100
+
+class _BabyStepCache(object):
+    # (field, generator index) -> (baby steps, giant step), least recently
+    # used first
+    def __init__(self):
+        self._tables = OrderedDict()
+        self.used = 0
+    
+    def get(self, gamma, m):
+        key = (gamma.field, gamma.index)
+        entry = self._tables.pop(key, None)
+        if entry is None:
+            entry = (_baby_steps(gamma, m), gamma ** (-m), m * BABY_STEP_ENTRY_BYTES)
+            self.used += entry[2]
+        self._tables[key] = entry
+        while self.used > BABY_STEP_MEMORY_LIMIT and len(self._tables) > 1:
+            (_, evicted) = self._tables.popitem(last=False)
+            self.used -= evicted[2]
+        return entry[:2]
+    
+    def clear(self):
+        self._tables.clear()
+        self.used = 0
+    
+    def __len__(self):
+        return len(self._tables)
+
+_cache = _BabyStepCache()
+
+def _baby_steps(gamma, m):
+    steps = {}
+    y = gamma.field.one()
+    for j in range(m):
+        steps.setdefault(y.index, j)
+        y = y * gamma
+    return steps
+
+def multiplicative_order(a):
+    # Smallest n > 0 with a^n = 1
+    field = a.field
+    if a == 0:
+        raise ValueError("zero has no multiplicative order")
+    one = field.one()
+    n = field.q - 1
+    for (r, e) in field.order_factorization:
+        n //= r ** e
+        b = a ** n
+        while b != one:
+            b = b ** r
+            n *= r
+    return n
+
+def _log_prime_order(h, gamma, r):
+    # log_gamma(h) for gamma of prime order r
+    if h == gamma.field.one():
+        return 0
+    m = _integer_root(r - 1, 2) + 1
+    if m * BABY_STEP_ENTRY_BYTES > BABY_STEP_MEMORY_LIMIT:
+        return _rho_log(h, gamma, r)
+    (steps, giant) = _cache.get(gamma, m)
+    y = h
+    for i in range(m):
+        j = steps.get(y.index)
+        if j is not None:
+            return (i * m + j) % r
+        y = y * giant
+    raise ValueError("Element is not a power of the base")
+
+def _rho_log(h, gamma, r):
+    # Pollard's rho: a walk over gamma^a h^b, split three ways by element
+    # index, until Floyd's cycle finding sees the same element twice
+    rng = Random(r)
+    def step(x, a, b):
+        s = x.index % 3
+        if s == 0:
+            return (x * gamma, (a + 1) % r, b)
+        if s == 1:
+            return (x * h, a, (b + 1) % r)
+        return (x * x, 2 * a % r, 2 * b % r)
+    while True:
+        (a, b) = (rng.randrange(r), rng.randrange(r))
+        x = gamma ** a * h ** b
+        (x, a, b) = (X, A, B) = step(x, a, b)
+        (X, A, B) = step(X, A, B)
+        while x != X:
+            (x, a, b) = step(x, a, b)
+            (X, A, B) = step(*step(X, A, B))
+        # gamma^a h^b = gamma^A h^B
+        if (b - B) % r:
+            return (A - a) * invert_mod_n((b - B) % r, r) % r
+
+def discrete_log(a, base):
+    # k in [0, order of base) with base^k = a
+    field = a.field
+    if not isinstance(base, FFElement) or base.field != field:
+        raise ValueError("Logarithm base must be an element of the same field")
+    if a == 0 or base == 0:
+        raise ValueError("zero has no logarithm")
+    tables = field._log_tables()
+    if tables is not None:
+        order = tables.order
+        (la, lb) = (tables.log[a.index], tables.log[base.index])
+        g = gcd(lb, order)
+        if la % g:
+            raise ValueError("Element is not a power of the base")
+        n = order // g
+        return 0 if n == 1 else la // g * invert_mod_n(lb // g % n, n) % n
+    n = multiplicative_order(base)
+    if a ** n != field.one():
+        raise ValueError("Element is not a power of the base")
+    result = 0
+    modulus = 1
+    for (r, _) in field.order_factorization:
+        e = 0
+        while n % r ** (e + 1) == 0:
+            e += 1
+        if e == 0:
+            continue
+        x = _log_prime_power(a, base, n, r, e)
+        # CRT with the residues so far
+        re = r ** e
+        t = (x - result) * invert_mod_n(modulus % re, re) % re if modulus > 1 else x
+        result += modulus * t
+        modulus *= re
+    return result % n
+
+def _log_prime_power(a, base, n, r, e):
+    # log_base(a) mod r^e, one base-r digit at a time
+    gamma = base ** (n // r)
+    base_inv = base.inverse()
+    x = 0
+    rk = 1
+    for k in range(e):
+        h = (a * base_inv ** x) ** (n // (rk * r))
+        x += _log_prime_order(h, gamma, r) * rk
+        rk *= r
+    return x
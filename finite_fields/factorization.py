@@ -0,0 +1,196 @@
+from finite_field import FFElement, poly_gcd, _coefficient_field, _splitting_polynomial
+from polynomial import Polynomial, SparsePolynomial, FrobeniusMap
+from ff_matrix import FFMatrix
+from random import randint
+import multiprocessing
+
+# Square-free parts over fields with q <= BERLEKAMP_MAX_Q are factored with
+# Berlekamp's algorithm, larger ones by distinct- and equal-degree
+# factorisation (Cantor-Zassenhaus).
+BERLEKAMP_MAX_Q = 32
+
+def _normalize(poly, field):
+    # Same polynomial with every coefficient an FFElement of field
+    d = poly.degree()
+    return Polynomial([field.element_from_index(c.index) if isinstance(c, FFElement) else field.const(c)
+                       for c in list(poly.coef)[:d + 1]])
+
+def _monic(poly, field):
+    poly = _normalize(poly, field)
+    return poly * poly.coef[poly.degree()].inverse()
+
+def _derivative(poly, field):
+    coef = list(_normalize(poly, field).coef)
+    return Polynomial([c * i for (i, c) in enumerate(coef)][1:])
+
+def _pth_root(poly, field):
+    # poly = sum a_i x^(ip); a^(1/p) = a^(q/p) in GF(q)
+    p = field.p
+    e = field.q // p
+    coef = list(_normalize(poly, field).coef)
+    return Polynomial([coef[i] ** e for i in range(0, len(coef), p)])
+
+def square_free_factorization(poly):
+    # [(g, e)] with poly = lc * prod g^e and every g monic and square-free
+    field = _coefficient_field(poly)
+    f = _monic(poly, field)
+    if f.degree() < 1:
+        # Constants have no factors, and their derivative is zero too
+        return []
+    result = []
+    df = _derivative(f, field)
+    if df.degree() < 0:
+        return [(g, e * field.p) for (g, e) in square_free_factorization(_pth_root(f, field))]
+    c = _monic(poly_gcd(f, df), field)
+    w = f // c
+    i = 1
+    while w.degree() > 0:
+        y = _monic(poly_gcd(w, c), field)
+        z = w // y
+        if z.degree() > 0:
+            result.append((_monic(z, field), i))
+        i += 1
+        w = y
+        c = c // y
+    if c.degree() > 0:
+        result += [(g, e * field.p) for (g, e) in square_free_factorization(_pth_root(c, field))]
+    return result
+
+def distinct_degree_factorization(poly):
+    # For monic square-free poly: [(g, d)] where g is the product of all
+    # irreducible factors of degree d
+    # x^(q^d) mod g is carried forward by the Frobenius matrix of g, rebuilt
+    # from x^q whenever a factor is removed
+    field = _coefficient_field(poly)
+    g = _monic(poly, field)
+    x = Polynomial([field.zero(), field.one()])
+    result = []
+    if g.degree() < 2:
+        return [(g, 1)] if g.degree() == 1 else []
+    frobenius = FrobeniusMap(g, field.q)
+    h = frobenius.xq
+    d = 1
+    while g.degree() >= 2 * d:
+        c = poly_gcd(g, h - x)
+        if c.degree() > 0:
+            c = _monic(c, field)
+            result.append((c, d))
+            g = g // c
+            h = h % g
+            if g.degree() >= 2 * (d + 1):
+                frobenius = FrobeniusMap(g, field.q, frobenius.xq % g)
+        d += 1
+        if g.degree() >= 2 * d:
+            h = frobenius(h)
+    if g.degree() > 0:
+        result.append((_monic(g, field), g.degree()))
+    return result
+
+def equal_degree_factorization(poly, d, retries = 1000):
+    # Splits a monic product of distinct irreducibles of degree d
+    field = _coefficient_field(poly)
+    poly = _monic(poly, field)
+    n = poly.degree()
+    if n <= d:
+        return [poly]
+    while retries > 0:
+        retries -= 1
+        r = Polynomial([field.element_from_index(randint(0, field.q - 1)) for j in range(n)])
+        if r.degree() < 1:
+            continue
+        g = poly_gcd(poly, _splitting_polynomial(r, poly, d))
+        if 0 < g.degree() < n:
+            g = _monic(g, field)
+            return equal_degree_factorization(g, d, retries) + \
+                equal_degree_factorization(poly // g, d, retries)
+    raise ValueError("Equal-degree splitting did not converge")
+
+def berlekamp_factorization(poly):
+    # Irreducible factors of a monic square-free poly: the polynomials v
+    # with v^q = v mod poly form a subalgebra whose dimension is the number
+    # of factors, and gcd(g, v - s) for s in GF(q) separates them.
+    field = _coefficient_field(poly)
+    f = _monic(poly, field)
+    n = f.degree()
+    if n <= 1:
+        return [f]
+    x = Polynomial([field.zero(), field.one()])
+    xq = x.power(field.q, f)
+    row = Polynomial([field.one()])
+    # Q - I, transposed: column i holds x^(qi) mod f - x^i
+    matrix = [[field.zero()] * n for j in range(n)]
+    for i in range(n):
+        coef = _normalize(row, field).coef
+        for j in range(n):
+            matrix[j][i] = coef[j] if j < len(coef) else field.zero()
+        matrix[i][i] = matrix[i][i] - 1
+        row = (row * xq) % f
+    basis = FFMatrix(field, matrix).nullspace()
+    count = len(basis)
+    factors = [f]
+    elements = [field.element_from_index(i) for i in range(field.q)]
+    for v in basis:
+        if len(factors) == count:
+            break
+        v = Polynomial(v)
+        if v.degree() < 1:
+            continue
+        split = []
+        for g in factors:
+            for s in elements:
+                if g.degree() <= 1:
+                    break
+                h = poly_gcd(g, v - s)
+                if 0 < h.degree() < g.degree():
+                    h = _monic(h, field)
+                    split.append(h)
+                    g = g // h
+            split.append(_monic(g, field))
+        factors = split
+    return factors
+
+def _equal_degree_task(args):
+    (poly, d) = args
+    return equal_degree_factorization(poly, d)
+
+def factor(poly, processes = None):
+    # [(g, e)] of monic irreducible factors g and multiplicities e, sorted
+    # by degree; poly = lc * prod g^e. With processes > 1 the independent
+    # equal-degree splitting tasks run on a multiprocessing pool.
+    field = _coefficient_field(poly)
+    result = []
+    tasks = []
+    for (g, e) in square_free_factorization(poly):
+        if field.q <= BERLEKAMP_MAX_Q:
+            result += [(h, e) for h in berlekamp_factorization(g)]
+        else:
+            tasks += [((h, d), e) for (h, d) in distinct_degree_factorization(g)]
+    if processes is not None and processes > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(processes)
+        try:
+            parts = pool.map(_equal_degree_task, [t for (t, e) in tasks])
+        finally:
+            pool.terminate()
+            pool.join()
+    else:
+        parts = [_equal_degree_task(t) for (t, e) in tasks]
+    for (hs, (t, e)) in zip(parts, tasks):
+        result += [(h, e) for h in hs]
+    # Results from worker processes carry copies of the field
+    result = [(_normalize(h, field), e) for (h, e) in result]
+    result.sort(key=lambda (h, e): (h.degree(), [c.index for c in h.coef], e))
+    return result
+
+def roots(poly):
+    # All distinct roots of poly in its coefficient field
+    field = _coefficient_field(poly)
+    f = _monic(poly, field)
+    xq_x = SparsePolynomial([(field.q, field.one()), (1, -field.one())])
+    linear = _monic(poly_gcd(f, xq_x), field)
+    if linear.degree() < 1:
+        return []
+    if field.q <= BERLEKAMP_MAX_Q:
+        factors = berlekamp_factorization(linear)
+    else:
+        factors = equal_degree_factorization(linear, 1)
+    return sorted([-g.coef[0] for g in factors], key=lambda a: a.index)
@@ -0,0 +1,314 @@
+from finite_field import FFElement, NumberModuloP
+from polynomial import PolynomialModuloP
+import numbers
+
+# x^k mod f for n <= k <= 2n - 2, keyed by (p, coefficients of f)
+_reduction_tables = {}
+
+def _reduction_table(field):
+    key = (field.p, tuple(field.f.coef))
+    table = _reduction_tables.get(key)
+    if table is None:
+        n = field.f.degree()
+        x = PolynomialModuloP([0, 1], field.p)
+        table = {}
+        for k in range(n, 2 * n - 1):
+            r = x.power(k, field.f)
+            table[k] = [(i, c) for (i, c) in enumerate(r.coef) if c]
+        _reduction_tables[key] = table
+    return table
+
+
+class FFArray(object):
+    # N elements of one FiniteField as an N x n matrix of coefficients over
+    # Z_p. The matrix is kept column by column (column i holds the x^i
+    # coefficient of every element), so each arithmetic step below is a
+    # single pass over N machine ints rather than N FFElement operations.
+    # Fields with index arithmetic (log tables or the GF(2^n) bitmask
+    # backend) multiply element indices instead, so an array may hold its
+    # indices, its columns or both; a missing form is built on first use.
+    def __init__(self, field, columns, length, indices = None):
+        self.field = field
+        self._cols = columns
+        self._indices = indices
+        self._length = length
+    
+    @staticmethod
+    def from_elements(elements, field = None):
+        elements = list(elements)
+        if field is None:
+            if not elements:
+                raise ValueError("Cannot infer the field of an empty array")
+            field = elements[0].field
+        return FFArray.from_indices(field, [FFArray.__element(field, e).index for e in elements])
+    
+    @staticmethod
+    def from_coefficients(field, rows):
+        n = field.f.degree()
+        p = field.p
+        rows = [list(r) for r in rows]
+        for r in rows:
+            if len(r) > n:
+                raise ValueError("Row has more than {0} coefficients".format(n))
+        columns = [[(r[i] if i < len(r) else 0) % p for r in rows] for i in range(n)]
+        return FFArray(field, columns, len(rows))
+    
+    @staticmethod
+    def from_indices(field, indices):
+        indices = list(indices)
+        return FFArray(field, None, len(indices), indices)
+    
+    @property
+    def _columns(self):
+        if self._cols is None:
+            p = self.field.p
+            columns = []
+            rest = self._indices
+            for i in range(self.field.f.degree()):
+                columns.append([v % p for v in rest])
+                rest = [v // p for v in rest]
+            self._cols = columns
+        return self._cols
+    
+    @staticmethod
+    def zeros(field, length):
+        return FFArray(field, [[0] * length for i in range(field.f.degree())], length)
+    
+    def indices(self):
+        if self._indices is None:
+            p = self.field.p
+            res = [0] * self._length
+            for col in reversed(self._columns):
+                res = [v * p + c for (v, c) in zip(res, col)]
+            self._indices = res
+        return list(self._indices)
+    
+    def coefficients(self):
+        return [list(row) for row in zip(*self._columns)]
+    
+    def to_elements(self):
+        return [self.field.element_from_index(i) for i in self.indices()]
+    
+    @staticmethod
+    def __element(field, x):
+        if isinstance(x, FFElement):
+            assert x.field == field
+            return x
+        elif isinstance(x, NumberModuloP):
+            assert x.p == field.p
+            return field.const(x.n)
+        elif isinstance(x, numbers.Number):
+            return field.const(x)
+        return None
+    
+    def __lift(self, x):
+        # Returns the columns of x broadcast to the length of this array,
+        # or NotImplemented.
+        if isinstance(x, FFArray):
+            assert self.field == x.field
+            if len(x) != len(self):
+                raise ValueError("Arrays of different lengths: {0} and {1}".format(len(self), len(x)))
+            return x._columns
+        e = FFArray.__element(self.field, x)
+        if e is None:
+            return NotImplemented
+        coef = e.x.coef
+        return [[coef[i] if i < len(coef) else 0] * self._length
+                for i in range(len(self._columns))]
+    
+    def __lift_indices(self, x):
+        # Indices of x broadcast to the length of this array, or
+        # NotImplemented
+        if isinstance(x, FFArray):
+            assert self.field == x.field
+            if len(x) != len(self):
+                raise ValueError("Arrays of different lengths: {0} and {1}".format(len(self), len(x)))
+            return x.indices()
+        e = FFArray.__element(self.field, x)
+        if e is None:
+            return NotImplemented
+        return [e.index] * self._length
+    
+    def __scalar(self, x):
+        # The Z_p constant x stands for, if it is one
+        if isinstance(x, FFArray):
+            return None
+        e = FFArray.__element(self.field, x)
+        if e is None or e.x.degree() > 0:
+            return None
+        return e.x.coef[0] if e.x.degree() == 0 else 0
+    
+    def __make(self, columns):
+        return FFArray(self.field, columns, self._length)
+    
+    def __tables(self):
+        return self.field._log_tables()
+    
+    def __len__(self):
+        return self._length
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            if self._indices is not None:
+                return FFArray.from_indices(self.field, self._indices[i])
+            columns = [col[i] for col in self._columns]
+            return FFArray(self.field, columns, len(columns[0]))
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("FFArray index out of range")
+        if self._indices is not None:
+            return FFElement._from_index(self.field, self._indices[i])
+        return FFElement(self.field, PolynomialModuloP([col[i] for col in self._columns], self.field.p))
+    
+    def __iter__(self):
+        return iter(self.to_elements())
+    
+    def __xor(self, x):
+        # Sum in GF(2^n) by XOR of indices, for arrays that hold indices
+        ib = self.__lift_indices(x)
+        if ib is NotImplemented: return ib
+        return FFArray.from_indices(self.field, [a ^ b for (a, b) in zip(self._indices, ib)])
+    
+    def __add__(self, x):
+        if self.field._binary is not None and self._indices is not None:
+            return self.__xor(x)
+        y = self.__lift(x)
+        if y is NotImplemented: return y
+        p = self.field.p
+        return self.__make([[(a + b) % p for (a, b) in zip(ca, cb)]
+                            for (ca, cb) in zip(self._columns, y)])
+    
+    def __sub__(self, x):
+        if self.field._binary is not None and self._indices is not None:
+            return self.__xor(x)
+        y = self.__lift(x)
+        if y is NotImplemented: return y
+        p = self.field.p
+        return self.__make([[(a - b) % p for (a, b) in zip(ca, cb)]
+                            for (ca, cb) in zip(self._columns, y)])
+    
+    def __neg__(self):
+        if self.field.p == 2:
+            return self
+        p = self.field.p
+        return self.__make([[-a % p for a in col] for col in self._columns])
+    
+    def __mul__(self, x):
+        arith = self.field._arithmetic()
+        if arith is not None:
+            # Log tables and the GF(2^n) bitmask backend work on indices, as
+            # in FFElement
+            ib = self.__lift_indices(x)
+            if ib is NotImplemented: return ib
+            ia = self.indices()
+            tables = self.__tables()
+            if tables is not None:
+                log, exp = tables.log, tables.exp
+                return FFArray.from_indices(self.field,
+                    [exp[log[a] + log[b]] if a and b else 0 for (a, b) in zip(ia, ib)])
+            mul = arith.mul
+            return FFArray.from_indices(self.field, [mul(a, b) for (a, b) in zip(ia, ib)])
+        p = self.field.p
+        c = self.__scalar(x)
+        if c is not None:
+            return self.__make([[a * c % p for a in col] for col in self._columns])
+        y = self.__lift(x)
+        if y is NotImplemented: return y
+        return self.__make(self.__product(self._columns, y))
+    
+    def __product(self, A, B):
+        # Columnwise convolution with delayed reduction, then one batch
+        # reduction of the high columns by precomputed x^k mod f.
+        p = self.field.p
+        n = len(A)
+        prod = [[0] * self._length for k in range(2 * n - 1)]
+        for i in range(n):
+            ca = A[i]
+            if not any(ca):
+                continue
+            for j in range(n):
+                k = i + j
+                prod[k] = [s + a * b for (s, a, b) in zip(prod[k], ca, B[j])]
+        reduction = _reduction_table(self.field)
+        for k in range(n, 2 * n - 1):
+            high = prod[k]
+            for (i, r) in reduction[k]:
+                prod[i] = [s + h * r for (s, h) in zip(prod[i], high)]
+        return [[s % p for s in col] for col in prod[:n]]
+    
+    def inverse(self):
+        tables = self.__tables()
+        if tables is not None:
+            exp, log, order = tables.exp, tables.log, tables.order
+            ia = self.indices()
+            if 0 in ia:
+                raise ZeroDivisionError("FFArray contains zero")
+            return FFArray.from_indices(self.field, [exp[order - log[a]] for a in ia])
+        arith = self.field._arithmetic()
+        if arith is not None:
+            ia = self.indices()
+            if 0 in ia:
+                raise ZeroDivisionError("FFArray contains zero")
+            return FFArray.from_indices(self.field, map(arith.inverse, ia))
+        inverses = self.field.batch_inverse(self.to_elements())
+        if None in inverses:
+            raise ZeroDivisionError("FFArray contains zero")
+        return FFArray.from_elements(inverses, self.field)
+    
+    def __div__(self, x):
+        if isinstance(x, FFArray):
+            return self * x.inverse()
+        e = FFArray.__element(self.field, x)
+        if e is None:
+            return NotImplemented
+        return self * e.inverse()
+    
+    def __pow__(self, e):
+        if e < 0:
+            return self.inverse() ** (-e)
+        tables = self.__tables()
+        if tables is not None:
+            exp, log, order = tables.exp, tables.log, tables.order
+            zero_power = 1 if e == 0 else 0
+            return FFArray.from_indices(self.field,
+                [exp[log[a] * e % order] if a else zero_power for a in self.indices()])
+        arith = self.field._arithmetic()
+        if arith is not None:
+            return FFArray.from_indices(self.field, [arith.pow(a, e) for a in self.indices()])
+        res = FFArray.from_indices(self.field, [1] * self._length)
+        q = self
+        while e > 0:
+            if e & 1:
+                res = res * q
+            e >>= 1
+            if e:
+                q = q * q
+        return res
+    
+    def __radd__(self, x):
+        return self.__add__(x)
+    
+    def __rsub__(self, x):
+        return -(self.__sub__(x))
+    
+    def __rmul__(self, x):
+        return self.__mul__(x)
+    
+    def __rdiv__(self, x):
+        return self.inverse() * x
+    
+    def __eq__(self, x):
+        if not isinstance(x, FFArray):
+            return False
+        if self.field != x.field:
+            return False
+        if self._indices is not None and x._indices is not None:
+            return self._indices == x._indices
+        return self._columns == x._columns
+    
+    def __ne__(self, x):
+        return not self.__eq__(x)
+    
+    def __repr__(self):
+        return "FFArray({0})".format(repr(self.to_elements()))
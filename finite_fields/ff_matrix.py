@@ -0,0 +1,362 @@
+from finite_field import FFElement, NumberModuloP, FiniteField
+from polynomial import PolynomialModuloP
+import numbers
+
+# Packed rows under elimination have room for 2^ELIMINATION_SLACK_BITS
+# products of two residues per entry before they are reduced mod p
+ELIMINATION_SLACK_BITS = 12
+
+class _Packing(object):
+    # n nonnegative entries of at most `bits` bits as one integer, entry j
+    # at bit j * width. Sums and integer multiples of packed rows are then
+    # entrywise, as long as no entry outgrows its slot.
+    def __init__(self, n, bits):
+        self.n = n
+        self.digits = max((bits + 3) // 4, 1)
+        self.width = 4 * self.digits
+        self.mask = (1 << self.width) - 1
+        self._format = '%0' + str(self.digits) + 'x'
+    
+    def pack(self, values):
+        if not values:
+            return 0
+        return int(''.join([self._format % v for v in reversed(values)]), 16)
+    
+    def unpack(self, x):
+        if self.n == 0:
+            return []
+        d = self.digits
+        s = ('%x' % x).rjust(self.n * d, '0')
+        return [int(s[i - d:i], 16) for i in range(len(s), 0, -d)]
+    
+    def entry(self, x, j):
+        return (x >> (j * self.width)) & self.mask
+
+
+class FFMatrix(object):
+    # Matrix over Z_p (field is the prime p, entries are ints) or over a
+    # FiniteField (entries are FFElements). Entries are stored by index.
+    #
+    # For elimination and products a row is packed into one integer per
+    # coefficient of x^t, the coefficient planes of FFArray: adding c times
+    # one row to another is then a few big-integer multiply-adds (k^2 for
+    # GF(p^k), through the matrix of multiplication by c), and entries are
+    # only reduced mod p when their slots are about to overflow.
+    def __init__(self, field, rows):
+        self.field = field
+        if isinstance(field, FiniteField):
+            (self.p, self._k) = (field.p, field.f.degree())
+        else:
+            (self.p, self._k) = (field, 1)
+        self._rows = [[self.__index(x) for x in row] for row in rows]
+        if len(set(len(r) for r in self._rows)) > 1:
+            raise ValueError("Matrix rows must have the same length")
+        self.nrows = len(self._rows)
+        self.ncols = len(self._rows[0]) if self._rows else 0
+    
+    @staticmethod
+    def identity(field, n):
+        return FFMatrix(field, [[1 if i == j else 0 for j in range(n)] for i in range(n)])
+    
+    @staticmethod
+    def zeros(field, m, n):
+        return FFMatrix(field, [[0] * n for i in range(m)])
+    
+    def __make(self, rows):
+        # rows are already indices
+        result = FFMatrix(self.field, [])
+        result._rows = rows
+        result.nrows = len(rows)
+        result.ncols = len(rows[0]) if rows else 0
+        return result
+    
+    def __index(self, x):
+        if isinstance(x, FFElement):
+            if self._k == 1 and not isinstance(self.field, FiniteField):
+                assert x.field.p == self.p and x.field.f.degree() == 1
+            else:
+                assert x.field == self.field
+            return x.index
+        elif isinstance(x, NumberModuloP):
+            assert x.p == self.p
+            return x.n
+        elif isinstance(x, numbers.Number):
+            return int(x) % self.p
+        raise ValueError("Matrix entries must be field elements or integers")
+    
+    def __element(self, i):
+        if isinstance(self.field, FiniteField):
+            return self.field.element_from_index(i)
+        return i
+    
+    @property
+    def shape(self):
+        return (self.nrows, self.ncols)
+    
+    def __getitem__(self, ij):
+        if isinstance(ij, tuple):
+            (i, j) = ij
+            return self.__element(self._rows[i][j])
+        return [self.__element(v) for v in self._rows[ij]]
+    
+    def rows(self):
+        return [[self.__element(v) for v in row] for row in self._rows]
+    
+    def transpose(self):
+        return self.__make([list(col) for col in zip(*self._rows)])
+    
+    # Index arithmetic on single entries
+    
+    def __mul_index(self, a, b):
+        if self._k == 1:
+            return a * b % self.p
+        return (self.field.element_from_index(a) * self.field.element_from_index(b)).index
+    
+    def __neg_index(self, a):
+        if self._k == 1:
+            return -a % self.p
+        return (-self.field.element_from_index(a)).index
+    
+    def __inverse_index(self, a):
+        if self._k == 1:
+            return pow(a, self.p - 2, self.p)
+        return self.field.element_from_index(a).inverse().index
+    
+    def __times(self, c):
+        # k x k matrix over Z_p of multiplication by the element of index c:
+        # column s holds the coefficients of c x^s mod f
+        p, k = self.p, self._k
+        if k == 1:
+            return [[c]]
+        field = self.field
+        x = PolynomialModuloP([0, 1], p)
+        y = field._polynomial_of_index(c)
+        columns = []
+        for s in range(k):
+            coef = list(y.coef)
+            columns.append(coef + [0] * (k - len(coef)))
+            y = (y * x) % field._reducer
+        return [list(r) for r in zip(*columns)]
+    
+    # Packed coefficient planes
+    
+    def __planes(self, row, packing):
+        p = self.p
+        planes = []
+        rest = row
+        for t in range(self._k):
+            planes.append(packing.pack([v % p for v in rest]))
+            rest = [v // p for v in rest]
+        return planes
+    
+    def __unplanes(self, planes, packing):
+        p = self.p
+        row = [0] * packing.n
+        for plane in reversed(planes):
+            row = [v * p + c % p for (v, c) in zip(row, packing.unpack(plane))]
+        return row
+    
+    def __reduce(self, planes, packing):
+        p = self.p
+        return [packing.pack([c % p for c in packing.unpack(plane)]) for plane in planes]
+    
+    def __entry(self, planes, packing, j):
+        p = self.p
+        index = 0
+        for plane in reversed(planes):
+            index = index * p + packing.entry(plane, j) % p
+        return index
+    
+    @staticmethod
+    def __apply(m, planes):
+        result = []
+        for mt in m:
+            acc = 0
+            for (c, plane) in zip(mt, planes):
+                if c:
+                    acc += c * plane
+            result.append(acc)
+        return result
+    
+    # Arithmetic
+    
+    def __add__(self, x):
+        if not isinstance(x, FFMatrix):
+            return NotImplemented
+        return self.__entrywise(x, 1)
+    
+    def __sub__(self, x):
+        if not isinstance(x, FFMatrix):
+            return NotImplemented
+        return self.__entrywise(x, self.p - 1)
+    
+    def __entrywise(self, x, c):
+        # self + c x
+        if self.field != x.field:
+            raise ValueError("Matrices over different fields")
+        if self.shape != x.shape:
+            raise ValueError("Matrices of different shapes: {0} and {1}".format(self.shape, x.shape))
+        packing = _Packing(self.ncols, (self.p * self.p).bit_length())
+        rows = []
+        for (a, b) in zip(self._rows, x._rows):
+            planes = [u + c * v for (u, v) in zip(self.__planes(a, packing), self.__planes(b, packing))]
+            rows.append(self.__unplanes(planes, packing))
+        return self.__make(rows)
+    
+    def __neg__(self):
+        return FFMatrix.zeros(self.field, self.nrows, self.ncols) - self
+    
+    def __mul__(self, x):
+        if isinstance(x, FFMatrix):
+            return self.__product(x)
+        c = self.__index(x)
+        times = self.__times(c)
+        packing = _Packing(self.ncols, (self._k * (self.p - 1) ** 2).bit_length())
+        return self.__make([self.__unplanes(self.__apply(times, self.__planes(row, packing)), packing)
+                            for row in self._rows])
+    
+    def __rmul__(self, x):
+        return self.__mul__(x)
+    
+    def __product(self, x):
+        if self.field != x.field:
+            raise ValueError("Matrices over different fields")
+        if self.ncols != x.nrows:
+            raise ValueError("Cannot multiply {0} by {1} matrix".format(self.shape, x.shape))
+        p, k = self.p, self._k
+        packing = _Packing(x.ncols, max(self.ncols * k * (p - 1) ** 2, 1).bit_length())
+        b = [self.__planes(row, packing) for row in x._rows]
+        times = {}
+        rows = []
+        for row in self._rows:
+            acc = [0] * k
+            for (c, planes) in zip(row, b):
+                if not c:
+                    continue
+                if c not in times:
+                    times[c] = self.__times(c)
+                acc = [u + v for (u, v) in zip(acc, self.__apply(times[c], planes))]
+            rows.append(self.__unplanes(acc, packing))
+        return self.__make(rows)
+    
+    def __eq__(self, x):
+        if not isinstance(x, FFMatrix):
+            return False
+        return self.field == x.field and self._rows == x._rows
+    
+    def __ne__(self, x):
+        return not self.__eq__(x)
+    
+    # Elimination
+    
+    def __eliminate(self, rows, ncols, pivot_columns):
+        # Gauss-Jordan elimination of the index rows, of length ncols, with
+        # pivots taken from the first pivot_columns columns. Returns the
+        # reduced rows, the pivot columns and the product of the pivots
+        # times the sign of the row permutation.
+        p, k = self.p, self._k
+        limit = 1 << ELIMINATION_SLACK_BITS
+        packing = _Packing(ncols, (p - 1 + limit * (p - 1) ** 2).bit_length())
+        planes = [self.__planes(r, packing) for r in rows]
+        counts = [0] * len(planes)
+        pivots = []
+        det = 1
+        r = 0
+        for col in range(pivot_columns):
+            if r == len(planes):
+                break
+            pivot = None
+            for i in range(r, len(planes)):
+                v = self.__entry(planes[i], packing, col)
+                if v:
+                    pivot = i
+                    break
+            if pivot is None:
+                continue
+            if pivot != r:
+                (planes[r], planes[pivot]) = (planes[pivot], planes[r])
+                (counts[r], counts[pivot]) = (counts[pivot], counts[r])
+                det = self.__neg_index(det)
+            det = self.__mul_index(det, v)
+            # Scale the pivot row to a leading 1, reduced
+            pivot_row = self.__reduce(planes[r], packing)
+            pivot_row = self.__reduce(self.__apply(self.__times(self.__inverse_index(v)), pivot_row), packing)
+            planes[r] = pivot_row
+            counts[r] = 0
+            for i in range(len(planes)):
+                if i == r:
+                    continue
+                u = self.__entry(planes[i], packing, col)
+                if not u:
+                    continue
+                if counts[i] + k > limit:
+                    planes[i] = self.__reduce(planes[i], packing)
+                    counts[i] = 0
+                update = self.__apply(self.__times(self.__neg_index(u)), pivot_row)
+                planes[i] = [a + b for (a, b) in zip(planes[i], update)]
+                counts[i] += k
+            pivots.append(col)
+            r += 1
+        return ([self.__unplanes(pl, packing) for pl in planes], pivots, det)
+    
+    def rref(self):
+        # (reduced row echelon form, pivot columns)
+        (rows, pivots, _) = self.__eliminate(self._rows, self.ncols, self.ncols)
+        return (self.__make(rows), pivots)
+    
+    def rank(self):
+        return len(self.rref()[1])
+    
+    def determinant(self):
+        if self.nrows != self.ncols:
+            raise ValueError("Determinant of a non-square matrix")
+        (_, pivots, det) = self.__eliminate(self._rows, self.ncols, self.ncols)
+        return self.__element(det if len(pivots) == self.nrows else 0)
+    
+    def inverse(self):
+        n = self.nrows
+        if n != self.ncols:
+            raise ValueError("Inverse of a non-square matrix")
+        augmented = [row + [1 if i == j else 0 for j in range(n)] for (i, row) in enumerate(self._rows)]
+        (rows, pivots, _) = self.__eliminate(augmented, 2 * n, n)
+        if len(pivots) < n:
+            raise ValueError("Matrix is not invertible")
+        return self.__make([row[n:] for row in rows])
+    
+    def nullspace(self):
+        # Basis of {v : self * v = 0}, as a list of vectors
+        (rref, pivots) = self.rref()
+        basis = []
+        for free in range(self.ncols):
+            if free in pivots:
+                continue
+            v = [0] * self.ncols
+            v[free] = 1
+            for (i, col) in enumerate(pivots):
+                v[col] = self.__neg_index(rref._rows[i][free])
+            basis.append([self.__element(c) for c in v])
+        return basis
+    
+    def solve(self, b):
+        # A solution x of self * x = b, for b a vector or a matrix; free
+        # variables are set to zero
+        vector = not isinstance(b, FFMatrix)
+        if vector:
+            b = FFMatrix(self.field, [[c] for c in b])
+        if b.nrows != self.nrows:
+            raise ValueError("Right-hand side has {0} rows, expected {1}".format(b.nrows, self.nrows))
+        n = self.ncols
+        augmented = [row + rhs for (row, rhs) in zip(self._rows, b._rows)]
+        (rows, pivots, _) = self.__eliminate(augmented, n + b.ncols, n)
+        if any(any(row[n:]) for row in rows[len(pivots):]):
+            raise ValueError("System has no solution")
+        x = [[0] * b.ncols for i in range(n)]
+        for (i, col) in enumerate(pivots):
+            x[col] = rows[i][n:]
+        x = self.__make(x)
+        if vector:
+            return [x[i, 0] for i in range(n)]
+        return x
+    
+    def __repr__(self):
+        return "FFMatrix({0})".format(repr(self.rows()))
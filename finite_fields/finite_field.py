@@ -1,9 +1,41 @@
-from polynomial import Polynomial
+from polynomial import Polynomial, PolynomialModuloP, SparsePolynomial, ModulusReducer, FrobeniusMap, gcdex, HALF_GCD_THRESHOLD
+from binary_field import BinaryFieldArithmetic
+from number_theory import factor_integer, _perfect_power
+import binary_field
+import irreducibles
+from array import array
 import math
-from random import seed, randint
+from random import seed, randint, Random
+import multiprocessing
 import numbers
+import weakref
 seed()
 
+# Candidates tested per work unit by find_irreducible_polynomial
+SEARCH_BATCH_SIZE = 8
+
+# Fields with q <= LOG_TABLE_AUTO_SIZE get log/Zech tables by default, and no
+# field builds tables larger than LOG_TABLE_MEMORY_LIMIT bytes.
+LOG_TABLE_AUTO_SIZE = 1 << 16
+LOG_TABLE_MEMORY_LIMIT = 64 * 1024 * 1024
+
+# Residues 0 .. INTERNED_CONSTANTS - 1 of NumberModuloP and the constants of
+# every FiniteField below it are shared instances
+INTERNED_CONSTANTS = 256
+
+
+# Fields rebuilt by unpickling or by serialization, keyed by (p, modulus
+# coefficients), so that everything loaded over the same modulus shares one
+# FiniteField and its tables
+_restored_fields = weakref.WeakValueDictionary()
+
+def _restore_field(p, coef, log_tables = None):
+    key = (p, tuple(coef))
+    field = _restored_fields.get(key)
+    if field is None:
+        field = FiniteField(PolynomialModuloP(coef, p), p, log_tables)
+        _restored_fields[key] = field
+    return field
 
 # Code for inversion lazily translated from Wikipedia
 
@@ -22,9 +54,33 @@ def invert_mod_n(x, n):
         t += n
     return t
 
+def batch_invert_mod_n(xs, n):
+    # Montgomery's trick: one invert_mod_n and about 3 len(xs) products.
+    # Entries that are zero mod n come back as None.
+    xs = [x % n for x in xs]
+    prefix = []
+    acc = 1
+    for x in xs:
+        if x:
+            acc = acc * x % n
+        prefix.append(acc)
+    inv = invert_mod_n(acc, n)
+    if inv is None:
+        # Some entry shares a factor with n; only invert_mod_n can tell which
+        return [invert_mod_n(x, n) if x else None for x in xs]
+    result = [None] * len(xs)
+    for i in range(len(xs) - 1, -1, -1):
+        if xs[i]:
+            result[i] = inv * (prefix[i - 1] if i > 0 else 1) % n
+            inv = inv * xs[i] % n
+    return result
+
 def invert_mod_f(x, f):
     if x == 0:
         return None
+    if isinstance(f, PolynomialModuloP) or f.degree() >= HALF_GCD_THRESHOLD:
+        (g, s, t) = gcdex(x, f)
+        return s if g.degree() == 0 else None
     #t=polynomial.Polynomial([0]); newt=polynomial.Polynomial([1])
     t=0; newt=1
     r=f; newr=x
@@ -53,242 +109,556 @@ def naive_factor(n):
     return factors
 
 def poly_gcd(f, g):
+    # Up to a constant factor; see polynomial.gcdex for large operands. A
+    # sparse operand is first reduced modulo the other one.
+    if isinstance(f, SparsePolynomial):
+        f = f % g
+    if isinstance(g, SparsePolynomial):
+        g = g % f
+    if isinstance(f, PolynomialModuloP) or max(f.degree(), g.degree()) >= HALF_GCD_THRESHOLD:
+        return gcdex(f, g, False)[0]
     if g.degree() > f.degree():
         (f, g) = (g, f)
     while g != 0:
-        h = f // g
-        (f, g) = (g, f - h * g)
+        (f, g) = (g, f % g)
     return f
 
 def is_polynomial_irreducible(poly):
+    # Ben-Or's test: poly has no factor of degree k iff
+    # gcd(poly, x^(p^k) - x) = 1, and it is enough to check k <= n/2.
+    # x^(p^k) mod poly is obtained from x^(p^(k-1)) by one Frobenius
+    # powering, so x^(p^k) - x is never expanded.
     n = poly.degree()
     if n <= 0:
         return False
-    p = poly.coef[0].p
-    fc = naive_factor(n)
-    for i in range(len(fc)):
-        n_i = n / fc[i][0]
-        # WARNING: Slow implementation ahead
-        pol_i = Polynomial([0, -1] + [0] * (p ** n_i - 2) + [1])
-        g = poly_gcd(poly, pol_i)
+    if not isinstance(poly, PolynomialModuloP):
+        poly = PolynomialModuloP(poly, poly.coef[0].p)
+    p = poly.p
+    if p == 2:
+        return binary_field.is_irreducible(_bits_of(poly))
+    if n > 1 and poly.coef[0] == 0:
+        return False
+    x = PolynomialModuloP([0, 1], p)
+    h = x
+    reducer = ModulusReducer(poly)
+    frobenius = None
+    for k in range(1, n // 2 + 1):
+        if frobenius is not None:
+            h = frobenius(h)
+        else:
+            h = h.power(p, reducer)
+            # Most candidates fail at k = 1; for the others, switch to the
+            # Frobenius matrix once it beats powering on the remaining steps
+            remaining = n // 2 - k
+            if 6 * p.bit_length() * remaining > 5 * (n + remaining):
+                frobenius = FrobeniusMap(poly, p, h)
+        g = poly_gcd(poly, h - x)
         if g.degree() > 0:
             return False
-    pol_n = Polynomial([0, -1] + [0] * (p ** n - 2) + [1])
-    if pol_n % poly != 0:
-        return False
     return True
 
+def _search_batch(args):
+    # Work unit of find_irreducible_polynomial: the candidates of one batch
+    # depend only on (random_seed, batch), so results do not depend on how
+    # batches are spread over processes.
+    (p, n, random_seed, batch) = args
+    rng = Random((random_seed << 64) + batch)
+    for i in range(SEARCH_BATCH_SIZE):
+        coef = [rng.randrange(p) for j in range(n)] + [1]
+        if is_polynomial_irreducible(PolynomialModuloP(coef, p)):
+            return coef
+    return None
+
+def find_irreducible_polynomial(p, n, processes = None, random_seed = None):
+    # Uniformly random monic irreducible of degree n over Z_p. With the
+    # same random_seed the result is the same for any number of processes:
+    # it is the first irreducible of the lowest batch that has one.
+    if random_seed is None:
+        random_seed = randint(0, 2 ** 64)
+    if processes is None or processes <= 1:
+        batch = 0
+        while True:
+            coef = _search_batch((p, n, random_seed, batch))
+            if coef is not None:
+                return PolynomialModuloP(coef, p)
+            batch += 1
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = {}
+        (current, next_batch) = (0, 0)
+        while True:
+            while next_batch < current + 2 * processes:
+                pending[next_batch] = pool.apply_async(_search_batch, ((p, n, random_seed, next_batch),))
+                next_batch += 1
+            coef = pending.pop(current).get()
+            if coef is not None:
+                return PolynomialModuloP(coef, p)
+            current += 1
+    finally:
+        # Cancels whatever the other workers are still testing
+        pool.terminate()
+        pool.join()
+
+def _bits_of(poly):
+    # Polynomial over Z_2 as an int with bit i holding the coefficient of x^i
+    bits = 0
+    for c in reversed(poly.coef):
+        bits = (bits << 1) | c
+    return bits
+
+def _coefficient_field(poly):
+    for c in poly.coef:
+        if isinstance(c, FFElement):
+            return c.field
+    raise ValueError("Polynomial has no coefficients in a finite field")
+
 def root_of_polynomial(poly, retries = 100):
+    # The roots of poly in GF(q) are those of gcd(poly, x^q - x); x^q - x is
+    # kept sparse and reduced modulo poly by repeated squaring.
     n = poly.degree()
     if n <= 0:
         return None
-    field = poly.coef[0].field
-    p = field.p
-    q = field.q
-    s = lambda ls: Polynomial(map(lambda x: field.const(x), ls))
-    p1 = s([0, -1] + [0] * (q - 2) + [1])
-    f1 = poly_gcd(p1, poly)
+    field = _coefficient_field(poly)
+    f1 = poly_gcd(SparsePolynomial([(field.q, field.one()), (1, -field.one())]), poly)
     if f1.degree() < 1:
         return None
-    return root_of_separable(f1)
+    return root_of_separable(f1, retries)
+
+def _splitting_polynomial(r, poly, d = 1):
+    # Cantor-Zassenhaus splitting of a product of distinct irreducibles of
+    # degree d: for odd q, r^((q^d-1)/2) is 1 modulo about half of them; in
+    # characteristic 2 the trace r + r^2 + ... + r^(q^d/2) is 0 modulo about
+    # half of them.
+    ff = _coefficient_field(poly)
+    if ff.p == 2:
+        s = r % poly
+        t = s
+        for i in range(ff.f.degree() * d - 1):
+            t = t.power(2, poly)
+            s = s + t
+        return s
+    return r.power((ff.q ** d - 1) // 2, poly) - 1
 
 def root_of_separable(poly, retries = 100):
-    # Cantor-Zassenhaus algorithm
+    # Equal-degree splitting of a product of distinct linear factors
     n = poly.degree()
     if n < 1:
         return None
     elif n == 1:
         return (- poly.coef[0]) / poly.coef[1]
-    ff = poly.coef[0].field
-    p = ff.p
+    ff = _coefficient_field(poly)
     q = ff.q
-    n1 = ff.f.degree()
     found_poly = False
     while not found_poly and retries > 0:
-        r = Polynomial([ff.element_from_polynomial(Polynomial([randint(0, p-1) for i in range(n1)])) for j in range(n)])
-        # WARNING: Very slow implementation, fix soon
-        #s = (r ** ((p-1)/2)) % poly
-        s = r.power((p-1)/2, poly)
-        p1 = poly_gcd(s + 1, poly)
+        r = Polynomial([ff.element_from_index(randint(0, q - 1)) for j in range(n)])
         retries -= 1
+        if r.degree() < 1:
+            continue
+        p1 = poly_gcd(_splitting_polynomial(r, poly), poly)
         found_poly = p1.degree() > 0 and p1.degree() < n
-    if retries == 0:
+    if not found_poly:
         return None
-    return root_of_separable(p1)
+    return root_of_separable(p1, retries)
+
+class PrimeField(object):
+    # Z_p as a context shared by every NumberModuloP with modulus p. There is
+    # one instance per p; it holds the modulus and the interned residues
+    # below INTERNED_CONSTANTS.
+    __slots__ = ('p', '_small')
+    _instances = {}
+    
+    def __new__(cls, p):
+        field = cls._instances.get(p)
+        if field is None:
+            field = object.__new__(cls)
+            field.p = p
+            field._small = [NumberModuloP._make(n, field) for n in range(min(p, INTERNED_CONSTANTS))]
+            cls._instances[p] = field
+        return field
+    
+    def __call__(self, n):
+        return NumberModuloP(n, self)
+    
+    def __reduce__(self):
+        return (PrimeField, (self.p,))
+    
+    def __repr__(self):
+        return "Z_{0}".format(self.p)
 
 class NumberModuloP(object):
+    # Immutable residue n mod p; p is read from the shared PrimeField
+    __slots__ = ('_n', '_field')
+    
     def __lift(self, x):
         if isinstance(x, NumberModuloP):
-            assert self.p == x.p
+            assert self._field is x._field
             return x
         elif isinstance(x, numbers.Number):
-            return NumberModuloP(x, self.p)
+            return NumberModuloP(x, self._field)
         else:
             return NotImplemented
     
-    def __init__(self, n, p):
-        self.p = p
-        self.n = n % p
+    def __new__(cls, n, p):
+        field = p if isinstance(p, PrimeField) else PrimeField(p)
+        n %= field.p
+        if n < INTERNED_CONSTANTS:
+            return field._small[n]
+        return cls._make(n, field)
+    
+    @classmethod
+    def _make(cls, n, field):
+        # n must already be reduced
+        result = object.__new__(cls)
+        result._n = n
+        result._field = field
+        return result
+    
+    @property
+    def n(self):
+        return self._n
+    
+    @property
+    def p(self):
+        return self._field.p
+    
+    @property
+    def field(self):
+        return self._field
+    
+    def __int__(self):
+        return self._n
+    
+    def __hash__(self):
+        return hash(self._n)
+    
+    def __reduce__(self):
+        return (NumberModuloP, (self._n, self._field.p))
     
     def __add__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return NumberModuloP(self.n + y.n, self.p)
+        if y is NotImplemented: return y
+        return NumberModuloP(self._n + y._n, self._field)
     
     def __sub__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return NumberModuloP(self.n - y.n, self.p)
+        if y is NotImplemented: return y
+        return NumberModuloP(self._n - y._n, self._field)
     
     def __mul__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return NumberModuloP(self.n * y.n, self.p)
+        if y is NotImplemented: return y
+        return NumberModuloP(self._n * y._n, self._field)
     
     def __div__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return NumberModuloP(self.n * invert_mod_n(y.n, y.p), self.p)
+        if y is NotImplemented: return y
+        return NumberModuloP(self._n * invert_mod_n(y._n, self._field.p), self._field)
     
     def __floordiv__(self, x):
         return self / x
     
     def __eq__(self, x):
-        y = self.__lift(x)
-        if y == NotImplemented: return y
-        return self.n == y.n
+        # Residues mod different primes are unequal, and plain numbers are
+        # compared unreduced, so that only the representative in [0, p) is
+        # equal (and hashes alike)
+        if isinstance(x, NumberModuloP):
+            return self._field.p == x._field.p and self._n == x._n
+        if isinstance(x, numbers.Number):
+            return self._n == x
+        return NotImplemented
     
     def __ne__(self, x):
-        y = self.__lift(x)
-        if y == NotImplemented: return y
-        return self.n != y.n
+        eq = self.__eq__(x)
+        if eq is NotImplemented: return eq
+        return not eq
     
     def __neg__(self):
-        return NumberModuloP(-self.n, self.p)
+        return NumberModuloP(-self._n, self._field)
     
     def __radd__(self, x):
-        return NumberModuloP(self.n + x, self.p)
+        return NumberModuloP(self._n + x, self._field)
     
     def __rsub__(self, x):
-        return NumberModuloP(x - self.n, self.p)
+        return NumberModuloP(x - self._n, self._field)
     
     def __rmul__(self, x):
-        return NumberModuloP(self.n * x, self.p)
+        return NumberModuloP(self._n * x, self._field)
     
     def __rdiv__(self, x):
-        return NumberModuloP(x * invert_mod_n(self.n, self.p), self.p)
+        return NumberModuloP(x * invert_mod_n(self._n, self._field.p), self._field)
     
     def __rfloordiv__(self, x):
-        return NumberModuloP(x, self.p) // self
+        return NumberModuloP(x, self._field) // self
     
     def __pow__(self, e):
-        return NumberModuloP(pow(self.n, e, self.p), self.p)
+        return NumberModuloP(pow(self._n, e, self._field.p), self._field)
     
     def __repr__(self):
         #return "{0} % {1}".format(self.n, self.p)
-        return str(self.n)
+        return str(self._n)
 
 class FFElement(object):
+    # Immutable element of field. It is known by its polynomial _x, its index
+    # or both; whichever is missing is filled in on first use.
+    __slots__ = ('_x', '_index', '_field')
+    
     def __lift(self, x):
         if isinstance(x, FFElement):
-            assert self.field == x.field
+            if x._field is not self._field:
+                assert self._field == x._field
             return x
         elif isinstance(x, NumberModuloP):
-            assert self.field.p == x.p
-            return self.field.const(x.n)
+            assert self._field.p == x.p
+            return self._field.const(x.n)
         elif isinstance(x, numbers.Number):
-            return self.field.const(x)
+            return self._field.const(x)
         else:
             return NotImplemented
     
     def __init__(self, field, val):
-        self.x = val
-        self.field = field
+        self._x = val
+        self._index = None
+        self._field = field
+    
+    @classmethod
+    def _from_index(cls, field, index):
+        result = cls.__new__(cls)
+        result._x = None
+        result._index = index
+        result._field = field
+        return result
+    
+    @property
+    def field(self):
+        return self._field
+    
+    @property
+    def x(self):
+        if self._x is None:
+            self._x = self._field._polynomial_of_index(self._index)
+        return self._x
+    
+    @property
+    def index(self):
+        # The coefficients read as base-p digits: sum(c_i * p^i)
+        if self._index is None:
+            self._index = self._field._index_of_polynomial(self._x)
+        return self._index
+    
+    def __hash__(self):
+        return hash(self.index)
+    
+    def __getstate__(self):
+        return (self._field, self.index)
+    
+    def __setstate__(self, state):
+        (self._field, self._index) = state
+        self._x = None
     
     def __add__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return FFElement(self.field, (self.x + y.x) % self.field.f)
+        if y is NotImplemented: return y
+        field = self._field
+        arith = field._arithmetic()
+        if arith is not None:
+            return FFElement._from_index(field, arith.add(self.index, y.index))
+        return FFElement(field, self.x + y.x)
     
     def __sub__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return FFElement(self.field, (self.x + self.field.f - y.x) % self.field.f)
+        if y is NotImplemented: return y
+        field = self._field
+        arith = field._arithmetic()
+        if arith is not None:
+            return FFElement._from_index(field, arith.add(self.index, arith.neg(y.index)))
+        return FFElement(field, self.x - y.x)
     
     def __mul__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return FFElement(self.field, (self.x * y.x) % self.field.f)
+        if y is NotImplemented: return y
+        field = self._field
+        arith = field._arithmetic()
+        if arith is not None:
+            return FFElement._from_index(field, arith.mul(self.index, y.index))
+        return FFElement(field, (self.x * y.x) % field._reducer)
     
     def __neg__(self):
-        return FFElement(self.field, Polynomial(map(lambda x: -x, self.x.coef)))
+        field = self._field
+        arith = field._arithmetic()
+        if arith is not None:
+            return FFElement._from_index(field, arith.neg(self.index))
+        return FFElement(field, -self.x)
+    
+    def inverse(self):
+        field = self._field
+        arith = field._arithmetic()
+        if arith is not None:
+            return FFElement._from_index(field, arith.inverse(self.index))
+        inv = invert_mod_f(self.x, field.f)
+        if inv is None:
+            raise ZeroDivisionError("zero has no inverse in " + repr(field))
+        return FFElement(field, inv)
     
     def __div__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
-        return self * FFElement(self.field, invert_mod_f(y.x, self.field.f))
+        if y is NotImplemented: return y
+        field = self._field
+        arith = field._arithmetic()
+        if arith is not None:
+            return FFElement._from_index(field, arith.div(self.index, y.index))
+        return self * y.inverse()
     
     def __floordiv__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
+        if y is NotImplemented: return y
         return self / y
     
     def __eq__(self, x):
         try:
             y = self.__lift(x)
-            if y == NotImplemented: return y
+            if y is NotImplemented: return y
         except AssertionError:
             return False
+        if self._index is not None and y._index is not None:
+            return self._index == y._index
         return self.x == y.x
     
+    def __ne__(self, x):
+        eq = self.__eq__(x)
+        if eq is NotImplemented: return eq
+        return not eq
+    
     def __radd__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
+        if y is NotImplemented: return y
         return self + y
     
     def __rsub__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
+        if y is NotImplemented: return y
         return y - self
     
     def __rmul__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
+        if y is NotImplemented: return y
         return y * self
     
     def __rdiv__(self, x):
         y = self.__lift(x)
-        if y == NotImplemented: return y
+        if y is NotImplemented: return y
         return y / self
     
     def __pow__(self, n):
-        res = self.field.one()
-        n1 = n
-        q = self
-        while n1 > 0:
-            if n1 % 2 != 0:
-               res = res * q
-            n1 /= 2
-            q = q * q
-        return res
+        field = self._field
+        arith = field._arithmetic()
+        if arith is not None:
+            return FFElement._from_index(field, arith.pow(self.index, n))
+        if n < 0:
+            return self.inverse() ** (-n)
+        if n >= field.p and FrobeniusMap.pays_off(n, field.p, field.f.degree()):
+            return FFElement(field, self.x.power(n, field._frobenius()))
+        return FFElement(field, self.x.power(n, field._reducer))
+    
+    def order(self):
+        # Multiplicative order
+        from discrete_log import multiplicative_order
+        return multiplicative_order(self)
+    
+    def log(self, base = None):
+        # k with base^k = self, base defaulting to field.primitive_element()
+        from discrete_log import discrete_log
+        return discrete_log(self, base if base is not None else self._field.primitive_element())
     
     def __repr__(self):
-        return "{0}_{1}".format(repr(self.x), self.field.p)
+        return "{0}_{1}".format(repr(self.x), self._field.p)
+
+class _LogTables(object):
+    # Discrete log tables with respect to a primitive element g, all indexed
+    # by element index: log[a] = k and exp[k] = a for a = g^k, and the Zech
+    # logarithms zech[k] = log(1 + g^k) (-1 where 1 + g^k = 0). exp is stored
+    # twice over so that sums of two logs need no reduction.
+    def __init__(self, q, log, exp, zech):
+        self.q = q
+        self.order = q - 1
+        self.log = log
+        self.exp = exp
+        self.zech = zech
+        self.minus_one = 0 if q % 2 == 0 else (q - 1) // 2
+    
+    @staticmethod
+    def memory_estimate(q):
+        return 4 * q * array('i').itemsize
+    
+    def add(self, a, b):
+        if a == 0: return b
+        if b == 0: return a
+        log = self.log
+        la = log[a]
+        z = self.zech[(log[b] - la) % self.order]
+        if z < 0:
+            return 0
+        return self.exp[la + z]
+    
+    def neg(self, a):
+        if a == 0:
+            return 0
+        return self.exp[self.log[a] + self.minus_one]
+    
+    def mul(self, a, b):
+        if a == 0 or b == 0:
+            return 0
+        return self.exp[self.log[a] + self.log[b]]
+    
+    def inverse(self, a):
+        if a == 0:
+            raise ZeroDivisionError("zero has no inverse")
+        return self.exp[self.order - self.log[a]]
+    
+    def div(self, a, b):
+        if b == 0:
+            raise ZeroDivisionError("division by zero in a finite field")
+        if a == 0:
+            return 0
+        return self.exp[self.log[a] - self.log[b] + self.order]
+    
+    def pow(self, a, n):
+        if a == 0:
+            if n < 0:
+                raise ZeroDivisionError("zero has no inverse")
+            return 1 if n == 0 else 0
+        return self.exp[self.log[a] * n % self.order]
 
 class FiniteField(object):
-    def __init__(self, poly, p):
+    def __init__(self, poly, p, log_tables = None):
         self.p = p
-        makemodp = lambda t: t if isinstance(t, NumberModuloP) else NumberModuloP(t, self.p)
-        self.f = Polynomial(map(lambda x: makemodp(x), poly.coef))
+        self.f = PolynomialModuloP(poly, p)
         self.q = pow(p, poly.degree())
-        if not is_polynomial_irreducible(self.f):
+        if not irreducibles.contains(self.f) and not is_polynomial_irreducible(self.f):
             raise ValueError("The polynomial provided is not irreducible")
+        self._reducer = ModulusReducer(self.f)
+        # GF(2^n) elements are worked on as bitmasks (their index) unless
+        # log tables take over
+        self._binary = BinaryFieldArithmetic(_bits_of(self.f)) if p == 2 else None
+        # log_tables: None builds tables for fields up to LOG_TABLE_AUTO_SIZE,
+        # True for any field within LOG_TABLE_MEMORY_LIMIT, False never.
+        if log_tables is None:
+            log_tables = self.q <= LOG_TABLE_AUTO_SIZE
+        self._tables = None
+        self._tables_pending = log_tables and \
+            _LogTables.memory_estimate(self.q) <= LOG_TABLE_MEMORY_LIMIT
+        self._frobenius_map = None
+        self._order_factors = None
+        self._primitive_index = None
+        # The index of the constant c is c
+        self._constants = [FFElement._from_index(self, c) for c in range(min(p, INTERNED_CONSTANTS))]
     
     @staticmethod
-    def of_size(q, p=None):
+    def of_size(q, p=None, processes=None, random_seed=None):
         if p == None:
-            # WARNING: SLOW CODE AHEAD
-            (p, n) = naive_factor(q)[0];
+            (p, n) = _perfect_power(q)
+            if irreducibles.lookup(p, n) is None:
+                # WARNING: SLOW CODE AHEAD
+                (p, n) = factor_integer(q)[0];
         else:
             n = 0
             q1 = q
@@ -296,50 +666,190 @@ class FiniteField(object):
                 q1 /= p
                 n += 1
             if q1 != 1: raise ValueError("q should be equal to p^n for some n")
-        found_poly = False
-        while not found_poly:
-            # WARNING: BIASED RANDOM GENERATOR BELOW
-            poly = Polynomial([NumberModuloP(randint(0, p-1), p) for i in range(n + 1)])
-            if poly.degree() == n:
-                found_poly = is_polynomial_irreducible(poly)
+        if n == 1:
+            # Every monic linear polynomial is irreducible
+            return FiniteField(PolynomialModuloP([0, 1], p), p)
+        poly = irreducibles.lookup(p, n)
+        if poly is not None:
+            return FiniteField(poly, p)
+        poly = find_irreducible_polynomial(p, n, processes, random_seed)
+        irreducibles.register(poly)
         return FiniteField(poly, p)
     
     def zero(self):
-        return FFElement(self, Polynomial([NumberModuloP(0, self.p)]))
+        return self._constants[0]
     
     def one(self):
-        return FFElement(self, Polynomial([NumberModuloP(1, self.p)]))
+        return self._constants[1]
     
     def const(self, c):
-        return FFElement(self, Polynomial([NumberModuloP(c, self.p)]))
+        c %= self.p
+        if c < len(self._constants):
+            return self._constants[c]
+        return FFElement._from_index(self, c)
     
     def element_from_polynomial(self, p):
-        m = lambda t: map(lambda x: NumberModuloP(x, self.p), t)
-        return FFElement(self, Polynomial(m(p.coef)))
+        return FFElement(self, PolynomialModuloP(p, self.p) % self.f)
+    
+    def batch_inverse(self, elements):
+        # Inverts every element with a single invert_mod_f (Montgomery's
+        # trick). Zero entries come back as None.
+        elements = [e if isinstance(e, FFElement) else self.const(e) for e in elements]
+        tables = self._log_tables()
+        if tables is not None:
+            return [FFElement._from_index(self, tables.inverse(e.index)) if e.index else None
+                    for e in elements]
+        if self._binary is not None:
+            # Binary extended Euclid costs less than the three products per
+            # element of Montgomery's trick
+            inverse = self._binary.inverse
+            return [FFElement._from_index(self, inverse(e.index)) if e.index else None
+                    for e in elements]
+        f = self._reducer
+        values = [e.x for e in elements]
+        prefix = []
+        acc = PolynomialModuloP([1], self.p)
+        for x in values:
+            if x.degree() >= 0:
+                acc = acc * x % f
+            prefix.append(acc)
+        inv = invert_mod_f(acc, self.f)
+        result = [None] * len(values)
+        for i in range(len(values) - 1, -1, -1):
+            x = values[i]
+            if x.degree() >= 0:
+                result[i] = FFElement(self, inv * prefix[i - 1] % f if i > 0 else inv)
+                inv = inv * x % f
+        return result
+    
+    def element_from_index(self, index):
+        if not 0 <= index < self.q:
+            raise ValueError("Element index out of range")
+        return FFElement._from_index(self, index)
+    
+    def _index_of_polynomial(self, poly):
+        index = 0
+        for c in reversed(poly.coef):
+            index = index * self.p + c
+        return index
+    
+    def _polynomial_of_index(self, index):
+        coef = []
+        while index:
+            index, c = divmod(index, self.p)
+            coef.append(c)
+        return PolynomialModuloP(coef, self.p)
+    
+    @property
+    def order_factorization(self):
+        # [(r, e)] with q - 1 = prod r^e, the order of the multiplicative
+        # group; factored on first use
+        if self._order_factors is None:
+            self._order_factors = factor_integer(self.q - 1)
+        return self._order_factors
+    
+    def _frobenius(self):
+        # FrobeniusMap of a -> a^p, built on first use
+        if self._frobenius_map is None:
+            self._frobenius_map = FrobeniusMap(self.f, self.p)
+        return self._frobenius_map
+    
+    def _arithmetic(self):
+        # Integer arithmetic on element indices, if this field has one
+        return self._log_tables() or self._binary
+    
+    def _log_tables(self):
+        if self._tables_pending:
+            self._tables_pending = False
+            self._tables = self._build_log_tables()
+        return self._tables
+    
+    def primitive_element(self):
+        # The generator of the multiplicative group with the smallest index,
+        # which is also the base of the log tables
+        if self._primitive_index is None:
+            tables = self._log_tables()
+            self._primitive_index = tables.exp[1] if tables is not None else self._first_primitive_index()
+        return FFElement._from_index(self, self._primitive_index)
+    
+    def _first_primitive_index(self):
+        # Smallest index of a generator of the multiplicative group
+        order = self.q - 1
+        primes = [r for (r, _) in self.order_factorization]
+        one = PolynomialModuloP([1], self.p)
+        # Constants have orders dividing p - 1, so in an extension field the
+        # search starts at x
+        g_index = self.p if self.f.degree() > 1 else 1
+        while True:
+            g = self._polynomial_of_index(g_index)
+            if all(g.power(order // r, self._reducer) != one for r in primes):
+                return g_index
+            g_index += 1
+    
+    def _build_log_tables(self):
+        p, q, n = self.p, self.q, self.f.degree()
+        order = q - 1
+        # It usually has degree one, which keeps the multiply-by-g walk
+        # below cheap
+        g = list(self._polynomial_of_index(self._first_primitive_index()).coef)
+        lc_inv = pow(self.f.coef[-1], p - 2, p)
+        f_low = [c * lc_inv % p for c in self.f.coef][:n]
+        typecode = 'i' if q < 2 ** 31 else 'l'
+        log = array(typecode, [0]) * q
+        exp = array(typecode, [0]) * (2 * order)
+        v = [1] + [0] * (n - 1)
+        for k in range(order):
+            index = 0
+            for c in reversed(v):
+                index = index * p + c
+            exp[k] = exp[k + order] = index
+            log[index] = k
+            w = [0] * (n + len(g) - 1)
+            for i, c in enumerate(v):
+                if c:
+                    for j, d in enumerate(g):
+                        w[i + j] += c * d
+            for top in range(len(w) - 1, n - 1, -1):
+                t = w[top] % p
+                if t:
+                    for i in range(n):
+                        w[top - n + i] -= t * f_low[i]
+            v = [c % p for c in w[:n]]
+        zech = array(typecode, [0]) * order
+        for k in range(order):
+            a = exp[k]
+            # 1 + a only touches the lowest base-p digit of the index
+            b = a + 1 if a % p != p - 1 else a - (p - 1)
+            zech[k] = log[b] if b else -1
+        return _LogTables(q, log, exp, zech)
     
     def is_isomorphic_to(self, other):
         return self.q == other.q
     
     def isomorphism_to(self, other):
+        # FieldIsomorphism sending x to a root of self.f in other
+        from isomorphism import FieldIsomorphism
         assert self.q == other.q
         assert self.p == other.p
-        x1 = Polynomial(map(lambda x: other.const(x.n), self.f.coef))
+        x1 = Polynomial(map(lambda x: other.const(x), self.f.coef))
         rt = root_of_polynomial(x1)
-        #print rt
         if rt is None:
-            raise Error("Could not find root of polynomial in the other field: " + x1)
-        def image(elem):
-            if elem.field != self:
-                raise ValueError("Image of non-element is not defined")
-            p = elem.x
-            res = other.zero()
-            for (i, c) in enumerate(p.coef):
-                res = res + c * (rt ** i)
-            return res
-        return image
+            raise ValueError("Could not find root of polynomial in the other field: {0}".format(x1))
+        return FieldIsomorphism.from_root(self, other, rt)
     
     def __repr__(self):
         return "Z_{0}[x]/({1}) ~= Z_{2}".format(self.p, self.f, self.q)
     
     def __eq__(self, x):
-        return self.p == x.p and self.f == x.f
\ No newline at end of file
+        return self.p == x.p and self.f == x.f
+    
+    def __ne__(self, x):
+        return not self.__eq__(x)
+    
+    def __hash__(self):
+        return hash((self.p, tuple(self.f.coef)))
+    
+    def __reduce__(self):
+        # The modulus only; tables and caches are rebuilt on demand
+        log_tables = self._tables is not None or self._tables_pending
+        return (_restore_field, (self.p, list(self.f.coef), log_tables))
\ No newline at end of file
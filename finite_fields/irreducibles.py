@@ -0,0 +1,239 @@
+# Registry of known irreducible polynomials, used by FiniteField.of_size
+# before falling back to a random search.
+#
+# Entries live in text files, one monic polynomial per line:
+#
+#     <p> <n> <kind> <exponent>:<coefficient> ...
+#
+# listing the nonzero terms below x^n. kind is "sparse" (lowest-weight
+# irreducible), "conway" (Conway polynomial) or "found" (result of a random
+# search). BUNDLED_PATH ships with the package and is regenerated by running
+# this module; new finds are appended to CACHE_PATH, which the environment
+# variable FINITE_FIELDS_IRREDUCIBLES_CACHE overrides. Only bundled entries
+# are trusted as they stand: CACHE_PATH is user-writable, so its entries are
+# tested for irreducibility once, on first use, and malformed lines in it
+# are skipped.
+
+import itertools
+import os
+from polynomial import PolynomialModuloP
+from number_theory import factor_integer
+import binary_field
+
+BUNDLED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'irreducibles.txt')
+CACHE_PATH = os.environ.get('FINITE_FIELDS_IRREDUCIBLES_CACHE',
+                            os.path.join(os.path.expanduser('~'), '.finite_fields_irreducibles.txt'))
+
+# Order in which lookup() prefers the kinds of a (p, n) entry
+KINDS = ['sparse', 'conway', 'found']
+
+# (p, n) -> {kind: tuple of coefficients, constant term first}
+_registry = None
+# (p, coefficients) of the entries known to be irreducible: bundled ones,
+# those registered in this process and cached ones tested so far
+_verified = set()
+
+def _parse(line):
+    fields = line.split()
+    (p, n, kind) = (int(fields[0]), int(fields[1]), fields[2])
+    coef = [0] * n + [1]
+    for term in fields[3:]:
+        (e, c) = term.split(':')
+        coef[int(e)] = int(c)
+    return (p, n, kind, tuple(coef))
+
+def _format(p, n, kind, coef):
+    terms = ["{0}:{1}".format(e, c) for (e, c) in enumerate(coef[:-1]) if c]
+    return " ".join([str(p), str(n), kind] + terms)
+
+def _read(path):
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except (IOError, OSError):
+        return []
+    entries = []
+    for l in lines:
+        if not l.strip() or l.startswith('#'):
+            continue
+        try:
+            entries.append(_parse(l))
+        except (ValueError, IndexError):
+            # A truncated or hand-edited line
+            continue
+    return entries
+
+def _load():
+    global _registry
+    if _registry is None:
+        _registry = {}
+        _verified.clear()
+        for (p, n, kind, coef) in _read(BUNDLED_PATH):
+            _registry.setdefault((p, n), {}).setdefault(kind, coef)
+            _verified.add((p, coef))
+        for (p, n, kind, coef) in _read(CACHE_PATH):
+            if n >= 2 and p >= 2:
+                _registry.setdefault((p, n), {}).setdefault(kind, coef)
+    return _registry
+
+def _trusted(p, n, kind):
+    # The entry of that kind, tested once if it came from the cache file;
+    # entries that fail are dropped
+    entries = _load().get((p, n), {})
+    coef = entries.get(kind)
+    if coef is None or (p, coef) in _verified:
+        return coef
+    if _is_irreducible(list(coef), p):
+        _verified.add((p, coef))
+        return coef
+    del entries[kind]
+    return None
+
+def reload():
+    global _registry
+    _registry = None
+    return _load()
+
+def lookup(p, n, kind = None):
+    for k in ([kind] if kind is not None else KINDS):
+        coef = _trusted(p, n, k)
+        if coef is not None:
+            return PolynomialModuloP(coef, p)
+    return None
+
+def contains(poly):
+    # True if poly is a registered irreducible up to a constant factor.
+    # Cached entries count only once they have been tested.
+    p = poly.p
+    n = poly.degree()
+    if n < 1:
+        return False
+    _load()
+    lc_inv = pow(poly.coef[-1], p - 2, p)
+    return (p, tuple(c * lc_inv % p for c in poly.coef)) in _verified
+
+def register(poly, kind = 'found'):
+    # Records a newly found irreducible in memory and in CACHE_PATH. Failing
+    # to write the cache (read-only home, ...) is not an error. Linear
+    # polynomials are all irreducible and are not recorded.
+    p = poly.p
+    n = poly.degree()
+    if n < 2:
+        return
+    lc_inv = pow(poly.coef[-1], p - 2, p)
+    coef = tuple(c * lc_inv % p for c in poly.coef)
+    entries = _load().setdefault((p, n), {})
+    if kind in entries:
+        return
+    entries[kind] = coef
+    _verified.add((p, coef))
+    try:
+        with open(CACHE_PATH, 'a') as f:
+            f.write(_format(p, n, kind, coef) + "\n")
+    except (IOError, OSError):
+        pass
+
+
+# Generators for the bundled file
+
+def _is_irreducible(coef, p):
+    from finite_field import is_polynomial_irreducible
+    if p == 2:
+        return binary_field.is_irreducible(sum(c << i for (i, c) in enumerate(coef)))
+    return is_polynomial_irreducible(PolynomialModuloP(coef, p))
+
+def _exponents(n, k):
+    # k distinct exponents in (0, n), in decreasing order, smallest
+    # leading exponent first
+    if k == 0:
+        yield ()
+        return
+    for top in range(k, n):
+        for rest in itertools.combinations(range(1, top), k - 1):
+            yield (top,) + rest[::-1]
+
+def sparse_irreducible(p, n):
+    # The monic irreducible of degree n with the fewest terms; ties are
+    # broken by the smallest exponents, then the smallest coefficients.
+    if n == 1:
+        return PolynomialModuloP([0, 1], p)
+    nonzero = range(1, p)
+    for b in nonzero:
+        if _is_irreducible([b] + [0] * (n - 1) + [1], p):
+            return PolynomialModuloP([b] + [0] * (n - 1) + [1], p)
+    for weight in range(3, n + 2):
+        if p == 2 and weight % 2 == 0:
+            # even weight means x + 1 divides
+            continue
+        for middle in _exponents(n, weight - 2):
+            if p == 2 and weight == 3 and (n % 8 == 0 or 2 * middle[0] > n):
+                # No trinomial of degree 8k is irreducible over Z_2 (Swan),
+                # and x^n + x^k + 1 is irreducible iff x^n + x^(n-k) + 1 is
+                break
+            for cs in itertools.product(nonzero, repeat=weight - 1):
+                coef = [0] * n + [1]
+                coef[0] = cs[0]
+                for (e, c) in zip(middle, cs[1:]):
+                    coef[e] = c
+                if _is_irreducible(coef, p):
+                    return PolynomialModuloP(coef, p)
+    return None
+
+def _prime_factors(n):
+    return [r for (r, _) in factor_integer(n)]
+
+def conway_polynomial(p, n, _cache = {}):
+    # Brute force over Conway's ordering: the first primitive polynomial
+    # x^n + f_(n-1) x^(n-1) + ... + f_0 in lexicographic order of
+    # ((-1)^(n-i) f_i mod p for i = n-1, ..., 0) whose root, raised to
+    # (p^n - 1)/(p^d - 1), is a root of the Conway polynomial of degree d
+    # for every proper divisor d of n. Only practical for small p^n.
+    if (p, n) in _cache:
+        return PolynomialModuloP(_cache[(p, n)], p)
+    order = p ** n - 1
+    primes = _prime_factors(order)
+    subfields = [(d, conway_polynomial(p, d)) for d in range(1, n) if n % d == 0]
+    x = PolynomialModuloP([0, 1], p)
+    one = PolynomialModuloP([1], p)
+    for a in itertools.product(range(p), repeat=n):
+        if a[-1] == 0:
+            continue
+        coef = [((-1) ** (n - i) * a[n - 1 - i]) % p for i in range(n)] + [1]
+        f = PolynomialModuloP(coef, p)
+        if not _is_irreducible(coef, p):
+            continue
+        if any(x.power(order // r, f) == one for r in primes):
+            continue
+        compatible = True
+        for (d, g) in subfields:
+            y = x.power(order // (p ** d - 1), f)
+            value = PolynomialModuloP([0], p)
+            for c in reversed(g.coef):
+                value = (value * y + c) % f
+            if value != 0:
+                compatible = False
+                break
+        if compatible:
+            _cache[(p, n)] = tuple(f.coef)
+            return f
+    return None
+
+# What the bundled file covers
+SPARSE_DEGREES = dict([(2, range(1, 257) + [283, 409, 571])] +
+                      [(p, range(1, 33)) for p in [3, 5, 7]])
+CONWAY_DEGREES = {2: range(1, 13), 3: range(1, 8), 5: range(1, 6), 7: range(1, 5),
+                  11: range(1, 4), 13: range(1, 4)}
+
+def write_bundled(path = BUNDLED_PATH):
+    lines = ["# Generated by irreducibles.py; see that module for the format"]
+    for p in sorted(SPARSE_DEGREES):
+        for n in SPARSE_DEGREES[p]:
+            lines.append(_format(p, n, 'sparse', tuple(sparse_irreducible(p, n).coef)))
+    for p in sorted(CONWAY_DEGREES):
+        for n in CONWAY_DEGREES[p]:
+            lines.append(_format(p, n, 'conway', tuple(conway_polynomial(p, n).coef)))
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+if __name__ == '__main__':
+    write_bundled()
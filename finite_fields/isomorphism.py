@@ -0,0 +1,61 @@
+from finite_field import FFElement
+from ff_array import FFArray
+from polynomial import PolynomialModuloP
+from ff_matrix import FFMatrix
+
+class FieldIsomorphism(object):
+    # An isomorphism between two representations of GF(p^n), stored as the
+    # n x n matrix over Z_p whose column i is the image of x^i in the basis
+    # of target. Images are matrix-vector products; an FFArray is mapped by
+    # a single matrix product over its coefficient columns.
+    def __init__(self, source, target, matrix):
+        assert source.q == target.q
+        self.source = source
+        self.target = target
+        self.matrix = matrix
+        self._inverse = None
+    
+    @staticmethod
+    def from_root(source, target, root):
+        # The map sending x to root, a root of source.f in target
+        n = source.f.degree()
+        columns = []
+        power = target.one()
+        for i in range(n):
+            coef = power.x.coef
+            columns.append([coef[j] if j < len(coef) else 0 for j in range(n)])
+            power = power * root
+        return FieldIsomorphism(source, target, [list(r) for r in zip(*columns)])
+    
+    def __call__(self, x):
+        if isinstance(x, FFArray):
+            if x.field != self.source:
+                raise ValueError("Image of non-element is not defined")
+            return FFArray(self.target, self.__product(x._columns), len(x))
+        if not isinstance(x, FFElement) or x.field != self.source:
+            raise ValueError("Image of non-element is not defined")
+        p = self.source.p
+        coef = x.x.coef
+        image = [sum(m * c for (m, c) in zip(row, coef)) % p for row in self.matrix]
+        return FFElement(self.target, PolynomialModuloP(image, p))
+    
+    def apply_many(self, elements):
+        # Images of a sequence of elements, through one FFArray product
+        elements = list(elements)
+        if not elements:
+            return []
+        return self(FFArray.from_elements(elements, self.source)).to_elements()
+    
+    def __product(self, columns):
+        p = self.source.p
+        return (FFMatrix(p, self.matrix) * FFMatrix(p, columns)).rows()
+    
+    def inverse(self):
+        if self._inverse is None:
+            matrix = FFMatrix(self.source.p, self.matrix).inverse().rows()
+            self._inverse = FieldIsomorphism(self.target, self.source, matrix)
+            self._inverse._inverse = self
+        return self._inverse
+    
+    def __repr__(self):
+        return "FieldIsomorphism({0} -> {1})".format(self.source, self.target)
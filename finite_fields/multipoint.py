@@ -0,0 +1,341 @@
+# Evaluation of a polynomial at many points and interpolation through many
+# points with a subproduct tree: the products of (x - a_i) over ever larger
+# blocks of points. A remainder is carried down the tree (evaluation), or
+# weighted Lagrange terms are combined up it (interpolation), in
+# O(M(n) log n) coefficient operations instead of the O(n^2) of Horner's
+# rule at every point.
+#
+# Coefficients are ints mod p (PolynomialModuloP, or a Polynomial over a
+# prime field, which is packed to ints), or FFElements of an extension
+# field. evaluate_field evaluates at every element of a field with a
+# discrete Fourier transform over its multiplicative group instead.
+
+import operator
+from finite_field import FFElement, NumberModuloP, batch_invert_mod_n
+from polynomial import Polynomial, PolynomialModuloP, _karatsuba, _mul_lists, _divmod_lists
+
+# Subtrees over at most LEAF_SIZE points are finished with Horner's rule,
+# and so is any evaluation at fewer than SUBPRODUCT_THRESHOLD points.
+# Remainders by tree nodes of degree NEWTON_REMAINDER_THRESHOLD or more use
+# a Newton reciprocal instead of long division.
+LEAF_SIZE = 8
+SUBPRODUCT_THRESHOLD = 512
+NEWTON_REMAINDER_THRESHOLD = 128
+# Lists of extension field elements shorter than this are multiplied
+# element by element
+ELEMENT_KRONECKER_THRESHOLD = 4
+
+class _IntegersModP(object):
+    # Lists of ints mod p
+    def __init__(self, p):
+        self.p = p
+        self.zero = 0
+        self.one = 1
+    
+    def neg(self, a):
+        return -a % self.p
+    
+    def times(self, a, b):
+        return a * b % self.p
+    
+    def derivative(self, a):
+        p = self.p
+        return [c * i % p for (i, c) in enumerate(a)][1:]
+    
+    def add(self, a, b):
+        p = self.p
+        if len(a) < len(b):
+            (a, b) = (b, a)
+        return [(x + y) % p for (x, y) in zip(a, b)] + a[len(b):]
+    
+    def sub(self, a, b):
+        p = self.p
+        if len(a) < len(b):
+            a = a + [0] * (len(b) - len(a))
+        return [(x - y) % p for (x, y) in zip(a, b)] + a[len(b):]
+    
+    def mul(self, a, b):
+        return _mul_lists(a, b, self.p)
+    
+    def divmod(self, a, b):
+        return _divmod_lists(a, b, self.p)
+    
+    def horner(self, coef, a):
+        p = self.p
+        acc = 0
+        for c in reversed(coef):
+            acc = (acc * a + c) % p
+        return acc
+    
+    def batch_inverse(self, xs):
+        return batch_invert_mod_n(xs, self.p)
+
+
+class _ElementRing(object):
+    # Lists of FFElements of field
+    def __init__(self, field):
+        self.field = field
+        self.zero = field.zero()
+        self.one = field.one()
+    
+    def neg(self, a):
+        return -a
+    
+    def times(self, a, b):
+        return a * b
+    
+    def derivative(self, a):
+        return [c * i for (i, c) in enumerate(a)][1:]
+    
+    def add(self, a, b):
+        if len(a) < len(b):
+            (a, b) = (b, a)
+        return [x + y for (x, y) in zip(a, b)] + a[len(b):]
+    
+    def sub(self, a, b):
+        if len(a) < len(b):
+            a = a + [self.zero] * (len(b) - len(a))
+        return [x - y for (x, y) in zip(a, b)] + a[len(b):]
+    
+    def mul(self, a, b):
+        # Kronecker substitution in the other direction too: element i of
+        # a list becomes the block of coefficients i (2k - 1) .. i (2k - 1)
+        # + k - 1 of one list over Z_p, so that blocks of the product do not
+        # overlap and reduce mod f to the product's elements
+        if not a or not b:
+            return []
+        if min(len(a), len(b)) < ELEMENT_KRONECKER_THRESHOLD:
+            return _karatsuba(a, b)
+        field = self.field
+        p = field.p
+        slots = 2 * field.f.degree() - 1
+        product = _mul_lists(self.__flatten(a, slots), self.__flatten(b, slots), p)
+        reducer = field._reducer
+        return [FFElement(field, PolynomialModuloP._make(product[i:i + slots], p) % reducer)
+                for i in range(0, (len(a) + len(b) - 1) * slots, slots)]
+    
+    def __flatten(self, a, slots):
+        flat = []
+        for c in a:
+            coef = list(c.x.coef) if isinstance(c, FFElement) else [c % self.field.p]
+            flat += coef + [0] * (slots - len(coef))
+        return flat
+    
+    def divmod(self, a, b):
+        db = len(b) - 1
+        rem = list(a)
+        if len(rem) <= db:
+            return [], rem
+        inv = b[-1].inverse()
+        quot = [self.zero] * (len(rem) - db)
+        for d in range(len(rem) - 1 - db, -1, -1):
+            c = rem[d + db] * inv
+            quot[d] = c
+            if c != 0:
+                for i in range(db):
+                    rem[d + i] = rem[d + i] - b[i] * c
+        del rem[db:]
+        return quot, rem
+    
+    def horner(self, coef, a):
+        acc = self.zero
+        for c in reversed(coef):
+            acc = acc * a + c
+        return acc
+    
+    def batch_inverse(self, xs):
+        return self.field.batch_inverse(xs)
+
+
+def _conversions(items, p = None):
+    # (ring, into, out_of): the ring the items live in, and maps from items
+    # to ring values and back
+    for c in items:
+        if isinstance(c, FFElement):
+            field = c.field
+            if field.f.degree() > 1:
+                ring = _ElementRing(field)
+                return (ring, lambda a: a if isinstance(a, FFElement) else field.const(int(a)), lambda v: v)
+            # The index of an element of a prime field is its value
+            p = field.p
+            return (_IntegersModP(p), lambda a: a.index if isinstance(a, FFElement) else int(a) % p,
+                    field.element_from_index)
+        if isinstance(c, NumberModuloP):
+            p = c.p
+            return (_IntegersModP(p), lambda a: int(a) % p, lambda v: NumberModuloP(v, p))
+    if p is None:
+        raise ValueError("Coefficients and points must lie in a finite field or Z_p")
+    return (_IntegersModP(p), lambda a: int(a) % p, lambda v: v)
+
+def _trim(a):
+    while a and a[-1] == 0:
+        a.pop()
+    return a
+
+def _inverse_series(a, length, ring):
+    # a^-1 mod x^length by Newton iteration, a[0] must be invertible
+    g = ring.batch_inverse([a[0]])
+    two = [ring.one + ring.one]
+    prec = 1
+    while prec < length:
+        prec = min(2 * prec, length)
+        e = ring.sub(two, ring.mul(a[:prec], g)[:prec])
+        g = ring.mul(g, e)[:prec]
+    return g
+
+def _remainder(a, b, ring):
+    # a mod b for monic b; for large b the quotient is the reversed
+    # dividend times the reciprocal of the reversed divisor
+    n = len(b) - 1
+    if len(a) <= n:
+        return a
+    if n < NEWTON_REMAINDER_THRESHOLD:
+        return ring.divmod(a, b)[1]
+    k = len(a) - n
+    q = ring.mul(a[::-1][:k], _inverse_series(b[::-1], k, ring))[:k]
+    q = (q + [ring.zero] * (k - len(q)))[::-1]
+    return ring.sub(a[:n], ring.mul(q, b)[:n])
+
+def _subproduct_tree(points, ring):
+    # tree[d][i] is the product of (x - a) over points[i 2^d:(i + 1) 2^d]
+    level = [[ring.neg(a), ring.one] for a in points]
+    tree = [level]
+    while len(level) > 1:
+        level = [ring.mul(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        tree.append(level)
+    return tree
+
+def _evaluate(coef, points, tree, ring):
+    depth = len(tree) - 1
+    rems = [_remainder(coef, tree[depth][0], ring)]
+    while depth > 0 and 2 ** depth > LEAF_SIZE:
+        depth -= 1
+        rems = [_remainder(rems[i // 2], node, ring) for (i, node) in enumerate(tree[depth])]
+    width = 2 ** depth
+    values = []
+    for (i, r) in enumerate(rems):
+        values += [ring.horner(r, a) for a in points[i * width:(i + 1) * width]]
+    return values
+
+def evaluate_many(poly, points):
+    # [poly(a) for a in points]. A PolynomialModuloP is evaluated at ints
+    # and gives ints; a Polynomial over a finite field or Z_p gives
+    # FFElements or NumberModuloPs.
+    points = list(points)
+    if not points:
+        return []
+    if isinstance(poly, PolynomialModuloP):
+        (ring, into, out_of) = _conversions([], poly.p)
+    else:
+        (ring, into, out_of) = _conversions(list(poly.coef) + points)
+    coef = _trim([into(c) for c in poly.coef])
+    xs = [into(a) for a in points]
+    if len(xs) < SUBPRODUCT_THRESHOLD:
+        return [out_of(ring.horner(coef, a)) for a in xs]
+    return [out_of(v) for v in _evaluate(coef, xs, _subproduct_tree(xs, ring), ring)]
+
+def interpolate(points, values, p = None):
+    # The polynomial of degree < len(points) through (points[i], values[i]).
+    # With p, points and values are ints mod p and a PolynomialModuloP is
+    # returned; otherwise they are FFElements or NumberModuloPs and a
+    # Polynomial is returned.
+    points = list(points)
+    values = list(values)
+    if len(points) != len(values):
+        raise ValueError("Interpolation needs as many values as points")
+    if not points:
+        return PolynomialModuloP([], p) if p is not None else Polynomial([])
+    (ring, into, out_of) = _conversions(points + values if p is None else [], p)
+    xs = [into(a) for a in points]
+    ys = [into(v) for v in values]
+    tree = _subproduct_tree(xs, ring)
+    # Lagrange weights 1 / prod_(j != i) (a_i - a_j) = 1 / m'(a_i)
+    weights = ring.batch_inverse(_evaluate(ring.derivative(tree[-1][0]), xs, tree, ring))
+    if any(w is None for w in weights):
+        raise ValueError("Interpolation points must be distinct")
+    level = [[ring.times(y, w)] for (y, w) in zip(ys, weights)]
+    for nodes in tree[:-1]:
+        level = [ring.add(ring.mul(level[i], nodes[i + 1]), ring.mul(level[i + 1], nodes[i]))
+                 if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+    coef = _trim(level[0])
+    if p is not None:
+        return PolynomialModuloP._make(coef, p)
+    return Polynomial([out_of(c) for c in coef])
+
+
+# Whole-field evaluation: for a generator g of GF(q)*, poly(g^k) for
+# k < q - 1 is the length q - 1 DFT of the coefficients folded mod
+# x^(q-1) - 1, computed here by mixed-radix Cooley-Tukey over the prime
+# factors of q - 1. It costs about (q - 1) times the sum of those factors,
+# so fields where q - 1 has a large prime factor go to evaluate_many.
+
+class _PrimeArithmetic(object):
+    # Index arithmetic of a prime field
+    def __init__(self, p):
+        self.p = p
+    
+    def add(self, a, b):
+        return (a + b) % self.p
+    
+    def mul(self, a, b):
+        return a * b % self.p
+
+def _dft(c, powers, stride, factors, add, mul):
+    # X_k = sum_j c_j w^(jk) for w = powers[stride], len(c) = prod(factors)
+    n = len(c)
+    if n == 1:
+        return list(c)
+    r = factors[0]
+    m = n // r
+    subs = [_dft(c[s::r], powers, stride * r, factors[1:], add, mul) for s in range(r)]
+    order = len(powers)
+    result = []
+    for k in range(n):
+        km = k % m
+        acc = subs[0][km]
+        for s in range(1, r):
+            acc = add(acc, mul(powers[stride * s * k % order], subs[s][km]))
+        result.append(acc)
+    return result
+
+def evaluate_field(poly, field):
+    # [poly(a) for a in field], listed by element index
+    q = field.q
+    order = q - 1
+    coef = [c if isinstance(c, FFElement) else field.const(int(c)) for c in poly.coef]
+    coef = _trim(coef)
+    factors = []
+    for (r, e) in field.order_factorization:
+        factors += [r] * e
+    if not coef or sum(factors) > len(coef):
+        return evaluate_many(Polynomial(coef or [field.zero()]),
+                             [field.element_from_index(i) for i in range(q)])
+    if field.f.degree() == 1:
+        arith = _PrimeArithmetic(field.p)
+    else:
+        arith = field._arithmetic()
+    if arith is not None:
+        # Work on element indices
+        (add, mul) = (arith.add, arith.mul)
+        into = lambda a: a.index
+        index_of = lambda v: v
+        out_of = field.element_from_index
+    else:
+        (add, mul) = (operator.add, operator.mul)
+        into = lambda a: a
+        index_of = lambda v: v.index
+        out_of = lambda v: v
+    g = into(field.primitive_element())
+    powers = [into(field.one())]
+    for k in range(1, order):
+        powers.append(mul(powers[-1], g))
+    folded = [into(field.zero())] * order
+    for (i, c) in enumerate(coef):
+        folded[i % order] = add(folded[i % order], into(c))
+    result = [None] * q
+    result[0] = coef[0]
+    for (k, v) in enumerate(_dft(folded, powers, 1, factors, add, mul)):
+        result[index_of(powers[k])] = out_of(v)
+    return result
@@ -0,0 +1,142 @@
+# Integer factorisation for group orders such as q - 1: trial division by
+# small primes, Miller-Rabin for what is left and Brent's variant of
+# Pollard's rho for composite cofactors. Results are memoised, since the
+# same orders come up again for every field of the same size.
+
+from fractions import gcd
+from random import Random
+
+TRIAL_DIVISION_BOUND = 1000
+
+# Miller-Rabin with these bases is exact for n < MILLER_RABIN_EXACT_BOUND;
+# larger n are also tested with MILLER_RABIN_ROUNDS random bases
+MILLER_RABIN_BASES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41]
+MILLER_RABIN_EXACT_BOUND = 3317044064679887385961981
+MILLER_RABIN_ROUNDS = 20
+
+def _primes_below(n):
+    sieve = [True] * n
+    primes = []
+    for i in range(2, n):
+        if sieve[i]:
+            primes.append(i)
+            for j in range(i * i, n, i):
+                sieve[j] = False
+    return primes
+
+_SMALL_PRIMES = _primes_below(TRIAL_DIVISION_BOUND)
+
+# n -> tuple of (prime, exponent)
+_factor_cache = {}
+
+def is_probable_prime(n):
+    if n < 2:
+        return False
+    for r in _SMALL_PRIMES:
+        if n % r == 0:
+            return n == r
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    bases = list(MILLER_RABIN_BASES)
+    if n >= MILLER_RABIN_EXACT_BOUND:
+        rng = Random(n)
+        bases += [rng.randrange(2, n - 1) for i in range(MILLER_RABIN_ROUNDS)]
+    for a in bases:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for i in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def pollard_brent(n, rng = None):
+    # A nontrivial factor of the odd composite n. Products of m differences
+    # share one gcd; a batch that overshoots to n is replayed one step at
+    # a time, and a walk that only finds n restarts with a new constant.
+    rng = rng or Random(n)
+    m = 128
+    while True:
+        y = rng.randrange(1, n)
+        c = rng.randrange(1, n)
+        g = r = q = 1
+        while g == 1:
+            x = y
+            for i in xrange(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for i in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+
+def _integer_root(n, k):
+    # Largest r with r^k <= n
+    if n < 2:
+        return n
+    r = 1 << ((n.bit_length() + k - 1) // k)
+    while True:
+        s = ((k - 1) * r + n // r ** (k - 1)) // k
+        if s >= r:
+            return r
+        r = s
+
+def _perfect_power(q):
+    # (r, k) with q = r^k and k as large as possible; for q = p^n with p
+    # prime this is (p, n)
+    for k in range(q.bit_length(), 1, -1):
+        r = _integer_root(q, k)
+        if r > 1 and r ** k == q:
+            return (int(r), k)
+    return (q, 1)
+
+def factor_integer(n):
+    # [(prime, exponent)] with n = prod prime^exponent, primes increasing
+    if n < 1:
+        raise ValueError("Only positive integers can be factored")
+    if n in _factor_cache:
+        return list(_factor_cache[n])
+    factors = {}
+    remaining = n
+    for r in _SMALL_PRIMES:
+        if r * r > remaining:
+            break
+        while remaining % r == 0:
+            remaining //= r
+            factors[r] = factors.get(r, 0) + 1
+    # (m, e): m^e divides n
+    stack = [(remaining, 1)] if remaining > 1 else []
+    while stack:
+        (m, e) = stack.pop()
+        if m < TRIAL_DIVISION_BOUND ** 2 or is_probable_prime(m):
+            # Every factor below the bound is gone, so small m are prime
+            factors[m] = factors.get(m, 0) + e
+            continue
+        # The rho walk finds the prime of a prime power only after about
+        # sqrt of it steps
+        (r, k) = _perfect_power(m)
+        if k > 1:
+            stack.append((r, e * k))
+            continue
+        d = pollard_brent(m)
+        stack += [(d, e), (m // d, e)]
+    result = tuple(sorted((int(r), e) for (r, e) in factors.items()))
+    _factor_cache[n] = result
+    return list(result)
@@ -1,35 +1,156 @@
-import copy
+from array import array
 
 class InfiniteArray(object):
+    # A list that reads as 0 past its end. _length is its length without
+    # trailing zeros, or None when a write may have shortened it; trailing
+    # zeros are dropped the next time the length is needed, so each one is
+    # scanned once.
     def __init__(self, arr):
         if isinstance(arr, InfiniteArray):
-            self._array = copy.copy(arr._array)
+            self._array = arr._array[:len(arr)]
+            self._length = len(self._array)
         else:
-            self._array = copy.copy(arr)
+            self._array = list(arr)
+            self._length = None
     
     def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
         if index >= len(self._array):
             return 0
         return self._array[index]
     
     def __len__(self):
-        while len(self._array) and self._array[-1] == 0:
-            self._array = self._array[:-1]
-        return len(self._array)
+        n = self._length
+        if n is None:
+            a = self._array
+            n = len(a)
+            while n and a[n - 1] == 0:
+                n -= 1
+            del a[n:]
+            self._length = n
+        return n
     
     def __setitem__(self, index, value):
-        l = len(self._array)
+        a = self._array
+        l = len(a)
         if index >= l:
-            self._array += [0] * (index - l)
-            self._array += [value]
+            if value == 0:
+                return
+            a.extend([0] * (index - l))
+            a.append(value)
+            self._length = index + 1
+            return
+        a[index] = value
+        n = self._length
+        if n is not None:
+            if index >= n:
+                if value != 0:
+                    self._length = index + 1
+            elif index == n - 1 and value == 0:
+                self._length = None
+    
+    def add_scaled(self, other, c = None, shift = 0):
+        # self += c * x^shift * other for a list other; c None stands for 1
+        a = self._array
+        end = shift + len(other)
+        if end > len(a):
+            a.extend([0] * (end - len(a)))
+        if c is None:
+            a[shift:end] = [u + v for (u, v) in zip(a[shift:end], other)]
+        else:
+            a[shift:end] = [u + c * v for (u, v) in zip(a[shift:end], other)]
+        self._length = None
+    
+    def sub_scaled(self, other, c = None, shift = 0):
+        # self -= c * x^shift * other for a list other; c None stands for 1
+        a = self._array
+        end = shift + len(other)
+        if end > len(a):
+            a.extend([0] * (end - len(a)))
+        if c is None:
+            a[shift:end] = [u - v for (u, v) in zip(a[shift:end], other)]
         else:
-            self._array[index] = value
+            a[shift:end] = [u - c * v for (u, v) in zip(a[shift:end], other)]
+        self._length = None
+    
+    def to_list(self):
+        # Copy of the coefficients without trailing zeros
+        return self._array[:len(self)]
     
     def __iter__(self):
-        return iter(self._array)
+        return iter(self._array[:len(self)])
     
     def __repr__(self):
-        return "IA: " + repr(self._array)
+        return "IA: " + repr(self._array[:len(self)])
+
+
+def _long_division(rem, b, divide):
+    # Divides the list rem by the list b in place, one leading coefficient
+    # at a time: the remainder is left in rem[:len(b) - 1] (entries past it
+    # are whatever the last step left) and the quotient is returned.
+    db = len(b) - 1
+    if db < 0:
+        raise ZeroDivisionError("polynomial division by zero")
+    lead = b[-1]
+    quot = [0] * max(len(rem) - db, 0)
+    for d in range(len(rem) - 1 - db, -1, -1):
+        c = divide(rem[d + db], lead)
+        quot[d] = c
+        rem[d:d + db + 1] = [u - c * v for (u, v) in zip(rem[d:d + db + 1], b)]
+    return quot
+
+def _true_divide(a, b):
+    return a / b
+
+def _floor_divide(a, b):
+    return a // b
+
+# Exponentiation by left-to-right sliding windows: the exponent is cut into
+# windows of at most k bits that start and end with a 1, and each window
+# costs one product with a precomputed odd power x^w. k grows with the
+# exponent (WINDOW_BITS lists the bit lengths up to which k = 1, 2, ...), so
+# about bits / (k + 1) products replace the bits / 2 of square-and-multiply.
+
+WINDOW_BITS = [8, 24, 80, 240, 672]
+
+def _window_size(bits):
+    k = 1
+    for limit in WINDOW_BITS:
+        if bits <= limit:
+            return k
+        k += 1
+    return k
+
+def _sliding_window_power(x, e, one, mul, square):
+    # x^e for e >= 0 with the given product and squaring
+    if e == 0:
+        return one
+    k = _window_size(e.bit_length())
+    odd = [x]
+    if k > 1:
+        x2 = square(x)
+        for i in range((1 << (k - 1)) - 1):
+            odd.append(mul(odd[-1], x2))
+    result = None
+    i = e.bit_length() - 1
+    while i >= 0:
+        if not (e >> i) & 1:
+            result = square(result)
+            i -= 1
+            continue
+        j = max(i - k + 1, 0)
+        while not (e >> j) & 1:
+            j += 1
+        w = (e >> j) & ((1 << (i - j + 1)) - 1)
+        if result is None:
+            result = odd[w >> 1]
+        else:
+            for t in range(i - j + 1):
+                result = square(result)
+            result = mul(result, odd[w >> 1])
+        i = j - 1
+    return result
 
 
 class Polynomial(object):
@@ -43,76 +164,121 @@ class Polynomial(object):
         return len(self.coef) - 1
     
     def __add__(self, x):
+        if isinstance(x, SparsePolynomial):
+            return NotImplemented
         result = Polynomial(self.coef)
-        if isinstance(x, Polynomial):
-            for i in range(len(x.coef)):
-                result.coef[i] += x.coef[i]
-        else:
-            result.coef[0] += x
+        result += x
         return result
     
     def __sub__(self, x):
+        if isinstance(x, SparsePolynomial):
+            return NotImplemented
         result = Polynomial(self.coef)
+        result -= x
+        return result
+    
+    def __iadd__(self, x):
         if isinstance(x, Polynomial):
-            for i in range(len(x.coef)):
-                result.coef[i] -= x.coef[i]
+            self.coef.add_scaled(x.coef.to_list())
         else:
-            result.coef[0] -= x
-        return result
+            self.coef[0] += x
+        return self
+    
+    def __isub__(self, x):
+        if isinstance(x, Polynomial):
+            self.coef.sub_scaled(x.coef.to_list())
+        else:
+            self.coef[0] -= x
+        return self
     
     def __mul__(self, x):
+        if isinstance(x, SparsePolynomial):
+            return NotImplemented
         if isinstance(x, Polynomial):
-            result = Polynomial([])
-            for i in range(len(self.coef)):
-                for j in range(len(x.coef)):
-                    result.coef[i+j] += self.coef[i] * x.coef[j]
+            result = Polynomial(_karatsuba(self.coef.to_list(), x.coef.to_list()))
         else:
             result = Polynomial(map(lambda t: t * x, self.coef))
         return result
     
+    def __imul__(self, x):
+        if isinstance(x, Polynomial):
+            self.coef = InfiniteArray(_karatsuba(self.coef.to_list(), x.coef.to_list()))
+        else:
+            a = self.coef._array
+            a[:] = [t * x for t in a]
+            self.coef._length = None
+        return self
+    
+    def add_product(self, a, b, shift = 0):
+        # self += x^shift * a * b in place; b may be a scalar
+        if isinstance(b, Polynomial):
+            self.coef.add_scaled(_karatsuba(a.coef.to_list(), b.coef.to_list()), None, shift)
+        else:
+            self.coef.add_scaled(a.coef.to_list(), b, shift)
+        return self
+    
+    def sub_product(self, a, b, shift = 0):
+        # self -= x^shift * a * b in place; b may be a scalar
+        if isinstance(b, Polynomial):
+            self.coef.sub_scaled(_karatsuba(a.coef.to_list(), b.coef.to_list()), None, shift)
+        else:
+            self.coef.sub_scaled(a.coef.to_list(), b, shift)
+        return self
+    
+    def __divide(self, x, divide):
+        # (quotient, remainder) with a single copy of self
+        rem = self.coef.to_list()
+        b = x.coef.to_list()
+        quot = _long_division(rem, b, divide)
+        del rem[len(b) - 1:]
+        return Polynomial(quot), Polynomial(rem)
+    
     def __floordiv__(self, x):
         if isinstance(x, Polynomial):
-            result = Polynomial([])
-            rem = Polynomial(self.coef)
-            while rem.degree() >= x.degree():
-                d = rem.degree() - x.degree()
-                c = rem.coef[-1] // x.coef[-1]
-                for i in range(len(x.coef)):
-                    rem.coef[i + d] -= x.coef[i] * c
-                result.coef[d] += c
-        else:
-            result = Polynomial(map(lambda t: t // x, self.coef))
-        return result
+            return self.__divide(x, _floor_divide)[0]
+        return Polynomial(map(lambda t: t // x, self.coef))
+    
+    def __div__(self, x):
+        if isinstance(x, Polynomial):
+            return self.__divide(x, _true_divide)[0]
+        return Polynomial(map(lambda t: t / x, self.coef))
+    
+    def __divmod__(self, x):
+        return self.__divide(x, _true_divide)
+    
+    def __mod__(self, x):
+        if isinstance(x, Polynomial):
+            return self.__divide(x, _true_divide)[1]
+        return Polynomial(map(lambda t: t % x, self.coef))
+    
+    def mulmod(self, x, modulus):
+        # self * x mod modulus, reducing the product in place
+        prod = _karatsuba(self.coef.to_list(), x.coef.to_list())
+        b = modulus.coef.to_list()
+        _long_division(prod, b, _true_divide)
+        del prod[len(b) - 1:]
+        return Polynomial(prod)
     
     def __pow__(self, n):
         d = self.degree()
-        res = Polynomial([self.coef[d] / self.coef[d]])
-        n1 = n
-        q = Polynomial(self)
-        while n1 > 0:
-            if n1 % 2 != 0:
-               res = res * q
-            n1 /= 2
-            q = q * q
-        return res
+        one = Polynomial([self.coef[d] / self.coef[d]])
+        return _sliding_window_power(Polynomial(self), n, one, lambda a, b: a * b, lambda a: a * a)
     
     def power(self, degree, modulus = None):
+        # modulus may also be a FrobeniusMap, which reads the exponent in
+        # base q
         if modulus == None:
             return self ** degree
+        if isinstance(modulus, FrobeniusMap):
+            return modulus.power(self, degree)
         d = self.degree()
-        res = Polynomial([self.coef[d] / self.coef[d]])
-        n1 = degree
-        q = Polynomial(self)
-        while n1 > 0:
-            if n1 % 2 != 0:
-                res = res * q
-                res = res % modulus
-            n1 /= 2
-            q = q * q
-            q = q % modulus
-        return res
+        one = Polynomial([self.coef[d] / self.coef[d]])
+        return _sliding_window_power(self % modulus, degree, one,
+                                     lambda a, b: a.mulmod(b, modulus), lambda a: a.mulmod(a, modulus))
     
     def __eq__(self, other):
+        if isinstance(other, SparsePolynomial):
+            return NotImplemented
         if not isinstance(other, Polynomial):
             return self.degree() < 1 and self.coef[0] == other
         if self.degree() != other.degree():
@@ -123,28 +289,9 @@ class Polynomial(object):
         return True
     
     def __ne__(self, other):
-        return not self.__eq__(other)
-    
-    def __div__(self, x):
-        if isinstance(x, Polynomial):
-            result = Polynomial([])
-            rem = Polynomial(self.coef)
-            while rem.degree() >= x.degree():
-                d = rem.degree() - x.degree()
-                c = rem.coef[-1] / x.coef[-1]
-                for i in range(len(x.coef)):
-                    rem.coef[i + d] -= x.coef[i] * c
-                result.coef[d] += c
-        else:
-            result = Polynomial(map(lambda t: t / x, self.coef))
-        return result
-    
-    def __mod__(self, x):
-        if isinstance(x, Polynomial):
-            result = (self - x * (self / x))
-        else:
-            result = Polynomial(map(lambda t: t % x, self.coef))
-        return result
+        eq = self.__eq__(other)
+        if eq is NotImplemented: return eq
+        return not eq
     
     def __radd__(self, x):
         return self.__add__(x)
@@ -158,6 +305,17 @@ class Polynomial(object):
     def __neg__(self):
         return Polynomial(map(lambda t: -t, self.coef))
     
+    def __reduce__(self):
+        # Coefficients from one PrimeField or FiniteField are pickled as
+        # integers next to it, rather than each carrying its own modulus
+        coef = self.coef.to_list()
+        field = getattr(coef[0], 'field', None) if coef else None
+        if field is not None and all(getattr(c, 'field', None) is field for c in coef):
+            if hasattr(field, 'element_from_index'):
+                return (_restore_polynomial, (field, [c.index for c in coef]))
+            return (_restore_polynomial, (field, [c.n for c in coef]))
+        return (_restore_polynomial, (None, coef))
+    
     def __repr__(self):
         res = ""
         l = len(self.coef)
@@ -174,3 +332,809 @@ class Polynomial(object):
                         res += "^" + str(i)
                 res += " + "
         return res[:-3]
+
+def _restore_polynomial(field, values):
+    if field is None:
+        return Polynomial(values)
+    make = field.element_from_index if hasattr(field, 'element_from_index') else field
+    return Polynomial([make(v) for v in values])
+
+
+# Multiplication algorithms. The thresholds are the smaller operand length at
+# which each algorithm starts to pay off; see benchmarks/bench_multiplication.py
+# for the measurements they come from.
+
+# Polynomials over Z_p go from schoolbook to Kronecker substitution at
+# KRONECKER_THRESHOLD; Karatsuba serves the other coefficient rings. The NTT
+# lost to Kronecker substitution at every length measured (up to 2^18), so it
+# is only tried beyond that.
+KARATSUBA_THRESHOLD = 64
+KRONECKER_THRESHOLD = 24
+NTT_THRESHOLD = 1 << 19
+
+def _schoolbook(a, b):
+    if not a or not b:
+        return []
+    res = [0] * (len(a) + len(b) - 1)
+    for i, c in enumerate(a):
+        for j, d in enumerate(b):
+            res[i + j] += c * d
+    return res
+
+def _add_lists(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    res = list(a)
+    for i, c in enumerate(b):
+        res[i] = res[i] + c
+    return res
+
+def _karatsuba(a, b):
+    # Works for any coefficient ring; missing entries are the integer 0.
+    if len(a) < len(b):
+        a, b = b, a
+    la, lb = len(a), len(b)
+    if lb < max(KARATSUBA_THRESHOLD, 2):
+        return _schoolbook(a, b)
+    res = [0] * (la + lb - 1)
+    m = (la + 1) // 2
+    if lb <= m:
+        # Unbalanced operands: multiply b by slices of a of its own length
+        for k in range(0, la, lb):
+            for i, c in enumerate(_karatsuba(a[k:k + lb], b)):
+                res[k + i] += c
+        return res
+    a0, a1 = a[:m], a[m:]
+    b0, b1 = b[:m], b[m:]
+    z0 = _karatsuba(a0, b0)
+    z2 = _karatsuba(a1, b1)
+    z1 = _karatsuba(_add_lists(a0, a1), _add_lists(b0, b1))
+    for i, c in enumerate(z0):
+        res[i] += c
+        res[i + m] -= c
+    for i, c in enumerate(z2):
+        res[i + 2 * m] += c
+        res[i + m] -= c
+    for i, c in enumerate(z1):
+        res[i + m] += c
+    return res
+
+# NTT-friendly primes c * 2^k + 1 together with a primitive root and k
+_NTT_PRIMES = [
+    (469762049, 3, 26),
+    (167772161, 3, 25),
+    (754974721, 11, 24),
+    (998244353, 3, 23),
+    (1004535809, 3, 21),
+]
+
+def _ntt(a, prime, g, inverse=False):
+    n = len(a)
+    j = 0
+    for i in range(1, n):
+        bit = n >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            a[i], a[j] = a[j], a[i]
+    length = 2
+    while length <= n:
+        w = pow(g, (prime - 1) // length, prime)
+        if inverse:
+            w = pow(w, prime - 2, prime)
+        half = length >> 1
+        ws = [1] * half
+        for k in range(1, half):
+            ws[k] = ws[k - 1] * w % prime
+        for start in range(0, n, length):
+            mid = start + half
+            lo = a[start:mid]
+            hi = [h * t % prime for h, t in zip(a[mid:start + length], ws)]
+            a[start:mid] = [(u + v) % prime for u, v in zip(lo, hi)]
+            a[mid:start + length] = [(u - v) % prime for u, v in zip(lo, hi)]
+        length <<= 1
+    if inverse:
+        n_inv = pow(n, prime - 2, prime)
+        a[:] = [c * n_inv % prime for c in a]
+    return a
+
+def _ntt_primes_for(la, lb, p):
+    # Enough primes for the CRT to recover every exact integer coefficient,
+    # or None when the product is out of reach of the table above.
+    bound = min(la, lb) * (p - 1) ** 2
+    size = 1
+    while size < la + lb - 1:
+        size <<= 1
+    primes = []
+    modulus = 1
+    for entry in _NTT_PRIMES:
+        if modulus > bound:
+            break
+        if size > 1 << entry[2]:
+            return None
+        primes.append(entry)
+        modulus *= entry[0]
+    if modulus <= bound:
+        return None
+    return primes
+
+def _ntt_mul(a, b, p, primes):
+    n = len(a) + len(b) - 1
+    size = 1
+    while size < n:
+        size <<= 1
+    residues = []
+    for (prime, g, _) in primes:
+        fa = _ntt([c % prime for c in a] + [0] * (size - len(a)), prime, g)
+        fb = _ntt([c % prime for c in b] + [0] * (size - len(b)), prime, g)
+        fc = _ntt([x * y % prime for x, y in zip(fa, fb)], prime, g, True)
+        residues.append(fc[:n])
+    # Garner's algorithm, then reduce the exact coefficients mod p
+    res = residues[0]
+    modulus = primes[0][0]
+    for (prime, _, _), r in zip(primes[1:], residues[1:]):
+        inv = pow(modulus % prime, prime - 2, prime)
+        res = [x + ((y - x) * inv % prime) * modulus for x, y in zip(res, r)]
+        modulus *= prime
+    return [c % p for c in res]
+
+
+# Packed backend for polynomials over Z_p. Coefficients are kept reduced in
+# [0, p) as plain machine ints, the modulus is stored once per polynomial.
+
+def _pack(lst, p):
+    while lst and lst[-1] == 0:
+        lst.pop()
+    if p < 2 ** 31:
+        return array('l', lst)
+    return lst
+
+def _kronecker_mul(a, b, p):
+    # Kronecker substitution: pack each operand into one integer with room
+    # for every exact product coefficient, so that the work is a single
+    # big-integer product in C. Packing goes through hex strings.
+    width = (2 * (p - 1).bit_length() + min(len(a), len(b)).bit_length() + 3) // 4
+    fmt = '%0' + str(width) + 'x'
+    x = int(''.join([fmt % c for c in reversed(a)]), 16)
+    y = int(''.join([fmt % c for c in reversed(b)]), 16)
+    digits = ('%x' % (x * y)).rjust((len(a) + len(b) - 1) * width, '0')
+    return [int(digits[i - width:i], 16) % p for i in range(len(digits), 0, -width)]
+
+def _mul_lists(a, b, p):
+    if not a or not b:
+        return []
+    n = min(len(a), len(b))
+    if n < KRONECKER_THRESHOLD:
+        res = [0] * (len(a) + len(b) - 1)
+        for i, c in enumerate(a):
+            if c == 0:
+                continue
+            for j, d in enumerate(b):
+                res[i + j] += c * d
+        return [c % p for c in res]
+    if n >= NTT_THRESHOLD:
+        primes = _ntt_primes_for(len(a), len(b), p)
+        if primes is not None:
+            return _ntt_mul(a, b, p, primes)
+    return _kronecker_mul(a, b, p)
+
+def _divmod_lists(a, b, p):
+    db = len(b) - 1
+    if db < 0:
+        raise ZeroDivisionError("polynomial division by zero")
+    rem = list(a)
+    if len(rem) <= db:
+        return [], rem
+    inv = pow(b[-1], p - 2, p)
+    low = b[:db]
+    quot = [0] * (len(rem) - db)
+    for d in range(len(rem) - 1 - db, -1, -1):
+        c = rem[d + db] * inv % p
+        quot[d] = c
+        if c:
+            rem[d:d + db] = [(u - v * c) % p for (u, v) in zip(rem[d:d + db], low)]
+    del rem[db:]
+    return quot, rem
+
+
+class PolynomialModuloP(object):
+    def __init__(self, other, p):
+        self.p = p
+        if isinstance(other, PolynomialModuloP):
+            assert other.p == p
+            self.coef = other.coef[:]
+        else:
+            if isinstance(other, Polynomial):
+                other = other.coef
+            self.coef = _pack([int(c) % p for c in other], p)
+    
+    @classmethod
+    def _make(cls, lst, p):
+        # lst must already be reduced mod p; it is consumed
+        result = cls.__new__(cls)
+        result.p = p
+        result.coef = _pack(lst, p)
+        return result
+    
+    def __lift(self, x):
+        if isinstance(x, PolynomialModuloP):
+            assert self.p == x.p
+            return x
+        return PolynomialModuloP._make([int(x) % self.p], self.p)
+    
+    def degree(self):
+        return len(self.coef) - 1
+    
+    def __add__(self, x):
+        if isinstance(x, SparsePolynomial):
+            return NotImplemented
+        y = self.__lift(x)
+        a, b = self.coef, y.coef
+        if len(a) < len(b):
+            a, b = b, a
+        res = a.tolist() if isinstance(a, array) else list(a)
+        p = self.p
+        for i, c in enumerate(b):
+            res[i] = (res[i] + c) % p
+        return PolynomialModuloP._make(res, p)
+    
+    def __sub__(self, x):
+        if isinstance(x, SparsePolynomial):
+            return NotImplemented
+        return self + (-self.__lift(x))
+    
+    def __neg__(self):
+        p = self.p
+        return PolynomialModuloP._make([(p - c) % p for c in self.coef], p)
+    
+    def __mul__(self, x):
+        if isinstance(x, SparsePolynomial):
+            return NotImplemented
+        p = self.p
+        if isinstance(x, PolynomialModuloP):
+            assert self.p == x.p
+            return PolynomialModuloP._make(_mul_lists(self.coef, x.coef, p), p)
+        c = int(x) % p
+        return PolynomialModuloP._make([t * c % p for t in self.coef], p)
+    
+    def __divmod__(self, x):
+        y = self.__lift(x)
+        quot, rem = _divmod_lists(self.coef, y.coef, self.p)
+        return PolynomialModuloP._make(quot, self.p), PolynomialModuloP._make(rem, self.p)
+    
+    def __div__(self, x):
+        return divmod(self, x)[0]
+    
+    def __floordiv__(self, x):
+        return divmod(self, x)[0]
+    
+    def __mod__(self, x):
+        if isinstance(x, ModulusReducer):
+            return x.reduce(self)
+        return divmod(self, x)[1]
+    
+    def __pow__(self, n):
+        return self.power(n)
+    
+    def power(self, degree, modulus = None):
+        # modulus is a polynomial, a ModulusReducer or a FrobeniusMap
+        one = PolynomialModuloP._make([1], self.p)
+        if modulus is None:
+            return _sliding_window_power(self, degree, one, lambda a, b: a * b, lambda a: a * a)
+        if isinstance(modulus, FrobeniusMap):
+            return modulus.power(self, degree)
+        return _sliding_window_power(self % modulus, degree, one,
+                                     lambda a, b: (a * b) % modulus, lambda a: (a * a) % modulus)
+    
+    def __eq__(self, other):
+        if isinstance(other, SparsePolynomial):
+            return NotImplemented
+        if not isinstance(other, PolynomialModuloP):
+            if isinstance(other, Polynomial):
+                other = PolynomialModuloP(other, self.p)
+            else:
+                return self.degree() < 1 and self.coef[:1] == self.__lift(other).coef
+        return self.p == other.p and self.coef == other.coef
+    
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented: return eq
+        return not eq
+    
+    def __radd__(self, x):
+        return self.__add__(x)
+    
+    def __rsub__(self, x):
+        return self.__lift(x) - self
+    
+    def __rmul__(self, x):
+        return self.__mul__(x)
+    
+    def __repr__(self):
+        return repr(Polynomial(self.coef.tolist() if isinstance(self.coef, array) else self.coef))
+
+
+# Reduction modulo a fixed polynomial. Moduli with fewer than
+# SPARSE_MODULUS_WEIGHT terms below the leading one (trinomials,
+# pentanomials, ...) are reduced by shift-and-subtract over their nonzero
+# terms only. Dense moduli of degree at least BARRETT_THRESHOLD use a
+# precomputed reciprocal (Barrett reduction); below that, long division by
+# the monic modulus is faster in practice, see
+# benchmarks/bench_reduction.py.
+
+SPARSE_MODULUS_WEIGHT = 8
+BARRETT_THRESHOLD = 768
+
+def _inverse_series(a, length, p):
+    # a^-1 mod x^length by Newton iteration, a[0] must be invertible
+    g = [pow(a[0], p - 2, p)]
+    prec = 1
+    while prec < length:
+        prec = min(2 * prec, length)
+        e = _mul_lists(a[:prec], g, p)[:prec]
+        e = [(-c) % p for c in e] + [0] * (prec - len(e))
+        e[0] = (e[0] + 2) % p
+        g = _mul_lists(g, e, p)[:prec]
+    return g
+
+class ModulusReducer(object):
+    def __init__(self, f):
+        self.f = f
+        self.p = p = f.p
+        self.n = n = f.degree()
+        if n < 1:
+            raise ValueError("Cannot reduce modulo a constant polynomial")
+        lc_inv = pow(f.coef[-1], p - 2, p)
+        self._monic = [c * lc_inv % p for c in f.coef]
+        low = [(i, c) for (i, c) in enumerate(self._monic[:-1]) if c]
+        self._sparse = low if len(low) < SPARSE_MODULUS_WEIGHT else None
+        self._reciprocal = None
+        if self._sparse is None and n >= BARRETT_THRESHOLD:
+            # reversed monic f has constant term 1; its inverse mod x^(n-1)
+            # gives the quotient of anything of degree up to 2n - 2
+            self._reciprocal = _inverse_series(self._monic[::-1], n - 1, p)
+    
+    def reduce(self, a):
+        coef = a.coef
+        m = len(coef) - 1
+        n, p = self.n, self.p
+        if m < n:
+            return a
+        if self._reciprocal is not None and m <= 2 * n - 2:
+            k = m - n + 1
+            q = _mul_lists(coef[:n - 1:-1], self._reciprocal[:k], p)[:k]
+            q.reverse()
+            qf = _mul_lists(q, self._monic, p)
+            res = [(c - d) % p for (c, d) in zip(coef[:n], qf)]
+            res += coef[len(res):n]
+            return PolynomialModuloP._make(res, p)
+        w = coef.tolist() if isinstance(coef, array) else list(coef)
+        if self._sparse is not None:
+            low = self._sparse
+            for i in range(m, n - 1, -1):
+                c = w[i] % p
+                if c:
+                    base = i - n
+                    for (j, d) in low:
+                        w[base + j] -= c * d
+        else:
+            mon = self._monic[:-1]
+            for i in range(m, n - 1, -1):
+                c = w[i] % p
+                if c:
+                    w[i - n:i] = [x - c * d for (x, d) in zip(w[i - n:i], mon)]
+        return PolynomialModuloP._make([c % p for c in w[:n]], p)
+
+
+
+# The Frobenius map y -> y^q on polynomials modulo f over a field with q
+# elements is linear over that field, so it is kept as the n x n matrix
+# whose column i is x^(iq) mod f. One application costs n^2 coefficient
+# products, against about 1.2 log2(q) modular products for powering; an
+# exponent e = sum d_i q^i then costs one application and one product per
+# digit, plus one powering per distinct digit. The exponents (q^d - 1)/2 of
+# equal-degree splitting and Euler's criterion have a single repeated digit.
+
+class FrobeniusMap(object):
+    def __init__(self, f, q, xq = None):
+        # xq, if known, is x^q mod f
+        self.f = f
+        self.q = q
+        self.n = n = f.degree()
+        if n < 1:
+            raise ValueError("Cannot reduce modulo a constant polynomial")
+        if isinstance(f, PolynomialModuloP):
+            self._modulus = ModulusReducer(f)
+        else:
+            self._modulus = f
+        x = _like(f, [0, 1])
+        if xq is None:
+            xq = x.power(q, self._modulus)
+        self.xq = xq
+        column = _like(f, [1])
+        self._columns = []
+        for i in range(n):
+            coef = _coef_list(column)
+            self._columns.append(coef + [0] * (n - len(coef)))
+            column = self._mulmod(column, xq)
+    
+    def _mulmod(self, a, b):
+        if isinstance(a, PolynomialModuloP):
+            return (a * b) % self._modulus
+        return a.mulmod(b, self.f)
+    
+    def __call__(self, y):
+        # y^q mod f
+        if y.degree() >= self.n:
+            y = y % self._modulus
+        acc = [0] * self.n
+        for (c, column) in zip(_coef_list(y), self._columns):
+            if c:
+                acc = [a + c * v for (a, v) in zip(acc, column)]
+        if isinstance(y, PolynomialModuloP):
+            p = y.p
+            return PolynomialModuloP._make([a % p for a in acc], p)
+        return Polynomial(acc)
+    
+    def power(self, y, e):
+        # y^e mod f with e read in base q (Horner's rule)
+        digits = []
+        while e:
+            e, d = divmod(e, self.q)
+            digits.append(d)
+        one = _like(self.f, [1])
+        y = y % self._modulus
+        square = lambda a: self._mulmod(a, a)
+        powers = {}
+        result = None
+        for d in reversed(digits):
+            if result is not None:
+                result = self(result)
+            if d:
+                t = powers.get(d)
+                if t is None:
+                    t = powers[d] = _sliding_window_power(y, d, one, self._mulmod, square)
+                result = t if result is None else self._mulmod(result, t)
+        return one if result is None else result
+    
+    @staticmethod
+    def pays_off(e, q, n):
+        # Whether power(y, e) is expected to beat plain powering, counting a
+        # Frobenius application as one product and ignoring the setup
+        bits = q.bit_length()
+        digits = set()
+        count = 0
+        while e:
+            e, d = divmod(e, q)
+            digits.add(d)
+            count += 1
+        digits.discard(0)
+        return len(digits) * bits + 2 * count < count * bits
+
+
+# Extended gcd. Small operands go through the remainder sequence one
+# division at a time; large ones through the half-gcd (Knuth-Schoenhage)
+# recursion, which finds the quotients of the leading halves first so that
+# most of the work is in a few large multiplications. Updating the Bezout
+# cofactors makes every classical step about three times as expensive, so
+# the crossover is much lower when they are wanted (HALF_GCD_THRESHOLD, also
+# the base case of the recursion) than for the gcd alone
+# (HALF_GCD_GCD_ONLY_THRESHOLD). Works on PolynomialModuloP and on
+# Polynomial over any field; see benchmarks/bench_gcd.py for the thresholds.
+
+HALF_GCD_THRESHOLD = 512
+HALF_GCD_GCD_ONLY_THRESHOLD = 16384
+
+def _coef_list(a):
+    if isinstance(a, PolynomialModuloP):
+        return list(a.coef)
+    return a.coef._array[:len(a.coef)]
+
+def _like(a, coef):
+    # Polynomial of the same kind as a
+    if isinstance(a, PolynomialModuloP):
+        return PolynomialModuloP._make(coef, a.p)
+    return Polynomial(coef)
+
+def _shift_down(a, k):
+    # a div x^k
+    return _like(a, _coef_list(a)[k:])
+
+def _identity(a):
+    return (_like(a, [1]), _like(a, []), _like(a, []), _like(a, [1]))
+
+def _matrix_mul(M, N):
+    return (M[0] * N[0] + M[1] * N[2], M[0] * N[1] + M[1] * N[3],
+            M[2] * N[0] + M[3] * N[2], M[2] * N[1] + M[3] * N[3])
+
+def _apply(M, a, b):
+    return M[0] * a + M[1] * b, M[2] * a + M[3] * b
+
+def _euclid_step(M, a, b):
+    # One division: (a, b) -> (b, a mod b), M -> [[0, 1], [1, -q]] M
+    q, r = divmod(a, b)
+    if M is not None:
+        M = (M[2], M[3], M[0] - q * M[2], M[1] - q * M[3])
+    return M, b, r
+
+def _half_gcd(a, b):
+    # For deg a > deg b, a matrix M of the remainder sequence with
+    # (c, d) = M (a, b) and deg d < ceil(deg a / 2) <= deg c
+    m = (a.degree() + 1) // 2
+    M = _identity(a)
+    if b.degree() < m:
+        return M
+    if a.degree() < HALF_GCD_THRESHOLD:
+        while b.degree() >= m:
+            M, a, b = _euclid_step(M, a, b)
+        return M
+    R = _half_gcd(_shift_down(a, m), _shift_down(b, m))
+    a, b = _apply(R, a, b)
+    if b.degree() < m:
+        return R
+    R, a, b = _euclid_step(R, a, b)
+    if b.degree() < m:
+        return R
+    k = 2 * m - a.degree()
+    return _matrix_mul(_half_gcd(_shift_down(a, k), _shift_down(b, k)), R)
+
+def gcdex(a, b, cofactors = True):
+    # (g, s, t) with g = s a + t b the monic gcd of a and b (zero if both
+    # are). With cofactors=False s and t are not tracked and come back None.
+    M = _identity(a) if cofactors else None
+    threshold = HALF_GCD_THRESHOLD if cofactors else HALF_GCD_GCD_ONLY_THRESHOLD
+    if b.degree() > a.degree():
+        a, b = b, a
+        if M is not None:
+            M = (M[2], M[3], M[0], M[1])
+    while b.degree() >= 0:
+        if a.degree() >= threshold and a.degree() > b.degree() and 2 * b.degree() > a.degree():
+            R = _half_gcd(a, b)
+            a, b = _apply(R, a, b)
+            if M is not None:
+                M = _matrix_mul(R, M)
+            if b.degree() < 0:
+                break
+        M, a, b = _euclid_step(M, a, b)
+    if a.degree() < 0:
+        if M is None:
+            return a, None, None
+        return a, M[0], M[1]
+    lc = _coef_list(a)[-1]
+    if isinstance(a, PolynomialModuloP):
+        inv = pow(lc, a.p - 2, a.p)
+    else:
+        inv = 1 / lc
+    if M is None:
+        return a * inv, None, None
+    return a * inv, M[0] * inv, M[1] * inv
+
+
+# Sparse polynomials keep only their nonzero terms, as a dict from exponent to
+# coefficient, so x^(p^n) - x is two entries rather than p^n + 1. Reduction
+# modulo a dense polynomial f powers x modulo f once per term, walking the
+# exponents upwards so that each step only powers the gap from the previous
+# one. Results with degree below SPARSE_MIN_DEGREE, or with more than
+# SPARSE_FILL_RATIO of their coefficients nonzero, come back dense; see
+# sparse_or_dense.
+
+SPARSE_FILL_RATIO = 0.25
+SPARSE_MIN_DEGREE = 64
+
+def _prefers_sparse(weight, degree):
+    return degree >= SPARSE_MIN_DEGREE and weight <= SPARSE_FILL_RATIO * (degree + 1)
+
+def sparse_or_dense(poly):
+    # poly in whichever form suits its fill ratio
+    if isinstance(poly, SparsePolynomial):
+        if _prefers_sparse(poly.weight(), poly.degree()):
+            return poly
+        return poly.to_dense()
+    if poly.degree() < SPARSE_MIN_DEGREE:
+        return poly
+    sparse = SparsePolynomial(poly)
+    return sparse if _prefers_sparse(sparse.weight(), sparse.degree()) else poly
+
+class SparsePolynomial(object):
+    def __init__(self, terms, p = None):
+        # terms is a dict or an iterable of (exponent, coefficient) pairs, or
+        # a dense polynomial; with p the coefficients are integers mod p
+        if isinstance(terms, SparsePolynomial):
+            p = terms.p
+            terms = terms.terms.items()
+        elif isinstance(terms, PolynomialModuloP):
+            p = terms.p
+            terms = enumerate(terms.coef)
+        elif isinstance(terms, Polynomial):
+            terms = enumerate(_coef_list(terms))
+        elif isinstance(terms, dict):
+            terms = terms.items()
+        self.p = p
+        self.terms = {}
+        for (e, c) in terms:
+            if e < 0:
+                raise ValueError("Exponents must be non-negative")
+            if p is not None:
+                c = int(c) % p
+            if e in self.terms:
+                c = self.terms[e] + c
+                if p is not None:
+                    c %= p
+            self.terms[e] = c
+        for e in [e for (e, c) in self.terms.items() if c == 0]:
+            del self.terms[e]
+    
+    @classmethod
+    def _make(cls, terms, p):
+        # terms must already be reduced and free of zeros; it is consumed
+        result = cls.__new__(cls)
+        result.p = p
+        result.terms = terms
+        return result
+    
+    def degree(self):
+        return max(self.terms) if self.terms else -1
+    
+    def weight(self):
+        return len(self.terms)
+    
+    def to_dense(self):
+        if self.p is not None:
+            coef = [0] * (self.degree() + 1)
+            for (e, c) in self.terms.items():
+                coef[e] = c
+            return PolynomialModuloP._make(coef, self.p)
+        if not self.terms:
+            return Polynomial([])
+        c = self.terms[self.degree()]
+        coef = [c - c] * (self.degree() + 1)
+        for (e, c) in self.terms.items():
+            coef[e] = c
+        return Polynomial(coef)
+    
+    def __lift(self, x):
+        if isinstance(x, SparsePolynomial):
+            if None not in (self.p, x.p) and self.p != x.p:
+                raise ValueError("Cannot combine polynomials over Z_{0} and Z_{1}".format(self.p, x.p))
+            return x
+        if isinstance(x, PolynomialModuloP):
+            if self.p is not None and self.p != x.p:
+                raise ValueError("Cannot combine polynomials over Z_{0} and Z_{1}".format(self.p, x.p))
+            return SparsePolynomial(x, x.p)
+        if isinstance(x, Polynomial):
+            return SparsePolynomial(x, self.p)
+        return SparsePolynomial([(0, x)], self.p)
+    
+    def __combine(self, x, sign):
+        y = self.__lift(x)
+        p = self.p if self.p is not None else y.p
+        if p == self.p:
+            terms = dict(self.terms)
+        else:
+            terms = dict((e, c % p) for (e, c) in self.terms.items() if c % p)
+        for (e, c) in y.terms.items():
+            c = terms[e] + c * sign if e in terms else c * sign
+            if p is not None:
+                c %= p
+            if c == 0:
+                terms.pop(e, None)
+            else:
+                terms[e] = c
+        return sparse_or_dense(SparsePolynomial._make(terms, p))
+    
+    def __add__(self, x):
+        return self.__combine(x, 1)
+    
+    def __sub__(self, x):
+        return self.__combine(x, -1)
+    
+    def __neg__(self):
+        p = self.p
+        if p is not None:
+            return SparsePolynomial._make(dict((e, p - c) for (e, c) in self.terms.items()), p)
+        return SparsePolynomial._make(dict((e, -c) for (e, c) in self.terms.items()), p)
+    
+    def __mul__(self, x):
+        y = self.__lift(x)
+        p = self.p if self.p is not None else y.p
+        terms = {}
+        for (e, c) in self.terms.items():
+            for (f, d) in y.terms.items():
+                k = e + f
+                terms[k] = terms[k] + c * d if k in terms else c * d
+        if p is not None:
+            terms = dict((e, c % p) for (e, c) in terms.items())
+        terms = dict((e, c) for (e, c) in terms.items() if c != 0)
+        return sparse_or_dense(SparsePolynomial._make(terms, p))
+    
+    def __mod__(self, modulus):
+        # Dense remainder modulo a polynomial, a ModulusReducer or a
+        # FrobeniusMap (whose powering then reads the gaps in base q)
+        f = modulus.f if isinstance(modulus, (ModulusReducer, FrobeniusMap)) else modulus
+        reduce_by = modulus._modulus if isinstance(modulus, FrobeniusMap) else modulus
+        n = f.degree()
+        if n < 1:
+            raise ValueError("Cannot reduce modulo a constant polynomial")
+        modular = isinstance(f, PolynomialModuloP)
+        # Coefficients are brought into the ring of f: integers mod f.p, or
+        # multiples of its unit
+        if modular:
+            p = f.p
+            if self.p is not None and self.p != p:
+                raise ValueError("Cannot reduce a polynomial over Z_{0} modulo one over Z_{1}".format(self.p, p))
+            x = PolynomialModuloP._make([0, 1], p)
+            mulmod = lambda a, b: (a * b) % reduce_by
+            lift = lambda c: int(c) % p
+            zero = 0
+        else:
+            one = f.coef[n] / f.coef[n]
+            zero = one - one
+            x = Polynomial([zero, one])
+            mulmod = lambda a, b: a.mulmod(b, f)
+            lift = lambda c: c * one
+        low = [zero] * n
+        for (e, c) in self.terms.items():
+            if e < n:
+                low[e] = lift(c)
+        result = PolynomialModuloP._make(low, p) if modular else Polynomial(low)
+        xe = None
+        last = 0
+        for e in sorted(e for e in self.terms if e >= n):
+            step = x.power(e - last, modulus)
+            xe = step if xe is None else mulmod(xe, step)
+            last = e
+            if modular:
+                result = result + xe * lift(self.terms[e])
+            else:
+                result.add_product(xe, lift(self.terms[e]))
+        return result
+    
+    def __pow__(self, n):
+        return self.power(n)
+    
+    def power(self, degree, modulus = None):
+        if modulus is not None:
+            return (self % modulus).power(degree, modulus)
+        if self.weight() == 0:
+            return self
+        if self.weight() == 1:
+            [(e, c)] = self.terms.items()
+            c = pow(c, degree, self.p) if self.p is not None else c ** degree
+            return sparse_or_dense(SparsePolynomial._make({e * degree: c}, self.p))
+        if self.p is not None:
+            one = SparsePolynomial._make({0: 1}, self.p)
+        else:
+            c = self.terms[self.degree()]
+            one = SparsePolynomial._make({0: c / c}, None)
+        return _sliding_window_power(self, degree, one, lambda a, b: a * b, lambda a: a * a)
+    
+    def __eq__(self, other):
+        if isinstance(other, SparsePolynomial):
+            return self.p == other.p and self.terms == other.terms
+        return self.terms == self.__lift(other).terms
+    
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented: return eq
+        return not eq
+    
+    def __radd__(self, x):
+        return self.__add__(x)
+    
+    def __rsub__(self, x):
+        return -(self.__sub__(x))
+    
+    def __rmul__(self, x):
+        return self.__mul__(x)
+    
+    def __repr__(self):
+        res = []
+        for e in sorted(self.terms):
+            c = self.terms[e]
+            if e == 0:
+                res.append(str(c))
+            else:
+                res.append(("" if c == 1 else str(c) + "*") + "x" + ("" if e == 1 else "^" + str(e)))
+        return " + ".join(res) if res else "0"
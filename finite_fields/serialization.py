@@ -0,0 +1,167 @@
+# Compact binary format for sequences of elements of one finite field.
+#
+# A file is a header followed by fixed-width records, one per element:
+#
+#   magic 'FFEL', version (1 byte), record width in bytes (1 byte),
+#   2 zero bytes, byte length L of p (uint32), degree n of the modulus
+#   (uint32), p (L bytes), the n + 1 coefficients of the modulus (L bytes
+#   each), zero padding up to a multiple of HEADER_ALIGNMENT bytes.
+#
+# A record is the element's index, its coefficients read as base-p digits,
+# as a little-endian unsigned integer. All integers are little-endian.
+# Records of up to 8 bytes are widened to 1, 2, 4 or 8 bytes so that they
+# can be read with struct; the number of records is implied by the file size.
+#
+# MappedElements reads such a file through mmap, so elements are only
+# decoded when they are asked for.
+
+import mmap
+import struct
+from ff_array import FFArray
+from finite_field import FFElement, _restore_field
+
+MAGIC = 'FFEL'
+VERSION = 1
+HEADER_ALIGNMENT = 8
+# Records written per call to write() by write_elements
+WRITE_CHUNK_SIZE = 4096
+
+_FIXED = '<4sBBHII'
+_STRUCT_CODES = {1: 'B', 2: 'H', 4: 'I', 8: 'Q'}
+
+def _byte_length(n):
+    return max(1, (n.bit_length() + 7) // 8)
+
+def record_width(field):
+    width = _byte_length(field.q - 1)
+    if width <= 8:
+        return min(w for w in _STRUCT_CODES if w >= width)
+    return width
+
+def _encode_ints(values, width):
+    code = _STRUCT_CODES.get(width)
+    if code is not None:
+        return struct.pack('<{0}{1}'.format(len(values), code), *values)
+    return ''.join(('{0:0{1}x}'.format(v, 2 * width)).decode('hex')[::-1] for v in values)
+
+def _decode_ints(data, offset, count, width):
+    code = _STRUCT_CODES.get(width)
+    if code is not None:
+        return list(struct.unpack_from('<{0}{1}'.format(count, code), data, offset))
+    result = []
+    for i in range(count):
+        start = offset + i * width
+        result.append(int(data[start:start + width][::-1].encode('hex'), 16))
+    return result
+
+def encode_header(field):
+    p = field.p
+    n = field.f.degree()
+    length = _byte_length(p)
+    header = struct.pack(_FIXED, MAGIC, VERSION, record_width(field), 0, length, n)
+    header += _encode_ints([p], length) + _encode_ints(list(field.f.coef), length)
+    return header + '\0' * (-len(header) % HEADER_ALIGNMENT)
+
+def decode_header(data):
+    # (field, record width, header length) of the data starting with a header
+    size = struct.calcsize(_FIXED)
+    if len(data) < size:
+        raise ValueError("Truncated header")
+    (magic, version, width, _, length, n) = struct.unpack_from(_FIXED, data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a field element file")
+    if version != VERSION:
+        raise ValueError("Unsupported format version {0}".format(version))
+    end = size + (n + 2) * length
+    if len(data) < end:
+        raise ValueError("Truncated header")
+    values = _decode_ints(data, size, n + 2, length)
+    field = _restore_field(values[0], values[1:])
+    if width != record_width(field):
+        raise ValueError("Record width {0} does not match the field".format(width))
+    return (field, width, end + (-end % HEADER_ALIGNMENT))
+
+def _indices(field, elements):
+    if isinstance(elements, FFArray):
+        assert elements.field == field
+        return elements.indices()
+    result = []
+    for e in elements:
+        if not isinstance(e, FFElement):
+            e = field.const(e)
+        elif e.field is not field:
+            assert e.field == field
+        result.append(e.index)
+    return result
+
+def dumps(field, elements):
+    return encode_header(field) + _encode_ints(_indices(field, elements), record_width(field))
+
+def loads(data):
+    # FFArray of the elements in data
+    (field, width, start) = decode_header(data)
+    if (len(data) - start) % width:
+        raise ValueError("Data does not end on a record boundary")
+    return FFArray.from_indices(field, _decode_ints(data, start, (len(data) - start) // width, width))
+
+def write_elements(fileobj, field, elements):
+    # Streams elements, an iterable of FFElements, to fileobj with a header
+    fileobj.write(encode_header(field))
+    width = record_width(field)
+    chunk = []
+    for e in elements:
+        chunk.append(e)
+        if len(chunk) == WRITE_CHUNK_SIZE:
+            fileobj.write(_encode_ints(_indices(field, chunk), width))
+            chunk = []
+    if chunk:
+        fileobj.write(_encode_ints(_indices(field, chunk), width))
+
+class MappedElements(object):
+    # Read-only sequence of the elements in a file written by dumps or
+    # write_elements, decoded from the mapped file on access
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (self.field, self.width, self._start) = decode_header(self._map)
+            if (len(self._map) - self._start) % self.width:
+                raise ValueError("File does not end on a record boundary")
+        except ValueError:
+            self._map.close()
+            raise
+        self._length = (len(self._map) - self._start) // self.width
+    
+    def __len__(self):
+        return self._length
+    
+    def indices(self, start = 0, stop = None):
+        (start, stop, _) = slice(start, stop).indices(self._length)
+        count = max(0, stop - start)
+        return _decode_ints(self._map, self._start + start * self.width, count, self.width)
+    
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            (start, stop, step) = i.indices(self._length)
+            if step == 1:
+                return FFArray.from_indices(self.field, self.indices(start, stop))
+            return FFArray.from_indices(self.field, [self.indices(k, k + 1)[0] for k in range(start, stop, step)])
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("MappedElements index out of range")
+        return FFElement._from_index(self.field, self.indices(i, i + 1)[0])
+    
+    def __iter__(self):
+        for start in range(0, self._length, WRITE_CHUNK_SIZE):
+            for index in self.indices(start, start + WRITE_CHUNK_SIZE):
+                yield FFElement._from_index(self.field, index)
+    
+    def close(self):
+        self._map.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,136 @@
+# Lazy, chunked maps over long streams of field elements.
+#
+# Inputs may be FFElements, coefficient tuples (lowest degree first) or
+# serialised records (byte strings in the record format of serialization),
+# mixed freely, or a MappedElements file. They are read CHUNK_SIZE at a
+# time, mapped as one FFArray per chunk and yielded one result at a time,
+# so memory stays bounded by a few chunks whatever the length of the stream.
+#
+# With processes > 1 chunks are mapped on a multiprocessing pool, at most
+# 2 * processes of them in flight, and results still come out in input
+# order. Chunks travel to the workers as lists of element indices.
+
+from collections import deque
+from itertools import islice
+import multiprocessing
+from ff_array import FFArray
+from finite_field import FFElement, _coefficient_field
+from serialization import MappedElements, record_width, _encode_ints, _decode_ints
+
+CHUNK_SIZE = 4096
+
+OUTPUTS = ['elements', 'indices', 'coefficients', 'records']
+
+def _index_of(field, item):
+    if isinstance(item, FFElement):
+        if item.field is not field and item.field != field:
+            raise ValueError("Element of {0} in a stream over {1}".format(item.field, field))
+        return item.index
+    if isinstance(item, str):
+        return _decode_ints(item, 0, 1, len(item))[0]
+    p = field.p
+    if len(item) > field.f.degree():
+        raise ValueError("Tuple has more than {0} coefficients".format(field.f.degree()))
+    index = 0
+    for c in reversed(item):
+        index = index * p + c % p
+    return index
+
+def _chunks(items, field, size):
+    # Lists of the indices of successive chunks of items
+    if isinstance(items, MappedElements):
+        if items.field != field:
+            raise ValueError("Element file over {0} in a stream over {1}".format(items.field, field))
+        for start in xrange(0, len(items), size):
+            yield items.indices(start, start + size)
+        return
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield [_index_of(field, item) for item in chunk]
+
+def _map_chunk(args):
+    # Indices of the images of one chunk; None marks zeros that have no inverse
+    (operation, argument, field, indices) = args
+    a = FFArray.from_indices(field, indices)
+    if operation == 'isomorphism':
+        return argument(a).indices()
+    if operation == 'evaluate':
+        if not argument:
+            return [0] * len(indices)
+        result = FFArray.from_indices(field, [argument[-1]] * len(indices))
+        for c in reversed(argument[:-1]):
+            result = result * a + field.element_from_index(c)
+        return result.indices()
+    # operation == 'inverse'
+    inverses = FFArray.from_indices(field, [i or 1 for i in indices]).inverse().indices()
+    return [j if i else None for (i, j) in zip(indices, inverses)]
+
+def _formatter(field, output):
+    if output == 'elements':
+        return lambda i: FFElement._from_index(field, i)
+    if output == 'indices':
+        return lambda i: i
+    if output == 'coefficients':
+        (p, n) = (field.p, field.f.degree())
+        def coefficients(i):
+            coef = []
+            for k in range(n):
+                (i, c) = divmod(i, p)
+                coef.append(c)
+            return tuple(coef)
+        return coefficients
+    if output == 'records':
+        width = record_width(field)
+        return lambda i: _encode_ints([i], width)
+    raise ValueError("Unknown output {0}, expected one of {1}".format(output, OUTPUTS))
+
+def _stream(operation, argument, field, target, items, chunk_size, processes, output):
+    # Checks the arguments now rather than on the first next()
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+    form = _formatter(target, output)
+    return _generate(operation, argument, field, form, _chunks(items, field, chunk_size), processes)
+
+def _generate(operation, argument, field, form, chunks, processes):
+    if processes is None or processes <= 1:
+        for indices in chunks:
+            for i in _map_chunk((operation, argument, field, indices)):
+                yield None if i is None else form(i)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = deque()
+        for indices in chunks:
+            pending.append(pool.apply_async(_map_chunk, ((operation, argument, field, indices),)))
+            if len(pending) < 2 * processes:
+                continue
+            for i in pending.popleft().get():
+                yield None if i is None else form(i)
+        while pending:
+            for i in pending.popleft().get():
+                yield None if i is None else form(i)
+    finally:
+        # Also runs when the consumer stops early
+        pool.terminate()
+        pool.join()
+
+def map_isomorphism(isomorphism, items, chunk_size = CHUNK_SIZE, processes = None, output = 'elements'):
+    # Images under a FieldIsomorphism of the elements of its source field
+    return _stream('isomorphism', isomorphism, isomorphism.source, isomorphism.target,
+                   items, chunk_size, processes, output)
+
+def evaluate(poly, items, field = None, chunk_size = CHUNK_SIZE, processes = None, output = 'elements'):
+    # poly(x) for every x in items; field defaults to that of the
+    # coefficients of poly
+    if field is None:
+        field = _coefficient_field(poly)
+    d = poly.degree()
+    coef = [c.index if isinstance(c, FFElement) else field.const(c).index for c in list(poly.coef)[:d + 1]]
+    return _stream('evaluate', coef, field, field, items, chunk_size, processes, output)
+
+def batch_inverse(items, field, chunk_size = CHUNK_SIZE, processes = None, output = 'elements'):
+    # 1/x for every x in items, None for zeros
+    return _stream('inverse', None, field, field, items, chunk_size, processes, output)
@@ -3,5 +3,16 @@ set PYTHONPATH=%PYTHONPATH%;%CD%\finite_fields
 cd tests
 python test_polynomial.py
 python test_finite_field.py
+python test_binary_field.py
+python test_ff_array.py
+python test_irreducibles.py
+python test_factorization.py
+python test_isomorphism.py
+python test_multipoint.py
+python test_number_theory.py
+python test_discrete_log.py
+python test_ff_matrix.py
+python test_serialization.py
+python test_streaming.py
 pause
 cd ..
\ No newline at end of file
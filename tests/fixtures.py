@@ -0,0 +1,28 @@
+# Shared test setup. Importing this module points the irreducibles cache at a
+# fresh temporary file, so that the tests neither write to the user's cache
+# nor depend on what earlier runs left in it. It also holds the fields and
+# random elements that several test modules share.
+
+import atexit
+import os
+import shutil
+import tempfile
+from random import randint
+import irreducibles
+from finite_field import FiniteField
+from polynomial import Polynomial
+
+_cache_dir = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, _cache_dir, True)
+irreducibles.CACHE_PATH = os.path.join(_cache_dir, 'irreducibles.txt')
+irreducibles.reload()
+
+def small_fields():
+    # GF(2^8) with and without log tables, GF(3^4) without and GF((2^61 - 1)^2)
+    return [FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2, log_tables=False),
+            FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2),
+            FiniteField(Polynomial([2, 0, 0, 1, 1]), 3, log_tables=False),
+            FiniteField(Polynomial([1, 0, 1]), 2 ** 61 - 1)]
+
+def random_elements(field, n, nonzero = False):
+    return [field.element_from_index(randint(1 if nonzero else 0, field.q - 1)) for i in range(n)]
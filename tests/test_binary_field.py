@@ -0,0 +1,76 @@
+import unittest
+import fixtures
+from random import getrandbits
+import binary_field
+from binary_field import BinaryFieldArithmetic, clmul, square
+from finite_field import FiniteField, is_polynomial_irreducible
+from polynomial import Polynomial, PolynomialModuloP
+
+def bits(poly):
+    return sum(c << i for (i, c) in enumerate(poly.coef))
+
+def poly(bits):
+    return PolynomialModuloP([(bits >> i) & 1 for i in range(bits.bit_length())], 2)
+
+# x^233 + x^74 + 1 and x^128 + x^7 + x^2 + x + 1
+B233 = (1 << 233) | (1 << 74) | 1
+B128 = (1 << 128) | 0x87
+
+class TestCarrylessArithmetic(unittest.TestCase):
+    def test_clmul(self):
+        for n in [3, 31, 64, 200]:
+            a = getrandbits(n)
+            b = getrandbits(n)
+            self.assertEqual(clmul(a, b), bits(poly(a) * poly(b)))
+        self.assertEqual(clmul(0b11, 0b11), 0b101)
+    
+    def test_square(self):
+        a = getrandbits(300)
+        self.assertEqual(square(a), clmul(a, a))
+    
+    def test_irreducible(self):
+        self.assertTrue(binary_field.is_irreducible(B233))
+        self.assertTrue(binary_field.is_irreducible(B128))
+        self.assertTrue(binary_field.is_irreducible(0b100011011))
+        self.assertFalse(binary_field.is_irreducible(0b10101))
+        self.assertFalse(binary_field.is_irreducible(clmul(B128, 0b111)))
+
+class TestBinaryFieldArithmetic(unittest.TestCase):
+    def test_against_polynomials(self):
+        for f in [0b100011011, B128, B233]:
+            arith = BinaryFieldArithmetic(f)
+            n = f.bit_length() - 1
+            for i in range(20):
+                a = getrandbits(n)
+                b = getrandbits(n) | 1
+                self.assertEqual(arith.mul(a, b), bits(poly(a) * poly(b) % poly(f)))
+                self.assertEqual(arith.square(a), arith.mul(a, a))
+                self.assertEqual(arith.mul(arith.inverse(b), b), 1)
+                self.assertEqual(arith.div(a, b), arith.mul(a, arith.inverse(b)))
+                self.assertEqual(arith.pow(b, 5), arith.mul(arith.square(arith.square(b)), b))
+                self.assertEqual(arith.pow(b, -1), arith.inverse(b))
+        self.assertRaises(ZeroDivisionError, BinaryFieldArithmetic(B128).inverse, 0)
+    
+    def test_field_uses_bitmasks(self):
+        field = FiniteField(poly(B233), 2)
+        self.assertTrue(field._arithmetic() is field._binary)
+        a = field.element_from_index(getrandbits(233))
+        b = field.element_from_index(getrandbits(233) | 1)
+        self.assertEqual((a * b).x, a.x * b.x % field.f)
+        self.assertEqual((a + b).x, a.x + b.x)
+        self.assertEqual((a / b) * b, a)
+        self.assertEqual(a ** 3, a * a * a)
+        self.assertEqual(-a, a)
+        self.assertEqual(a - b, a + b)
+        inverses = field.batch_inverse([a, field.zero(), b])
+        self.assertEqual(inverses[0] * a, field.one())
+        self.assertTrue(inverses[1] is None)
+        self.assertEqual(inverses[2] * b, field.one())
+    
+    def test_rijndael_field_keeps_log_tables(self):
+        field = FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2)
+        self.assertTrue(field._arithmetic() is field._log_tables())
+        self.assertTrue(is_polynomial_irreducible(field.f))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import fixtures
+from random import randint
+import discrete_log
+from finite_field import FiniteField
+from polynomial import Polynomial
+
+class TestOrders(unittest.TestCase):
+    def test_primitive_element(self):
+        with_tables = FiniteField(Polynomial([2, 4, 4, 0, 1]), 5)
+        without = FiniteField(Polynomial([2, 4, 4, 0, 1]), 5, log_tables=False)
+        g = with_tables.primitive_element()
+        self.assertEqual(g.index, with_tables._log_tables().exp[1])
+        self.assertEqual(without.primitive_element().index, g.index)
+        self.assertEqual(g.order(), with_tables.q - 1)
+        field = FiniteField.of_size(2 ** 64)
+        self.assertEqual(field.primitive_element().order(), field.q - 1)
+    
+    def test_order(self):
+        field = FiniteField(Polynomial([2, 1, 0, 0, 1]), 3, log_tables=False)
+        for i in range(1, field.q):
+            a = field.element_from_index(i)
+            n = 1
+            b = a
+            while b != field.one():
+                b = b * a
+                n += 1
+            self.assertEqual(a.order(), n)
+        self.assertRaises(ValueError, field.zero().order)
+
+class TestDiscreteLog(unittest.TestCase):
+    def setUp(self):
+        self.limit = discrete_log.BABY_STEP_MEMORY_LIMIT
+        discrete_log._cache.clear()
+    
+    def tearDown(self):
+        discrete_log.BABY_STEP_MEMORY_LIMIT = self.limit
+        discrete_log._cache.clear()
+    
+    def check_logs(self, field, count):
+        g = field.primitive_element()
+        for i in range(count):
+            k = randint(0, field.q - 2)
+            self.assertEqual((g ** k).log(), k)
+    
+    def test_tables_and_pohlig_hellman_agree(self):
+        for tables in [True, False]:
+            field = FiniteField(Polynomial([2, 4, 4, 0, 1]), 5, log_tables=tables)
+            self.check_logs(field, 20)
+            base = field.primitive_element() ** 6
+            a = base ** 17
+            self.assertEqual(a.log(base), 17)
+            self.assertEqual(field.one().log(base), 0)
+            self.assertRaises(ValueError, field.primitive_element().log, base)
+            self.assertRaises(ValueError, field.zero().log)
+    
+    def test_large_fields(self):
+        self.check_logs(FiniteField.of_size(2 ** 61 - 1), 3)
+        self.check_logs(FiniteField.of_size(2 ** 64), 3)
+        self.check_logs(FiniteField.of_size((2 ** 61 - 1) ** 2), 2)
+    
+    def test_pollard_rho(self):
+        discrete_log.BABY_STEP_MEMORY_LIMIT = 0
+        self.check_logs(FiniteField.of_size(2 ** 32), 3)
+        self.assertEqual(len(discrete_log._cache), 0)
+    
+    def test_table_cache(self):
+        field = FiniteField.of_size(2 ** 32)
+        # Nonzero mod every prime factor of 2^32 - 1 = 3 * 5 * 17 * 257 * 65537,
+        # so that each subgroup needs its table
+        k = field.q - 2
+        self.assertEqual((field.primitive_element() ** k).log(), k)
+        self.assertEqual(len(discrete_log._cache), 5)
+        used = discrete_log._cache.used
+        self.check_logs(field, 3)
+        self.assertEqual(discrete_log._cache.used, used)
+        # Least recently used tables go first
+        discrete_log.BABY_STEP_MEMORY_LIMIT = 257 * discrete_log.BABY_STEP_ENTRY_BYTES
+        self.check_logs(field, 1)
+        self.assertTrue(discrete_log._cache.used <= discrete_log.BABY_STEP_MEMORY_LIMIT)
+        self.assertTrue(len(discrete_log._cache) < 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import fixtures
+from random import seed, randint
+from finite_field import FiniteField, is_polynomial_irreducible
+from factorization import factor, roots, square_free_factorization, distinct_degree_factorization, berlekamp_factorization
+from polynomial import Polynomial, PolynomialModuloP
+
+def random_monic(field, n):
+    return Polynomial([field.element_from_index(randint(0, field.q - 1)) for i in range(n)] + [field.one()])
+
+def product(field, factors):
+    res = Polynomial([field.one()])
+    for (g, e) in factors:
+        for i in range(e):
+            res = res * g
+    return res
+
+class TestFactor(unittest.TestCase):
+    def setUp(self):
+        seed(12)
+    
+    def check(self, field, poly, processes = None):
+        factors = factor(poly, processes)
+        self.assertEqual(product(field, factors) * poly.coef[poly.degree()], poly)
+        for (g, e) in factors:
+            self.assertEqual(g.coef[g.degree()], field.one())
+            if field.f.degree() == 1:
+                coef = [(c.index if hasattr(c, 'index') else c) for c in list(g.coef)[:g.degree() + 1]]
+                self.assertTrue(is_polynomial_irreducible(PolynomialModuloP(coef, field.p)))
+        gs = [g for (g, e) in factors]
+        self.assertEqual(len(gs), len(set(repr(g) for g in gs)))
+        return factors
+    
+    def test_multiplicities(self):
+        F = FiniteField.of_size(3)
+        x = Polynomial([F.zero(), F.one()])
+        g1 = x + 1
+        g2 = x * x + 1
+        g3 = x * x * x - x + 1
+        poly = g1 * g1 * g1 * g1 * g2 * g2 * g2 * g3 * 2
+        factors = self.check(F, poly)
+        self.assertEqual([(g.degree(), e) for (g, e) in factors], [(1, 4), (2, 3), (3, 1)])
+    
+    def test_square_free(self):
+        F = FiniteField.of_size(5)
+        x = Polynomial([F.zero(), F.one()])
+        g = x * x + 2
+        parts = square_free_factorization(g * g * g * g * g * (x + 1))
+        self.assertEqual(sorted((h.degree(), e) for (h, e) in parts), [(1, 1), (2, 5)])
+    
+    def test_constant(self):
+        for F in [FiniteField.of_size(5), FiniteField.of_size(2 ** 4)]:
+            self.assertEqual(factor(Polynomial([F.const(3)])), [])
+            self.assertEqual(square_free_factorization(Polynomial([F.one()])), [])
+    
+    def test_random_small_field(self):
+        F = FiniteField.of_size(7)
+        for i in range(5):
+            self.check(F, random_monic(F, 12))
+    
+    def test_random_large_field(self):
+        for q in [125, 256, 1009]:
+            F = FiniteField.of_size(q)
+            poly = random_monic(F, 9)
+            factors = self.check(F, poly)
+            self.assertEqual(sum(g.degree() * e for (g, e) in factors), 9)
+    
+    def test_berlekamp_agrees(self):
+        F = FiniteField.of_size(9)
+        poly = random_monic(F, 10)
+        for (g, e) in square_free_factorization(poly):
+            split = berlekamp_factorization(g)
+            degrees = []
+            for (h, d) in distinct_degree_factorization(g):
+                degrees += [d] * (h.degree() // d)
+            self.assertEqual(sorted(h.degree() for h in split), sorted(degrees))
+    
+    def test_parallel(self):
+        F = FiniteField.of_size(101)
+        x = Polynomial([F.zero(), F.one()])
+        poly = (x - 3) * (x - 5) * (x * x - 2) * (x * x * x + x + 1) * (x * x * x - 2) * random_monic(F, 6)
+        self.assertEqual(repr(factor(poly, processes=2)), repr(factor(poly)))
+    
+    def test_roots(self):
+        F = FiniteField.of_size(343)
+        elems = [F.element_from_index(i) for i in [5, 17, 200, 342]]
+        x = Polynomial([F.zero(), F.one()])
+        poly = x * x + x + F.element_from_index(3)
+        for a in elems:
+            poly = poly * (x - a)
+        found = roots(poly)
+        for a in elems:
+            self.assertTrue(a in found)
+        for r in found:
+            self.assertEqual(sum(c * r ** i for (i, c) in enumerate(poly.coef)), F.zero())
+        self.assertEqual(roots(x), [F.zero()])
+        self.assertEqual(roots(x * x + x + F.element_from_index(3)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import fixtures
+from fixtures import random_elements, small_fields
+from finite_field import FiniteField, NumberModuloP
+from ff_array import FFArray
+
+class TestFFArray(unittest.TestCase):
+    def setUp(self):
+        self.fields = small_fields()
+    
+    def test_roundtrip(self):
+        for field in self.fields:
+            a = random_elements(field, 20)
+            arr = FFArray.from_elements(a)
+            self.assertEqual(len(arr), 20)
+            self.assertEqual(arr.to_elements(), a)
+            self.assertEqual(arr[3], a[3])
+            self.assertEqual(arr[-1], a[-1])
+            self.assertEqual(arr[2:5].to_elements(), a[2:5])
+            self.assertEqual(FFArray.from_coefficients(field, arr.coefficients()), arr)
+    
+    def test_elementwise(self):
+        for field in self.fields:
+            a = random_elements(field, 30)
+            b = random_elements(field, 30, nonzero=True)
+            (A, B) = (FFArray.from_elements(a), FFArray.from_elements(b))
+            self.assertEqual((A + B).to_elements(), [x + y for (x, y) in zip(a, b)])
+            self.assertEqual((A - B).to_elements(), [x - y for (x, y) in zip(a, b)])
+            self.assertEqual((-A).to_elements(), [-x for x in a])
+            self.assertEqual((A * B).to_elements(), [x * y for (x, y) in zip(a, b)])
+            self.assertEqual((A / B).to_elements(), [x / y for (x, y) in zip(a, b)])
+            self.assertEqual((A ** 5).to_elements(), [x ** 5 for x in a])
+            self.assertEqual((A ** 0).to_elements(), [field.one()] * 30)
+            self.assertEqual(B.inverse().to_elements(), [y.inverse() for y in b])
+    
+    def test_broadcast(self):
+        for field in self.fields:
+            a = random_elements(field, 10)
+            c = random_elements(field, 1, nonzero=True)[0]
+            A = FFArray.from_elements(a)
+            self.assertEqual((A * c).to_elements(), [x * c for x in a])
+            self.assertEqual((c * A).to_elements(), [c * x for x in a])
+            self.assertEqual((A + 3).to_elements(), [x + 3 for x in a])
+            self.assertEqual((1 - A).to_elements(), [1 - x for x in a])
+            self.assertEqual((A * NumberModuloP(2, field.p)).to_elements(), [x * 2 for x in a])
+            self.assertEqual((A / c).to_elements(), [x / c for x in a])
+    
+    def test_mixed_forms(self):
+        # Arrays built from coefficients hold columns, those built from
+        # elements hold indices
+        for field in self.fields + [FiniteField.of_size(2 ** 64)]:
+            a = random_elements(field, 20)
+            b = random_elements(field, 20, nonzero=True)
+            A = FFArray.from_coefficients(field, FFArray.from_elements(a).coefficients())
+            B = FFArray.from_elements(b)
+            self.assertEqual(A, FFArray.from_elements(a))
+            self.assertEqual((A * B).to_elements(), [x * y for (x, y) in zip(a, b)])
+            self.assertEqual((B * A + A).to_elements(), [y * x + x for (x, y) in zip(a, b)])
+            self.assertEqual((B - A)[3:7].to_elements(), [y - x for (x, y) in zip(a, b)][3:7])
+            self.assertEqual((B ** -3).to_elements(), [y ** -3 for y in b])
+    
+    def test_zero_division(self):
+        for field in self.fields:
+            A = FFArray.from_elements([field.one(), field.zero()])
+            self.assertRaises(ZeroDivisionError, A.inverse)
+    
+    def test_length_mismatch(self):
+        field = self.fields[0]
+        self.assertRaises(ValueError, lambda: FFArray.zeros(field, 2) + FFArray.zeros(field, 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import fixtures
+from random import randint
+import ff_matrix
+from ff_matrix import FFMatrix
+from finite_field import FiniteField
+from polynomial import Polynomial
+
+class TestPrimeFieldMatrix(unittest.TestCase):
+    p = 10007
+    
+    def random_matrix(self, m, n):
+        return FFMatrix(self.p, [[randint(0, self.p - 1) for j in range(n)] for i in range(m)])
+    
+    def test_arithmetic(self):
+        a = FFMatrix(7, [[1, 2], [3, 4]])
+        b = FFMatrix(7, [[6, 0], [1, 1]])
+        self.assertEqual(a + b, FFMatrix(7, [[0, 2], [4, 5]]))
+        self.assertEqual(a - b, FFMatrix(7, [[2, 2], [2, 3]]))
+        self.assertEqual(a * b, FFMatrix(7, [[1, 2], [1, 4]]))
+        self.assertEqual(3 * a, FFMatrix(7, [[3, 6], [2, 5]]))
+        self.assertEqual(-a, FFMatrix(7, [[6, 5], [4, 3]]))
+        self.assertEqual(a.transpose(), FFMatrix(7, [[1, 3], [2, 4]]))
+        self.assertEqual(a[1, 0], 3)
+        self.assertRaises(ValueError, a.__mul__, FFMatrix(7, [[1, 2, 3]]))
+        self.assertRaises(ValueError, FFMatrix, 7, [[1, 2], [3]])
+    
+    def test_determinant(self):
+        self.assertEqual(FFMatrix(7, [[1, 2], [3, 4]]).determinant(), 5)
+        self.assertEqual(FFMatrix(7, [[0, 1], [1, 0]]).determinant(), 6)
+        self.assertEqual(FFMatrix(7, [[1, 2], [2, 4]]).determinant(), 0)
+        a = self.random_matrix(6, 6)
+        b = self.random_matrix(6, 6)
+        self.assertEqual((a * b).determinant(), a.determinant() * b.determinant() % self.p)
+    
+    def test_inverse(self):
+        for n in [1, 5, 40]:
+            a = self.random_matrix(n, n)
+            self.assertEqual(a * a.inverse(), FFMatrix.identity(self.p, n))
+        self.assertRaises(ValueError, FFMatrix(7, [[1, 2], [2, 4]]).inverse)
+    
+    def test_rank_and_nullspace(self):
+        a = self.random_matrix(4, 9)
+        b = FFMatrix(self.p, a.rows() + [[(x + 2 * y) % self.p for (x, y) in zip(*a.rows()[:2])]])
+        self.assertEqual(b.rank(), 4)
+        basis = b.nullspace()
+        self.assertEqual(len(basis), 5)
+        for v in basis:
+            self.assertEqual(b * FFMatrix(self.p, [[c] for c in v]), FFMatrix.zeros(self.p, 5, 1))
+    
+    def test_solve(self):
+        a = self.random_matrix(8, 8)
+        x = [randint(0, self.p - 1) for i in range(8)]
+        b = [row[0] for row in (a * FFMatrix(self.p, [[c] for c in x])).rows()]
+        self.assertEqual(a.solve(b), x)
+        self.assertRaises(ValueError, FFMatrix(7, [[1, 2], [2, 4]]).solve, [1, 1])
+        self.assertEqual(FFMatrix(7, [[1, 2], [2, 4]]).solve([1, 2]), [1, 0])
+    
+    def test_delayed_reduction(self):
+        # Enough row updates to overflow the packed slots without reduction
+        saved = ff_matrix.ELIMINATION_SLACK_BITS
+        ff_matrix.ELIMINATION_SLACK_BITS = 1
+        try:
+            a = self.random_matrix(12, 12)
+            self.assertEqual(a.inverse() * a, FFMatrix.identity(self.p, 12))
+        finally:
+            ff_matrix.ELIMINATION_SLACK_BITS = saved
+
+class TestExtensionFieldMatrix(unittest.TestCase):
+    def setUp(self):
+        self.field = FiniteField(Polynomial([2, 4, 4, 0, 1]), 5)
+    
+    def random_matrix(self, m, n):
+        e = lambda: self.field.element_from_index(randint(0, self.field.q - 1))
+        return FFMatrix(self.field, [[e() for j in range(n)] for i in range(m)])
+    
+    def test_against_elements(self):
+        a = self.random_matrix(3, 4)
+        b = self.random_matrix(4, 2)
+        product = [[sum((a[i, k] * b[k, j] for k in range(4)), self.field.zero()) for j in range(2)]
+                   for i in range(3)]
+        self.assertEqual((a * b).rows(), product)
+        self.assertEqual((a + a - a).rows(), a.rows())
+        c = self.field.element_from_index(77)
+        self.assertEqual((c * a).rows(), [[c * x for x in row] for row in a.rows()])
+    
+    def test_linear_algebra(self):
+        a = self.random_matrix(10, 10)
+        self.assertEqual(a.inverse() * a, FFMatrix.identity(self.field, 10))
+        det = a.determinant()
+        (u, v) = (a[0, 0], a[0, 1])
+        self.assertEqual(FFMatrix(self.field, [[u, v], [v, u]]).determinant(), u * u - v * v)
+        singular = FFMatrix(self.field, a.rows()[:9] + [[x * det for x in a.rows()[3]]])
+        self.assertEqual(singular.determinant(), self.field.zero())
+        self.assertEqual(singular.rank(), 9)
+        (v,) = singular.nullspace()
+        self.assertEqual(singular * FFMatrix(self.field, [[c] for c in v]), FFMatrix.zeros(self.field, 10, 1))
+        x = [self.field.element_from_index(randint(0, 624)) for i in range(10)]
+        b = [row[0] for row in (a * FFMatrix(self.field, [[c] for c in x])).rows()]
+        self.assertEqual(a.solve(b), x)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
-from finite_field import invert_mod_f, invert_mod_n, NumberModuloP, FiniteField, poly_gcd, is_polynomial_irreducible
-from polynomial import Polynomial
+import fixtures
+from random import randint
+import finite_field
+import polynomial
+from finite_field import invert_mod_f, invert_mod_n, batch_invert_mod_n, NumberModuloP, FiniteField, poly_gcd, is_polynomial_irreducible, root_of_polynomial
+from polynomial import Polynomial, PolynomialModuloP
 
 class TestInversionModNF(unittest.TestCase):
     def test_number_inversion(self):
@@ -8,6 +12,12 @@ class TestInversionModNF(unittest.TestCase):
         self.assertEqual(invert_mod_n(3, 8), 3)
         self.assertNotEqual(invert_mod_n(3, 8), 5)
     
+    def test_batch_number_inversion(self):
+        xs = [3, 0, 5, 7, 26, 1]
+        self.assertEqual(batch_invert_mod_n(xs, 26), [9, None, 21, 15, None, 1])
+        self.assertEqual(batch_invert_mod_n([2, 3, 4], 8), [None, 3, None])
+        self.assertEqual(batch_invert_mod_n([], 7), [])
+    
     def test_polynomial_inversion(self):
         self.assertEqual(invert_mod_f(Polynomial([0,1]), Polynomial([1,1,1])), Polynomial([-1,-1]))
         # a = 1 + x + x^4 + x^6, f = 1 + x + x^3 + x^4 + x^8, result = x + x^3 + x^6 + x^7
@@ -24,6 +34,22 @@ class TestInversionModNF(unittest.TestCase):
         p2 = Polynomial(b([-1] + [0] * 10 + [1]))
         p3 = Polynomial(b([9, 5, 16, 3, 15, 15, 22, 19, 18, 29, 5]))
         self.assertEqual(invert_mod_f(p1, p2), p3)
+    
+    def test_polynomial_inversion_half_gcd(self):
+        saved = polynomial.HALF_GCD_THRESHOLD
+        polynomial.HALF_GCD_THRESHOLD = 16
+        try:
+            f = PolynomialModuloP([randint(0, 96) for i in range(200)] + [1], 97)
+            for i in range(3):
+                x = PolynomialModuloP([randint(0, 96) for i in range(150)], 97)
+                inv = invert_mod_f(x, f)
+                if inv is None:
+                    self.assertNotEqual(poly_gcd(x, f).degree(), 0)
+                else:
+                    self.assertEqual((x * inv) % f, 1)
+            self.assertEqual(invert_mod_f(f * 3, f * x), None)
+        finally:
+            polynomial.HALF_GCD_THRESHOLD = saved
 
 class TestPolyGcd(unittest.TestCase):
     def setUp(self):
@@ -72,6 +98,23 @@ class TestPolynomialIrreducibility(unittest.TestCase):
     def testPoly3(self):
         p = self.s([1,0,0,1,1])
         self.assertTrue(is_polynomial_irreducible(p))
+    
+    def testReducibleWithoutLinearFactor(self):
+        # (x^2 + x + 1)^2 over Z_2
+        p = self.s([1, 0, 1, 0, 1])
+        self.assertFalse(is_polynomial_irreducible(p))
+    
+    def testHighDegree(self):
+        p = self.s([1, 1] + [0] * 125 + [1])
+        self.assertTrue(is_polynomial_irreducible(p))
+        self.assertFalse(is_polynomial_irreducible(p * self.s([1, 1, 1])))
+    
+    def testLargePrime(self):
+        p = 2 ** 61 - 1
+        self.assertTrue(is_polynomial_irreducible(PolynomialModuloP([1, 0, 1], p)))
+        self.assertFalse(is_polynomial_irreducible(PolynomialModuloP([1, 0, 1], 13)))
+        field = FiniteField(Polynomial([1, 0, 1]), p)
+        self.assertEqual(field.q, p ** 2)
 
 class TestOfSizeMethod(unittest.TestCase):
     def assertSanePoly(self, poly, p):
@@ -89,6 +132,13 @@ class TestOfSizeMethod(unittest.TestCase):
     def test_size3(self):
         p = FiniteField.of_size(16, 2)
         self.assertSanePoly(p, 2)
+    
+    def test_order_factorization(self):
+        field = FiniteField.of_size(2 ** 64)
+        self.assertEqual(field.order_factorization,
+                         [(3, 1), (5, 1), (17, 1), (257, 1), (641, 1), (65537, 1), (6700417, 1)])
+        self.assertTrue(field.order_factorization is field.order_factorization)
+        self.assertEqual(FiniteField.of_size(9, 3).order_factorization, [(2, 3)])
 
 
 class TestRijndaelFiniteField(unittest.TestCase):
@@ -106,5 +156,176 @@ class TestRijndaelFiniteField(unittest.TestCase):
     def test_addition(self):
         pass
 
+class TestBatchInverse(unittest.TestCase):
+    def test_batch_inverse(self):
+        for log_tables in [False, True]:
+            field = FiniteField(Polynomial([2, 0, 0, 1, 1]), 3, log_tables=log_tables)
+            elements = [field.element_from_index(randint(0, field.q - 1)) for i in range(50)]
+            elements += [field.zero(), 2]
+            inverses = field.batch_inverse(elements)
+            for (e, inv) in zip(elements, inverses):
+                if e == 0:
+                    self.assertTrue(inv is None)
+                else:
+                    self.assertEqual(e * inv, field.one())
+            self.assertEqual(field.batch_inverse([field.zero()]), [None])
+            self.assertEqual(field.batch_inverse([]), [])
+
+class TestRootFinding(unittest.TestCase):
+    def check_roots(self, field):
+        a = field.element_from_index(randint(0, field.q - 1))
+        b = field.element_from_index(randint(0, field.q - 1))
+        # (x - a)(x - b)(x^2 + c x + d) with the quadratic chosen irreducible
+        quadratic = None
+        while quadratic is None:
+            (c, d) = (field.element_from_index(randint(0, field.q - 1)), field.element_from_index(randint(1, field.q - 1)))
+            quadratic = Polynomial([d, c, field.one()])
+            if root_of_polynomial(quadratic) is not None:
+                quadratic = None
+        poly = Polynomial([-a, field.one()]) * Polynomial([-b, field.one()]) * quadratic
+        root = root_of_polynomial(poly)
+        self.assertTrue(root == a or root == b)
+        self.assertEqual(root_of_polynomial(quadratic * quadratic), None)
+    
+    def test_odd_characteristic(self):
+        self.check_roots(FiniteField(Polynomial([1, 0, 2, 1]), 3))
+        self.check_roots(FiniteField(Polynomial([1, 0, 1]), 2 ** 61 - 1))
+    
+    def test_characteristic_two(self):
+        self.check_roots(FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2))
+        self.check_roots(FiniteField(Polynomial([1, 1, 1, 0, 0, 0, 0, 1] + [0] * 120 + [1]), 2))
+    
+    def test_isomorphism_in_characteristic_two(self):
+        a = FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2)
+        b = FiniteField(Polynomial([1, 0, 1, 1, 1, 0, 0, 0, 1]), 2)
+        image = a.isomorphism_to(b)
+        x = a.element_from_index(0x53)
+        y = a.element_from_index(0xca)
+        self.assertEqual(image(x * y), image(x) * image(y))
+        self.assertEqual(image(x + y), image(x) + image(y))
+
+class TestLogTables(unittest.TestCase):
+    def check_against_polynomial_arithmetic(self, poly, p):
+        fast = FiniteField(poly, p, log_tables=True)
+        slow = FiniteField(poly, p, log_tables=False)
+        for i in range(200):
+            (a, b) = (randint(0, fast.q - 1), randint(1, fast.q - 1))
+            (fa, fb) = (fast.element_from_index(a), fast.element_from_index(b))
+            (sa, sb) = (slow.element_from_index(a), slow.element_from_index(b))
+            e = randint(0, 3 * fast.q)
+            self.assertEqual((fa + fb).index, (sa + sb).index)
+            self.assertEqual((fa - fb).index, (sa - sb).index)
+            self.assertEqual((fa * fb).index, (sa * sb).index)
+            self.assertEqual((fa / fb).index, (sa / sb).index)
+            self.assertEqual((-fa).index, (-sa).index)
+            self.assertEqual((fa ** e).index, (sa ** e).index)
+            self.assertEqual(fb.inverse().index, sb.inverse().index)
+        self.assertTrue(fast._tables is not None)
+        self.assertTrue(slow._tables is None)
+    
+    def test_binary_field(self):
+        self.check_against_polynomial_arithmetic(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2)
+    
+    def test_odd_characteristic(self):
+        self.check_against_polynomial_arithmetic(Polynomial([2, 0, 0, 1, 1]), 3)
+    
+    def test_prime_field(self):
+        self.check_against_polynomial_arithmetic(Polynomial([0, 1]), 31)
+    
+    def test_index(self):
+        field = FiniteField(Polynomial([1, 0, 2, 1]), 3)
+        a = field.element_from_polynomial(Polynomial([2, 1, 1]))
+        self.assertEqual(a.index, 2 + 1 * 3 + 1 * 9)
+        self.assertEqual(field.element_from_index(14), a)
+        self.assertEqual(field.element_from_index(14).x, a.x)
+        self.assertRaises(ZeroDivisionError, field.zero().inverse)
+    
+    def test_lazy_and_capped(self):
+        field = FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2)
+        self.assertTrue(field._tables is None)
+        field.one() * field.one()
+        self.assertTrue(field._tables is not None)
+        saved = finite_field.LOG_TABLE_MEMORY_LIMIT
+        try:
+            finite_field.LOG_TABLE_MEMORY_LIMIT = 1000
+            field = FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2, log_tables=True)
+            field.one() * field.one()
+            self.assertTrue(field._tables is None)
+        finally:
+            finite_field.LOG_TABLE_MEMORY_LIMIT = saved
+
+class TestElementPower(unittest.TestCase):
+    def test_against_log_tables(self):
+        fast = FiniteField(Polynomial([2, 4, 4, 0, 1]), 5, log_tables=True)
+        slow = FiniteField(Polynomial([2, 4, 4, 0, 1]), 5, log_tables=False)
+        for i in range(30):
+            a = randint(1, fast.q - 1)
+            for e in [0, 1, 5, 25, (fast.q - 1) // 2, fast.q - 2, randint(-fast.q, 5 * fast.q)]:
+                self.assertEqual((slow.element_from_index(a) ** e).index, (fast.element_from_index(a) ** e).index)
+    
+    def test_euler_criterion(self):
+        p = 2 ** 61 - 1
+        field = FiniteField(finite_field.find_irreducible_polynomial(p, 3, random_seed=1), p)
+        for i in range(5):
+            a = field.element_from_index(randint(1, field.q - 1))
+            self.assertEqual((a * a) ** ((field.q - 1) // 2), field.one())
+            self.assertEqual(a ** (field.q - 1), field.one())
+            self.assertEqual(a ** field.q, a)
+            self.assertEqual(a ** -1, a.inverse())
+        self.assertTrue(field._frobenius_map is not None)
+
+class TestElements(unittest.TestCase):
+    def test_interning(self):
+        self.assertTrue(NumberModuloP(1, 7) is NumberModuloP(8, 7))
+        self.assertTrue(NumberModuloP(3, 7).field is NumberModuloP(500, 7).field)
+        field = FiniteField.of_size(5 ** 3)
+        self.assertTrue(field.zero() is field.const(0))
+        self.assertTrue(field.one() is field.const(6))
+        self.assertTrue(field.const(3) is field.const(-2))
+        self.assertEqual(field.const(3).index, 3)
+    
+    def test_immutable(self):
+        a = NumberModuloP(300, 1009)
+        self.assertRaises(AttributeError, setattr, a, 'n', 5)
+        self.assertRaises(AttributeError, setattr, a, 'extra', 5)
+        x = FiniteField.of_size(9).element_from_index(4)
+        self.assertRaises(AttributeError, setattr, x, 'field', None)
+        self.assertFalse(hasattr(x, '__dict__'))
+    
+    def test_hashing(self):
+        for field in [FiniteField.of_size(3 ** 4), FiniteField.of_size(3 ** 30), FiniteField.of_size(2 ** 20)]:
+            xs = [field.element_from_index(randint(0, field.q - 1)) for i in range(50)]
+            seen = dict((x, x.index) for x in xs)
+            for x in xs:
+                y = field.element_from_polynomial(x.x)
+                self.assertEqual(hash(x), hash(y))
+                self.assertEqual(seen[y], x.index)
+            self.assertEqual(len(set(xs)), len(set(x.index for x in xs)))
+        self.assertEqual(len(set([NumberModuloP(i, 1009) for i in range(2000)])), 1009)
+        residues = set([NumberModuloP(3, 7), NumberModuloP(3, 11), NumberModuloP(10, 11)])
+        self.assertEqual(len(residues), 3)
+        self.assertFalse(NumberModuloP(3, 7) == NumberModuloP(3, 11))
+        self.assertTrue(NumberModuloP(3, 7) != NumberModuloP(3, 11))
+        # Only the representative in [0, p) equals a residue
+        self.assertTrue(3 in set([NumberModuloP(3, 7)]))
+        self.assertFalse(NumberModuloP(3, 7) == 10)
+        self.assertTrue(NumberModuloP(3, 7) != 10)
+        self.assertFalse(10 in set([NumberModuloP(3, 7)]))
+        self.assertEqual(hash(FiniteField.of_size(3 ** 4)), hash(FiniteField.of_size(3 ** 4)))
+    
+    def test_pickle(self):
+        import pickle
+        field = FiniteField.of_size(7 ** 3)
+        x = field.element_from_index(200)
+        for protocol in [0, 2]:
+            y = pickle.loads(pickle.dumps(x, protocol))
+            self.assertEqual(y, x)
+            self.assertEqual(y.field, field)
+            self.assertTrue(pickle.loads(pickle.dumps(NumberModuloP(5, 7), protocol)) is NumberModuloP(5, 7))
+        # The field travels as its modulus, not with its log tables
+        self.assertTrue(len(pickle.dumps(x, 2)) < 200)
+        (y, z) = pickle.loads(pickle.dumps([x, x + 1], 2))
+        self.assertTrue(y.field is z.field)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+import fixtures
+import irreducibles
+from finite_field import FiniteField, is_polynomial_irreducible, naive_factor, find_irreducible_polynomial
+from polynomial import PolynomialModuloP
+
+class TestBundledRegistry(unittest.TestCase):
+    def test_entries_are_irreducible(self):
+        for (p, n, kind, coef) in irreducibles._read(irreducibles.BUNDLED_PATH):
+            self.assertTrue(is_polynomial_irreducible(PolynomialModuloP(coef, p)), (p, n, kind))
+    
+    def test_conway_entries_are_primitive(self):
+        for (p, n, kind, coef) in irreducibles._read(irreducibles.BUNDLED_PATH):
+            if kind != 'conway':
+                continue
+            field = FiniteField(PolynomialModuloP(coef, p), p, log_tables=False)
+            x = field.element_from_polynomial(PolynomialModuloP([0, 1], p))
+            for (r, _) in naive_factor(field.q - 1):
+                self.assertNotEqual(x ** ((field.q - 1) // r), field.one(), (p, n))
+    
+    def test_known_polynomials(self):
+        self.assertEqual(irreducibles.lookup(2, 8, 'conway'), PolynomialModuloP([1, 0, 1, 1, 1, 0, 0, 0, 1], 2))
+        self.assertEqual(irreducibles.lookup(3, 2, 'conway'), PolynomialModuloP([2, 2, 1], 3))
+        self.assertEqual(irreducibles.lookup(2, 128), PolynomialModuloP([1, 1, 1, 0, 0, 0, 0, 1] + [0] * 120 + [1], 2))
+        self.assertEqual(irreducibles.lookup(2, 233), PolynomialModuloP([1] + [0] * 73 + [1] + [0] * 158 + [1], 2))
+        self.assertEqual(irreducibles.lookup(11, 7), None)
+    
+    def test_generators(self):
+        self.assertEqual(irreducibles.conway_polynomial(5, 2), PolynomialModuloP([2, 4, 1], 5))
+        self.assertEqual(irreducibles.sparse_irreducible(2, 163),
+                         PolynomialModuloP([1, 0, 0, 1, 0, 0, 1, 1] + [0] * 155 + [1], 2))
+
+class TestRegistryCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.saved = irreducibles.CACHE_PATH
+        irreducibles.CACHE_PATH = os.path.join(self.dir, 'cache.txt')
+        irreducibles.reload()
+    
+    def tearDown(self):
+        irreducibles.CACHE_PATH = self.saved
+        irreducibles.reload()
+        shutil.rmtree(self.dir)
+    
+    def test_register(self):
+        poly = PolynomialModuloP([9, 10, 2, 3, 3, 1, 10, 2], 11)
+        self.assertFalse(irreducibles.contains(poly))
+        irreducibles.register(poly)
+        self.assertTrue(irreducibles.contains(poly))
+        self.assertEqual(irreducibles.lookup(11, 7), poly * 6)
+        irreducibles.reload()
+        self.assertEqual(irreducibles.lookup(11, 7, 'found'), poly * 6)
+    
+    def test_of_size_records_new_finds(self):
+        field = FiniteField.of_size(11 ** 5)
+        self.assertEqual(field.p, 11)
+        self.assertTrue(is_polynomial_irreducible(field.f))
+        irreducibles.reload()
+        # Cached entries are trusted once lookup has tested them
+        self.assertFalse(irreducibles.contains(field.f))
+        self.assertEqual(FiniteField.of_size(11 ** 5).f, irreducibles.lookup(11, 5))
+        self.assertTrue(irreducibles.contains(field.f))
+    
+    def test_untrusted_cache(self):
+        with open(irreducibles.CACHE_PATH, 'w') as f:
+            f.write("3 4 found 0:1 2:2\n11 5 found 0:\n11 3\n11 2 found 7:1\n5 3 found 0:3 1:3\n")
+        irreducibles.reload()
+        # x^4 + 2x^2 + 1 = (x^2 + 1)^2 over Z_3
+        self.assertRaises(ValueError, FiniteField, PolynomialModuloP([1, 0, 2, 0, 1], 3), 3)
+        self.assertEqual(irreducibles.lookup(3, 4, 'found'), None)
+        self.assertEqual(irreducibles.lookup(11, 5), None)
+        self.assertEqual(irreducibles.lookup(5, 3, 'found'), PolynomialModuloP([3, 3, 0, 1], 5))
+    
+    def test_prime_fields_are_not_searched(self):
+        for p in [101, 1009, 2 ** 61 - 1]:
+            field = FiniteField.of_size(p)
+            self.assertEqual(field.f, PolynomialModuloP([0, 1], p))
+            self.assertEqual(FiniteField.of_size(p, p).f, field.f)
+        self.assertFalse(os.path.exists(irreducibles.CACHE_PATH))
+    
+    def test_of_size_parallel(self):
+        field = FiniteField.of_size(13 ** 4, processes=2, random_seed=1)
+        self.assertEqual(field.f, find_irreducible_polynomial(13, 4, random_seed=1))
+    
+    def test_of_size_uses_registry(self):
+        self.assertEqual(FiniteField.of_size(2 ** 233).f, irreducibles.lookup(2, 233))
+        self.assertEqual(FiniteField.of_size(3 ** 7, 3).f, irreducibles.lookup(3, 7))
+        self.assertFalse(os.path.exists(irreducibles.CACHE_PATH))
+
+class TestRandomSearch(unittest.TestCase):
+    def test_deterministic_seed(self):
+        a = find_irreducible_polynomial(13, 6, random_seed=42)
+        b = find_irreducible_polynomial(13, 6, random_seed=42)
+        self.assertEqual(a, b)
+        self.assertEqual(a.degree(), 6)
+        self.assertEqual(a.coef[-1], 1)
+        self.assertTrue(is_polynomial_irreducible(a))
+    
+    def test_parallel_matches_serial(self):
+        serial = find_irreducible_polynomial(2, 301, random_seed=7)
+        parallel = find_irreducible_polynomial(2, 301, processes=2, random_seed=7)
+        self.assertEqual(serial, parallel)
+        self.assertTrue(is_polynomial_irreducible(parallel))
+
+if __name__ == '__main__':
+    unittest.main()
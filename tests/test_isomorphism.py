@@ -0,0 +1,58 @@
+import unittest
+import fixtures
+from fixtures import random_elements
+from finite_field import FiniteField
+from ff_array import FFArray
+from isomorphism import FieldIsomorphism
+from polynomial import Polynomial
+
+class TestFieldIsomorphism(unittest.TestCase):
+    def setUp(self):
+        self.a = FiniteField(Polynomial([1, 0, 2, 1]), 3)
+        self.b = FiniteField(Polynomial([1, 2, 0, 1]), 3)
+        self.iso = self.a.isomorphism_to(self.b)
+    
+    def test_homomorphism(self):
+        image = self.iso
+        for (x, y) in zip(random_elements(self.a, 20), random_elements(self.a, 20)):
+            self.assertEqual(image(x * y), image(x) * image(y))
+            self.assertEqual(image(x + y), image(x) + image(y))
+        self.assertEqual(image(self.a.one()), self.b.one())
+    
+    def test_matrix(self):
+        x = self.a.element_from_polynomial(Polynomial([0, 1]))
+        column = [row[1] for row in self.iso.matrix]
+        self.assertEqual(self.iso(x).index, sum(c * 3 ** i for (i, c) in enumerate(column)))
+        self.assertEqual([row[0] for row in self.iso.matrix], [1, 0, 0])
+    
+    def test_batch(self):
+        xs = random_elements(self.a, 50)
+        expected = [self.iso(x) for x in xs]
+        self.assertEqual(self.iso.apply_many(xs), expected)
+        self.assertEqual(self.iso(FFArray.from_elements(xs)).to_elements(), expected)
+        self.assertEqual(self.iso.apply_many([]), [])
+    
+    def test_inverse(self):
+        inverse = self.iso.inverse()
+        self.assertTrue(inverse.inverse() is self.iso)
+        for x in random_elements(self.a, 20):
+            self.assertEqual(inverse(self.iso(x)), x)
+        ys = FFArray.from_elements(random_elements(self.b, 30))
+        self.assertEqual(self.iso(inverse(ys)), ys)
+    
+    def test_characteristic_two(self):
+        a = FiniteField(Polynomial([1, 1, 0, 1, 1, 0, 0, 0, 1]), 2)
+        b = FiniteField(Polynomial([1, 0, 1, 1, 1, 0, 0, 0, 1]), 2)
+        iso = a.isomorphism_to(b)
+        xs = [a.element_from_index(i) for i in range(256)]
+        images = iso.apply_many(xs)
+        self.assertEqual(sorted(y.index for y in images), range(256))
+        self.assertEqual(iso.inverse().apply_many(images), xs)
+    
+    def test_non_element(self):
+        self.assertRaises(ValueError, self.iso, self.b.one())
+        self.assertRaises(ValueError, self.iso, 1)
+        self.assertRaises(ValueError, FieldIsomorphism(self.a, self.b, [[1, 0, 0], [0, 0, 0], [0, 0, 1]]).inverse)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import fixtures
+from fixtures import random_elements
+from random import randint, sample
+import multipoint
+from multipoint import evaluate_many, interpolate, evaluate_field
+from finite_field import FiniteField, NumberModuloP
+from polynomial import Polynomial, PolynomialModuloP
+
+def horner(coef, a, zero):
+    acc = zero
+    for c in reversed(list(coef)):
+        acc = acc * a + c
+    return acc
+
+class TestMultipoint(unittest.TestCase):
+    def setUp(self):
+        self.thresholds = (multipoint.LEAF_SIZE, multipoint.SUBPRODUCT_THRESHOLD,
+                           multipoint.NEWTON_REMAINDER_THRESHOLD)
+        # Small enough for short inputs to go through every path
+        (multipoint.LEAF_SIZE, multipoint.SUBPRODUCT_THRESHOLD,
+         multipoint.NEWTON_REMAINDER_THRESHOLD) = (2, 1, 4)
+        self.field = FiniteField(Polynomial([2, 4, 4, 0, 1]), 5)
+    
+    def tearDown(self):
+        (multipoint.LEAF_SIZE, multipoint.SUBPRODUCT_THRESHOLD,
+         multipoint.NEWTON_REMAINDER_THRESHOLD) = self.thresholds
+    
+    def test_evaluate_mod_p(self):
+        for p in [2, 10007, 2 ** 61 - 1]:
+            for (n, k) in [(1, 5), (40, 37), (100, 13), (9, 70)]:
+                f = PolynomialModuloP([randint(0, p - 1) for i in range(n)], p)
+                xs = [randint(0, p - 1) for i in range(k)]
+                self.assertEqual(evaluate_many(f, xs), [horner(f.coef, a, 0) % p for a in xs])
+        self.assertEqual(evaluate_many(PolynomialModuloP([], 7), [1, 2]), [0, 0])
+        self.assertEqual(evaluate_many(PolynomialModuloP([1], 7), []), [])
+    
+    def test_evaluate_elements(self):
+        f = Polynomial(random_elements(self.field, 50))
+        xs = random_elements(self.field, 45)
+        self.assertEqual(evaluate_many(f, xs), [horner(f.coef, a, self.field.zero()) for a in xs])
+        f = Polynomial([NumberModuloP(randint(0, 96), 97) for i in range(30)])
+        xs = [NumberModuloP(randint(0, 96), 97) for i in range(30)]
+        self.assertEqual(evaluate_many(f, xs), [horner(f.coef, a, NumberModuloP(0, 97)) for a in xs])
+    
+    def test_prime_field(self):
+        field = FiniteField(Polynomial([0, 1]), 101)
+        f = Polynomial(random_elements(field, 20))
+        xs = random_elements(field, 30)
+        self.assertEqual(evaluate_many(f, xs), [horner(f.coef, a, field.zero()) for a in xs])
+    
+    def test_interpolate(self):
+        p = 10007
+        xs = sample(range(p), 60)
+        ys = [randint(0, p - 1) for i in range(60)]
+        f = interpolate(xs, ys, p)
+        self.assertTrue(f.degree() < 60)
+        self.assertEqual(evaluate_many(f, xs), ys)
+        xs = sample([self.field.element_from_index(i) for i in range(self.field.q)], 40)
+        f = Polynomial(random_elements(self.field, 40))
+        g = interpolate(xs, evaluate_many(f, xs))
+        self.assertEqual(g, f)
+    
+    def test_interpolate_errors(self):
+        self.assertRaises(ValueError, interpolate, [1, 2, 1], [3, 4, 5], 7)
+        self.assertRaises(ValueError, interpolate, [1, 2], [3], 7)
+        self.assertRaises(ValueError, interpolate, [1, 2], [3, 4])
+    
+    def test_evaluate_field(self):
+        for (poly, p) in [([2, 4, 4, 0, 1], 5), ([1, 1, 0, 1, 1, 0, 0, 0, 1], 2), ([0, 1], 101)]:
+            field = FiniteField(Polynomial(poly), p)
+            elements = [field.element_from_index(i) for i in range(field.q)]
+            for n in [1, 3, field.q + 5]:
+                f = Polynomial(random_elements(field, n))
+                self.assertEqual(evaluate_field(f, field),
+                                 [horner(f.coef, a, field.zero()) for a in elements])
+    
+    def test_evaluate_field_without_tables(self):
+        field = FiniteField(Polynomial([1, 2, 0, 1]), 3, log_tables=False)
+        f = Polynomial(random_elements(field, 30))
+        elements = [field.element_from_index(i) for i in range(field.q)]
+        self.assertEqual(evaluate_field(f, field), [horner(f.coef, a, field.zero()) for a in elements])
+
+if __name__ == '__main__':
+    unittest.main()
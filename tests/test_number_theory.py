@@ -0,0 +1,47 @@
+import unittest
+import number_theory
+from number_theory import is_probable_prime, pollard_brent, factor_integer
+from finite_field import naive_factor
+
+class TestPrimality(unittest.TestCase):
+    def test_small(self):
+        primes = [n for n in range(2, 3000) if naive_factor(n) == [(n, 1)]]
+        self.assertEqual([n for n in range(-5, 3000) if is_probable_prime(n)], primes)
+    
+    def test_large(self):
+        self.assertTrue(is_probable_prime(2 ** 61 - 1))
+        self.assertTrue(is_probable_prime(2 ** 521 - 1))
+        self.assertFalse(is_probable_prime((2 ** 31 - 1) * (2 ** 61 - 1)))
+        # Strong pseudoprimes to many small bases
+        self.assertFalse(is_probable_prime(3215031751))
+        self.assertFalse(is_probable_prime(3317044064679887385961981))
+
+class TestFactorization(unittest.TestCase):
+    def assertFactorization(self, n, factors):
+        self.assertEqual(factor_integer(n), factors)
+    
+    def test_small(self):
+        for n in range(1, 2000):
+            self.assertEqual(factor_integer(n), naive_factor(n))
+        self.assertRaises(ValueError, factor_integer, 0)
+    
+    def test_large(self):
+        self.assertFactorization(2 ** 64 - 1, [(3, 1), (5, 1), (17, 1), (257, 1), (641, 1), (65537, 1), (6700417, 1)])
+        self.assertFactorization(4294967291 * 4294967279, [(4294967279, 1), (4294967291, 1)])
+        self.assertFactorization(2 ** 127 - 2, [(2, 1), (3, 3), (7, 2), (19, 1), (43, 1), (73, 1), (127, 1),
+                                                (337, 1), (5419, 1), (92737, 1), (649657, 1), (77158673929, 1)])
+        self.assertFactorization((1000003 * 1000033) ** 3, [(1000003, 3), (1000033, 3)])
+    
+    def test_pollard_brent(self):
+        n = 1000003 * 999983
+        self.assertTrue(pollard_brent(n) in [1000003, 999983])
+    
+    def test_memoised(self):
+        n = 2 ** 62 - 57
+        factors = factor_integer(n)
+        self.assertEqual(number_theory._factor_cache[n], tuple(factors))
+        factors.append(None)
+        self.assertEqual(factor_integer(n), list(number_theory._factor_cache[n]))
+
+if __name__ == '__main__':
+    unittest.main()
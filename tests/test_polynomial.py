@@ -1,5 +1,7 @@
 import unittest
-from polynomial import InfiniteArray, Polynomial
+from random import randint
+import polynomial
+from polynomial import InfiniteArray, Polynomial, PolynomialModuloP, SparsePolynomial, ModulusReducer, FrobeniusMap, gcdex, sparse_or_dense
 from finite_field import NumberModuloP
 
 class TestInfiniteArrayMethods(unittest.TestCase):
@@ -29,6 +31,25 @@ class TestInfiniteArrayMethods(unittest.TestCase):
         self.assertEqual(len(array), 1001)
         array[1000] = 0
         self.assertEqual(len(array), 3)
+    
+    def test_trailing_zeros(self):
+        array = InfiniteArray([1, 2, 0, 0, 0])
+        self.assertEqual(len(array), 2)
+        self.assertEqual(array[-1], 2)
+        array[1] = 0
+        self.assertEqual(len(array), 1)
+        array[7] = 0
+        self.assertEqual(len(array), 1)
+        self.assertEqual(list(array), [1])
+        array[0] = 0
+        self.assertEqual(len(array), 0)
+    
+    def test_add_scaled(self):
+        array = InfiniteArray([1, 2, 3])
+        array.add_scaled([1, 1], 2, 3)
+        self.assertEqual(list(array), [1, 2, 3, 2, 2])
+        array.sub_scaled([1, 2, 3, 2, 2])
+        self.assertEqual(len(array), 0)
 
 class TestPolynomialMethods(unittest.TestCase):
     def test_copy(self):
@@ -89,6 +110,15 @@ class TestPolynomialMethods(unittest.TestCase):
         b = Polynomial([-1, 1])
         self.assertEqual(b ** 2, Polynomial([1, -2, 1]))
     
+    def test_pickle(self):
+        import pickle
+        a = Polynomial([NumberModuloP(randint(0, 96), 97) for i in range(50)])
+        b = pickle.loads(pickle.dumps(a, 2))
+        self.assertEqual(b, a)
+        self.assertEqual(b.coef[3].p, 97)
+        self.assertTrue(len(pickle.dumps(a, 2)) < 2 * len(pickle.dumps([c.n for c in a.coef], 2)))
+        self.assertEqual(pickle.loads(pickle.dumps(Polynomial([1, 2.5]))), Polynomial([1, 2.5]))
+    
     def test_cmp(self):
         a = Polynomial([1, 1])
         b = Polynomial([1, 1])
@@ -98,6 +128,329 @@ class TestPolynomialMethods(unittest.TestCase):
         c = Polynomial([0, 1]) + Polynomial([1, 0])
         self.assertEqual(c, a)
         self.assertEqual(Polynomial([]), Polynomial([0]))
+    
+    def test_in_place(self):
+        h = lambda cs: Polynomial([NumberModuloP(c, 31) for c in cs])
+        a = h([1, 2, 3])
+        b = a
+        a += h([0, 0, 28, 5])
+        self.assertTrue(a is b)
+        self.assertEqual(a, h([1, 2, 0, 5]))
+        a -= h([1, 2, 0, 5])
+        self.assertTrue(a is b)
+        self.assertEqual(a.degree(), -1)
+        a += 4
+        a *= h([1, 1])
+        self.assertTrue(a is b)
+        self.assertEqual(a, h([4, 4]))
+        a *= 2
+        self.assertEqual(a, h([8, 8]))
+    
+    def test_fused(self):
+        h = lambda cs: Polynomial([NumberModuloP(c, 31) for c in cs])
+        (a, b, c) = (h([1, 2]), h([3, 0, 1]), h([5, 5, 5, 5]))
+        self.assertEqual(Polynomial(c).add_product(a, b), c + a * b)
+        self.assertEqual(Polynomial(c).sub_product(a, b, 1), c - a * b * h([0, 1]))
+        self.assertEqual(Polynomial(c).add_product(a, NumberModuloP(3, 31)), c + a * 3)
+        m = h([1, 0, 0, 1])
+        self.assertEqual(c.mulmod(b, m), (c * b) % m)
+    
+    def test_division(self):
+        h = lambda cs: Polynomial([NumberModuloP(c, 31) for c in cs])
+        a = h([randint(0, 30) for i in range(40)])
+        b = h([randint(0, 30) for i in range(15)] + [1])
+        (q, r) = divmod(a, b)
+        self.assertEqual(q * b + r, a)
+        self.assertTrue(r.degree() < b.degree())
+        self.assertEqual(q, a / b)
+        self.assertEqual(r, a % b)
+        self.assertEqual(a.power(13, b), (a ** 13) % b)
+
+class TestPolynomialModuloPMethods(unittest.TestCase):
+    def setUp(self):
+        self.t = lambda u: PolynomialModuloP(u, 31)
+    
+    def test_reduction(self):
+        a = self.t([32, -1, 0, 62])
+        self.assertEqual(list(a.coef), [1, 30])
+        self.assertEqual(a.degree(), 1)
+        self.assertEqual(self.t([0, 0]).degree(), -1)
+        self.assertEqual(self.t([]), 0)
+    
+    def test_conversion(self):
+        b = lambda t: map(lambda x: NumberModuloP(x, 31), t)
+        self.assertEqual(PolynomialModuloP(Polynomial(b([1, 2, -3])), 31), self.t([1, 2, 28]))
+        self.assertEqual(self.t([1, 2, 28]), Polynomial([1, 2, -3]))
+    
+    def test_arith(self):
+        p1 = self.t([1, 1])
+        p2 = self.t([0, 0, 1])
+        p3 = self.t([0, 1])
+        self.assertEqual(p1 - p2 * p3, self.t([1, 1, 0, -1]))
+        self.assertEqual(p1 + 30, self.t([0, 1]))
+        self.assertEqual(2 - p1, self.t([1, -1]))
+        self.assertEqual(p1 * 3, self.t([3, 3]))
+        self.assertEqual(-p1, self.t([30, 30]))
+    
+    def test_divmod(self):
+        a = self.t([1, 1, 0, 1, 1, 0, 0, 0, 1])
+        b = self.t([1, 1, 0, 0, 1, 0, 1])
+        self.assertEqual(a / b, self.t([-1, 0, 1]))
+        self.assertEqual(a // b, self.t([-1, 0, 1]))
+        self.assertEqual(a % b, a - b * (a // b))
+        self.assertEqual(self.t([1, 3, 4, 2]) % self.t([2, 1]), self.t([-5]))
+        q, r = divmod(self.t([2, 4]), self.t([2]))
+        self.assertEqual(q, self.t([1, 2]))
+        self.assertEqual(r, 0)
+    
+    def test_pow(self):
+        a = self.t([1, 1])
+        self.assertEqual(a ** 3, self.t([1, 3, 3, 1]))
+        self.assertEqual(a ** 0, self.t([1]))
+        m = self.t([1, 0, 1])
+        self.assertEqual(a.power(5, m), (a ** 5) % m)
+    
+    def test_large_modulus(self):
+        p = 2 ** 61 - 1
+        a = PolynomialModuloP([p - 1, 1], p)
+        self.assertEqual(a * a, PolynomialModuloP([1, -2, 1], p))
+
+class TestFastMultiplication(unittest.TestCase):
+    def setUp(self):
+        self.thresholds = (polynomial.KARATSUBA_THRESHOLD, polynomial.KRONECKER_THRESHOLD,
+                           polynomial.NTT_THRESHOLD)
+    
+    def tearDown(self):
+        (polynomial.KARATSUBA_THRESHOLD, polynomial.KRONECKER_THRESHOLD,
+         polynomial.NTT_THRESHOLD) = self.thresholds
+    
+    def schoolbook(self, a, b, p):
+        return PolynomialModuloP(polynomial._schoolbook(a, b), p)
+    
+    def test_karatsuba_generic(self):
+        polynomial.KARATSUBA_THRESHOLD = 2
+        a = Polynomial([randint(-50, 50) for i in range(37)])
+        b = Polynomial([randint(-50, 50) for i in range(12)])
+        self.assertEqual(a * b, Polynomial(polynomial._schoolbook(a.coef._array, b.coef._array)))
+        b = lambda t: map(lambda x: NumberModuloP(x, 7), t)
+        self.assertEqual(Polynomial(b([1, 1, 1, 1, 1])) * Polynomial(b([6, 1])), Polynomial(b([6, 0, 0, 0, 0, 1])))
+    
+    def test_kronecker_mod_p(self):
+        polynomial.KRONECKER_THRESHOLD = 4
+        for p in [2, 97, 2 ** 61 - 1]:
+            for (la, lb) in [(40, 40), (100, 7), (33, 65)]:
+                a = [randint(0, p - 1) for i in range(la)]
+                b = [randint(0, p - 1) for i in range(lb)]
+                self.assertEqual(PolynomialModuloP(a, p) * PolynomialModuloP(b, p), self.schoolbook(a, b, p))
+        a = [0, 0, 5, 0]
+        self.assertEqual(polynomial._kronecker_mul(a, a, 97), [0, 0, 0, 0, 25, 0, 0])
+    
+    def test_ntt(self):
+        polynomial.NTT_THRESHOLD = 8
+        for p in [2, 97, 2 ** 61 - 1]:
+            a = [randint(0, p - 1) for i in range(50)]
+            b = [randint(0, p - 1) for i in range(70)]
+            self.assertEqual(PolynomialModuloP(a, p) * PolynomialModuloP(b, p), self.schoolbook(a, b, p))
+    
+    def test_ntt_out_of_range(self):
+        self.assertEqual(polynomial._ntt_primes_for(10, 10, 2 ** 127 - 1), None)
+        self.assertEqual(len(polynomial._ntt_primes_for(10, 10, 97)), 1)
+
+class TestModulusReducer(unittest.TestCase):
+    def tearDown(self):
+        polynomial.BARRETT_THRESHOLD = self.threshold
+    
+    def setUp(self):
+        self.threshold = polynomial.BARRETT_THRESHOLD
+    
+    def check(self, f):
+        reducer = ModulusReducer(f)
+        n = f.degree()
+        for m in [0, n - 1, n, 2 * n - 2, 3 * n]:
+            a = PolynomialModuloP([randint(0, f.p - 1) for i in range(m + 1)], f.p)
+            self.assertEqual(a % reducer, a % f)
+        return reducer
+    
+    def test_sparse(self):
+        reducer = self.check(PolynomialModuloP([1, 0, 0, 1, 1, 0, 0, 0, 1], 2))
+        self.assertEqual(reducer._sparse, [(0, 1), (3, 1), (4, 1)])
+        self.check(PolynomialModuloP([3] + [0] * 40 + [5] + [0] * 20 + [2], 97))
+    
+    def test_dense(self):
+        f = PolynomialModuloP([randint(0, 96) for i in range(30)] + [7], 97)
+        self.assertEqual(self.check(f)._reciprocal, None)
+    
+    def test_barrett(self):
+        polynomial.BARRETT_THRESHOLD = 1
+        for p in [2, 97, 2 ** 61 - 1]:
+            for n in [9, 17, 40]:
+                f = PolynomialModuloP([randint(1, p - 1) for i in range(n + 1)], p)
+                self.assertNotEqual(self.check(f)._reciprocal, None)
+    
+    def test_power(self):
+        f = PolynomialModuloP([1, 1, 0, 1, 1, 0, 0, 0, 1], 2)
+        a = PolynomialModuloP([0, 1, 1], 2)
+        self.assertEqual(a.power(1000, ModulusReducer(f)), a.power(1000, f))
+
+class TestGcdex(unittest.TestCase):
+    def setUp(self):
+        self.thresholds = (polynomial.HALF_GCD_THRESHOLD, polynomial.HALF_GCD_GCD_ONLY_THRESHOLD)
+    
+    def tearDown(self):
+        (polynomial.HALF_GCD_THRESHOLD, polynomial.HALF_GCD_GCD_ONLY_THRESHOLD) = self.thresholds
+    
+    def random_poly(self, n, p):
+        return PolynomialModuloP([randint(0, p - 1) for i in range(n)] + [randint(1, p - 1)], p)
+    
+    def check(self, a, b, common):
+        (g, s, t) = gcdex(a, b)
+        self.assertEqual(s * a + t * b, g)
+        self.assertEqual(g.coef[-1], 1)
+        self.assertEqual(g % common, 0)
+        self.assertEqual(a % g, 0)
+        self.assertEqual(b % g, 0)
+        self.assertEqual(gcdex(a, b, False), (g, None, None))
+    
+    def test_classical(self):
+        for p in [2, 101]:
+            c = self.random_poly(5, p)
+            self.check(self.random_poly(40, p) * c, self.random_poly(33, p) * c, c)
+    
+    def test_half_gcd(self):
+        polynomial.HALF_GCD_THRESHOLD = polynomial.HALF_GCD_GCD_ONLY_THRESHOLD = 8
+        for p in [2, 101, 2 ** 61 - 1]:
+            for (n, k) in [(150, 1), (150, 149), (300, 100), (97, 0)]:
+                c = self.random_poly(k, p)
+                self.check(self.random_poly(n, p) * c, self.random_poly(n - 7, p) * c, c)
+                self.check(self.random_poly(n, p) * c, self.random_poly(n, p) * c, c)
+    
+    def test_edge_cases(self):
+        p = 13
+        a = self.random_poly(10, p)
+        zero = PolynomialModuloP([], p)
+        (g, s, t) = gcdex(a, zero)
+        self.assertEqual(g, a * pow(a.coef[-1], p - 2, p))
+        self.assertEqual(s * a, g)
+        (g, s, t) = gcdex(zero, a)
+        self.assertEqual(t * a, g)
+        self.assertEqual(gcdex(zero, zero)[0], 0)
+        self.assertEqual(gcdex(a, a * 3)[0].degree(), 10)
+    
+    def test_generic_polynomial(self):
+        polynomial.HALF_GCD_THRESHOLD = 4
+        h = lambda cs: Polynomial([NumberModuloP(c, 7) for c in cs])
+        c = h([randint(0, 6) for i in range(6)] + [1])
+        a = h([randint(0, 6) for i in range(30)] + [1]) * c
+        b = h([randint(0, 6) for i in range(25)] + [1]) * c
+        (g, s, t) = gcdex(a, b)
+        self.assertEqual(s * a + t * b, g)
+        self.assertEqual(g.coef[g.degree()], 1)
+        self.assertEqual((g % c).degree(), -1)
+        self.assertEqual((a % g).degree(), -1)
+
+class TestSparsePolynomial(unittest.TestCase):
+    def test_arith(self):
+        a = SparsePolynomial([(1000, 3), (5, 1), (0, 4)], 7)
+        b = SparsePolynomial({1000: 4, 3: 2}, 7)
+        self.assertEqual(a + b, PolynomialModuloP([4, 0, 0, 2, 0, 1], 7))
+        self.assertEqual(a - a, 0)
+        self.assertEqual((a * b).terms, {2000: 5, 1005: 4, 1003: 6, 1000: 2, 8: 2, 3: 1})
+        self.assertEqual((a * 3).terms, {1000: 2, 5: 3, 0: 5})
+        self.assertEqual(-a + a, 0)
+    
+    def test_dense_operands(self):
+        a = SparsePolynomial([(500, 1), (2, 6)], 7)
+        d = PolynomialModuloP([1, 2, 3], 7)
+        self.assertEqual((a + d).terms, {500: 1, 2: 2, 1: 2, 0: 1})
+        self.assertEqual((d * a).terms, (a * SparsePolynomial(d)).terms)
+        self.assertEqual(d - a, -(a - d))
+    
+    def test_fill_ratio(self):
+        a = SparsePolynomial([(1000, 1), (0, 1)], 5)
+        self.assertTrue(isinstance(a * a, SparsePolynomial))
+        self.assertTrue(isinstance(a + PolynomialModuloP([1] * 900, 5), PolynomialModuloP))
+        small = SparsePolynomial([(10, 1)], 5)
+        self.assertEqual(small * small, PolynomialModuloP([0] * 20 + [1], 5))
+        self.assertTrue(isinstance(sparse_or_dense(PolynomialModuloP([1] + [0] * 99 + [1], 5)), SparsePolynomial))
+        self.assertEqual(sparse_or_dense(a).to_dense(), PolynomialModuloP([1] + [0] * 999 + [1], 5))
+    
+    def test_pow(self):
+        x = SparsePolynomial([(1, 1)], 3)
+        self.assertEqual((x ** (3 ** 40)).terms, {3 ** 40: 1})
+        a = SparsePolynomial([(100, 1), (0, 2)], 3)
+        # (x^100 + 2)^3 = x^300 + 2 in characteristic 3
+        self.assertEqual((a ** 3).terms, {300: 1, 0: 2})
+    
+    def test_reduction(self):
+        p = 101
+        f = PolynomialModuloP([randint(0, p - 1) for i in range(12)] + [1], p)
+        x = PolynomialModuloP([0, 1], p)
+        for e in [13, 1000, p ** 5]:
+            a = SparsePolynomial([(e, 5), (e // 2, 3), (7, 1), (0, 2)], p)
+            expected = (x.power(e, f) * 5 + x.power(e // 2, f) * 3 + x.power(7, f) + 2) % f
+            self.assertEqual(a % f, expected)
+            self.assertEqual(a % ModulusReducer(f), expected)
+            self.assertEqual(a % FrobeniusMap(f, p), expected)
+        dense = PolynomialModuloP([randint(0, p - 1) for i in range(40)], p)
+        self.assertEqual(SparsePolynomial(dense) % f, dense % f)
+    
+    def test_mixed_moduli(self):
+        f = PolynomialModuloP([1, 1, 0, 0, 1], 2)
+        # x^(2^40) = x modulo a primitive f of degree 4, as 15 divides 2^40 - 1
+        self.assertEqual(SparsePolynomial([(2 ** 40, 1), (1, 1)]) % f, 0)
+        self.assertEqual(SparsePolynomial([(5, 3)]) + PolynomialModuloP([1, 1], 2), PolynomialModuloP([1, 1, 0, 0, 0, 1], 2))
+        self.assertRaises(ValueError, lambda: SparsePolynomial([(5, 1)], 3) % f)
+        self.assertRaises(ValueError, lambda: SparsePolynomial([(5, 1)], 3) + f)
+    
+    def test_equality(self):
+        d = PolynomialModuloP([1, 1], 7)
+        s = SparsePolynomial([(0, 1), (1, 1)], 7)
+        self.assertTrue(d == s)
+        self.assertTrue(s == d)
+        self.assertFalse(d != s)
+        self.assertFalse(s != d)
+        self.assertTrue(Polynomial([1, 1]) == SparsePolynomial([(0, 1), (1, 1)]))
+        self.assertTrue(d != SparsePolynomial([(1, 1)], 7))
+    
+    def test_generic(self):
+        h = lambda cs: Polynomial([NumberModuloP(c, 31) for c in cs])
+        f = h([randint(0, 30) for i in range(6)] + [3])
+        x = h([0, 1])
+        a = SparsePolynomial([(31 ** 6, NumberModuloP(1, 31)), (1, NumberModuloP(30, 31))])
+        self.assertEqual(a % f, (x.power(31 ** 6, f) - x) % f)
+        self.assertEqual(SparsePolynomial(f).to_dense(), f)
+
+class TestExponentiation(unittest.TestCase):
+    def test_sliding_window(self):
+        mul = lambda a, b: a * b % 1000003
+        for e in [0, 1, 2, 3, 255, 256, 2 ** 30 + 1, 3 ** 100, 2 ** 700 - 1, randint(0, 2 ** 900)]:
+            self.assertEqual(polynomial._sliding_window_power(7, e, 1, mul, lambda a: a * a % 1000003),
+                             pow(7, e, 1000003))
+    
+    def test_frobenius_modulo_p(self):
+        for p in [3, 101, 2 ** 61 - 1]:
+            f = PolynomialModuloP([randint(0, p - 1) for i in range(9)] + [1], p)
+            frobenius = FrobeniusMap(f, p)
+            a = PolynomialModuloP([randint(0, p - 1) for i in range(12)], p)
+            self.assertEqual(frobenius(a), a.power(p, f))
+            self.assertEqual(frobenius.xq, PolynomialModuloP([0, 1], p).power(p, f))
+            for e in [0, 1, p - 1, p, (p ** 9 - 1) // 2, randint(0, p ** 12)]:
+                self.assertEqual(a.power(e, frobenius), a.power(e, f))
+    
+    def test_frobenius_generic(self):
+        h = lambda cs: Polynomial([NumberModuloP(c, 31) for c in cs])
+        f = h([randint(0, 30) for i in range(6)] + [1])
+        a = h([randint(0, 30) for i in range(6)])
+        frobenius = FrobeniusMap(f, 31)
+        self.assertEqual(frobenius(a), a.power(31, f))
+        e = (31 ** 4 - 1) // 2
+        self.assertEqual(a.power(e, frobenius), a.power(e, f))
+    
+    def test_pays_off(self):
+        p = 2 ** 61 - 1
+        self.assertTrue(FrobeniusMap.pays_off((p ** 4 - 1) // 2, p, 4))
+        self.assertFalse(FrobeniusMap.pays_off(p - 2, p, 4))
+        self.assertFalse(FrobeniusMap.pays_off(3 ** 40 - 2, 3, 40))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
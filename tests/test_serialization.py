@@ -0,0 +1,68 @@
+import unittest
+import fixtures
+from fixtures import random_elements, small_fields
+import os
+import pickle
+import tempfile
+from finite_field import FiniteField
+from ff_array import FFArray
+from polynomial import Polynomial
+import serialization
+from serialization import MappedElements, dumps, loads, write_elements, record_width
+
+class TestSerialization(unittest.TestCase):
+    def setUp(self):
+        self.fields = small_fields() + [FiniteField(Polynomial([3, 1]), 2 ** 127 - 1)]
+        self.paths = []
+    
+    def tearDown(self):
+        for path in self.paths:
+            os.remove(path)
+    
+    def write(self, field, elements):
+        (fd, path) = tempfile.mkstemp()
+        self.paths.append(path)
+        with os.fdopen(fd, 'wb') as f:
+            write_elements(f, field, elements)
+        return path
+    
+    def test_record_width(self):
+        self.assertEqual([record_width(field) for field in self.fields], [1, 1, 1, 16, 16])
+        self.assertEqual(len(dumps(self.fields[0], random_elements(self.fields[0], 100))), 32 + 100)
+    
+    def test_roundtrip(self):
+        for field in self.fields:
+            a = random_elements(field, 50)
+            b = loads(dumps(field, a))
+            self.assertEqual(b.field, field)
+            self.assertEqual(b.to_elements(), a)
+            self.assertEqual(loads(dumps(field, FFArray.from_elements(a))), b)
+            self.assertEqual(len(loads(dumps(field, []))), 0)
+    
+    def test_mapped(self):
+        serialization.WRITE_CHUNK_SIZE, chunk = 7, serialization.WRITE_CHUNK_SIZE
+        try:
+            for field in self.fields:
+                a = random_elements(field, 30)
+                with MappedElements(self.write(field, iter(a))) as m:
+                    self.assertEqual(m.field, field)
+                    self.assertEqual(len(m), 30)
+                    self.assertEqual(m[4], a[4])
+                    self.assertEqual(m[-1], a[-1])
+                    self.assertEqual(m[3:11].to_elements(), a[3:11])
+                    self.assertEqual(m[::-4].to_elements(), a[::-4])
+                    self.assertEqual(m.indices(25), [e.index for e in a[25:]])
+                    self.assertEqual(list(m), a)
+                    self.assertRaises(IndexError, lambda: m[30])
+        finally:
+            serialization.WRITE_CHUNK_SIZE = chunk
+    
+    def test_malformed(self):
+        field = self.fields[3]
+        data = dumps(field, random_elements(field, 3))
+        self.assertRaises(ValueError, loads, 'XXXX' + data[4:])
+        self.assertRaises(ValueError, loads, data[:10])
+        self.assertRaises(ValueError, loads, data[:-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import fixtures
+from fixtures import random_elements, small_fields
+import os
+import tempfile
+from itertools import islice
+from finite_field import FiniteField
+from polynomial import Polynomial
+import serialization
+import streaming
+from streaming import map_isomorphism, evaluate, batch_inverse
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self):
+        self.fields = small_fields()
+    
+    def test_isomorphism(self):
+        source = self.fields[2]
+        target = FiniteField(Polynomial([2, 1, 0, 0, 1]), 3, log_tables=False)
+        iso = source.isomorphism_to(target)
+        a = random_elements(source, 50)
+        expected = [iso(x) for x in a]
+        self.assertEqual(list(map_isomorphism(iso, iter(a), chunk_size=7)), expected)
+        coef = [tuple(x.x.coef) for x in a]
+        self.assertEqual(list(map_isomorphism(iso, coef, output='indices')), [y.index for y in expected])
+    
+    def test_evaluate(self):
+        for field in self.fields:
+            poly = Polynomial(random_elements(field, 6))
+            a = random_elements(field, 40)
+            expected = [reduce(lambda s, c: s * x + c, reversed(list(poly.coef)), field.zero()) for x in a]
+            self.assertEqual(list(evaluate(poly, a, chunk_size=16)), expected)
+        self.assertEqual(list(evaluate(Polynomial([]), a, field)), [field.zero()] * 40)
+    
+    def test_inverse(self):
+        for field in self.fields:
+            a = random_elements(field, 30) + [field.zero()]
+            self.assertEqual(list(batch_inverse(a, field, chunk_size=8)), field.batch_inverse(a))
+    
+    def test_inputs_and_outputs(self):
+        field = self.fields[3]
+        a = random_elements(field, 20)
+        width = serialization.record_width(field)
+        records = list(batch_inverse(a, field, output='records'))
+        self.assertTrue(all(len(r) == width for r in records))
+        self.assertEqual(list(batch_inverse(records, field)), a)
+        coef = list(batch_inverse(a, field, output='coefficients'))
+        self.assertEqual(list(batch_inverse(coef, field)), a)
+        (fd, path) = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                serialization.write_elements(f, field, a)
+            with serialization.MappedElements(path) as m:
+                self.assertEqual(list(batch_inverse(batch_inverse(m, field), field, chunk_size=3)), a)
+        finally:
+            os.remove(path)
+        self.assertRaises(ValueError, batch_inverse, a, field, output='bits')
+        self.assertRaises(ValueError, list, batch_inverse(a, self.fields[1]))
+    
+    def test_lazy(self):
+        field = self.fields[1]
+        def elements():
+            for i in xrange(10 ** 9):
+                yield field.element_from_index(i % 256)
+        self.assertEqual([x.index for x in islice(evaluate(Polynomial([field.one()] * 3), elements(), chunk_size=64), 5)],
+                         [1, 1, 7, 7, 21])
+    
+    def test_processes(self):
+        field = self.fields[2]
+        a = random_elements(field, 200)
+        self.assertEqual(list(batch_inverse(a, field, chunk_size=9, processes=2)), field.batch_inverse(a))
+
+if __name__ == '__main__':
+    unittest.main()